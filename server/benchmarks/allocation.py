@@ -0,0 +1,223 @@
+"""Benchmark create_schedule across the input space and compare against a baseline.
+
+The sweep covers every zero-day mask at several head-count scales, a few
+adversarial shapes, schedule types 4 and 5, and each solver backend. Each
+case records:
+- the pattern count,
+- the time to build the pattern set and the model,
+- the solve time and the objective,
+- the peak Python memory for the whole solve (tracemalloc).
+
+CBC memory used inside the worker process is not included.
+
+Run from the server directory:
+
+    python -m benchmarks.allocation --output baseline.json
+    python -m benchmarks.allocation --baseline baseline.json --output current.json
+
+With --baseline the run exits non-zero when any objective got worse, a case
+stopped solving, or a backend's total time or peak memory grew by more than
+the allowed tolerance.
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from config import app
+from routes.employee_allocation import (
+    DEFAULT_WEIGHTS, SOLVER_BACKENDS, build_cbc_model, build_highs_model, pattern_incidence,
+    pattern_masks, solve_schedule
+)
+
+MODEL_BUILDERS = {'cbc': build_cbc_model, 'highs': build_highs_model}
+OBJECTIVE_TOLERANCE = 1e-6
+
+
+def sweep_cases(scales, sample=None, seed=0):
+    """Yield (name, required_heads) for the zero-mask sweep and adversarial shapes."""
+    rng = np.random.default_rng(seed)
+    masks = range(1 << 7)
+    if sample:
+        masks = sorted(rng.choice(1 << 7, size=min(sample, 1 << 7), replace=False))
+
+    for mask in masks:
+        for scale in scales:
+            heads = rng.integers(max(scale // 2, 1), scale + 1, size=7)
+            yield f"mask{int(mask):03d}-h{scale}", [0 if int(mask) >> d & 1 else int(heads[d]) for d in range(7)]
+
+    top = max(scales)
+    yield 'flat', [top] * 7
+    yield 'spike', [1, 1, 1, top, 1, 1, 1]
+    yield 'alternating', [top if d % 2 else 1 for d in range(7)]
+    yield 'weekend-heavy', [top, 1, 1, 1, 1, 1, top]
+    yield 'single-day', [0, 0, 0, top, 0, 0, 0]
+
+
+def best_time(f, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_case(name, required_heads, schedule_type, backend, repeat):
+    """Measure one (case, schedule type, backend) combination."""
+    weights = dict(DEFAULT_WEIGHTS)
+    record = {
+        'case': name,
+        'required_heads': required_heads,
+        'schedule_type': schedule_type,
+        'backend': backend
+    }
+
+    pattern_time, masks = best_time(lambda: pattern_masks(required_heads, schedule_type), repeat)
+    record['pattern_count'] = len(masks)
+    record['pattern_ms'] = pattern_time * 1e3
+    if not masks:
+        record['error'] = "Could not generate valid patterns with given constraints"
+        return record
+
+    incidence = pattern_incidence(masks)
+    build_time, _ = best_time(
+        lambda: MODEL_BUILDERS[backend](incidence, required_heads, schedule_type, weights), repeat
+    )
+    record['build_ms'] = build_time * 1e3
+
+    try:
+        total_time, result = best_time(
+            lambda: solve_schedule(required_heads, schedule_type, weights, backend=backend), repeat
+        )
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+    record['total_ms'] = total_time * 1e3
+    record['solve_ms'] = max(total_time - pattern_time - build_time, 0) * 1e3
+    record['objective'] = result['objective']
+    record['solver_status'] = result['solver_status']
+
+    # Measured separately so tracing overhead stays out of the timings
+    tracemalloc.start()
+    try:
+        solve_schedule(required_heads, schedule_type, weights, backend=backend)
+        record['peak_memory_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+    return record
+
+
+def summarize(records):
+    """Total time and worst peak memory per backend."""
+    summary = {}
+    for record in records:
+        backend = summary.setdefault(record['backend'], {
+            'cases': 0, 'errors': 0, 'total_ms': 0.0, 'build_ms': 0.0, 'solve_ms': 0.0, 'peak_memory_kb': 0.0
+        })
+        backend['cases'] += 1
+        if 'error' in record:
+            backend['errors'] += 1
+            continue
+        for field in ('total_ms', 'build_ms', 'solve_ms'):
+            backend[field] += record[field]
+        backend['peak_memory_kb'] = max(backend['peak_memory_kb'], record['peak_memory_kb'])
+    return summary
+
+
+def record_key(record):
+    return record['case'], record['schedule_type'], record['backend']
+
+
+def compare(current, baseline, time_tolerance, memory_tolerance):
+    """Return a list of regressions of the current run against the baseline."""
+    regressions = []
+    previous = {record_key(record): record for record in baseline['results']}
+    for record in current['results']:
+        old = previous.get(record_key(record))
+        if old is None or 'error' in old:
+            continue
+        label = '{} type {} on {}'.format(*record_key(record))
+        if 'error' in record:
+            regressions.append(f"{label}: now fails with '{record['error']}'")
+        elif record['objective'] > old['objective'] + OBJECTIVE_TOLERANCE:
+            regressions.append(f"{label}: objective {old['objective']} -> {record['objective']}")
+
+    for backend, summary in current['summary'].items():
+        old = baseline['summary'].get(backend)
+        if old is None:
+            continue
+        if old['total_ms'] and summary['total_ms'] > old['total_ms'] * (1 + time_tolerance):
+            regressions.append(
+                f"{backend}: total time {old['total_ms']:.0f}ms -> {summary['total_ms']:.0f}ms"
+            )
+        if old['peak_memory_kb'] and summary['peak_memory_kb'] > old['peak_memory_kb'] * (1 + memory_tolerance):
+            regressions.append(
+                f"{backend}: peak memory {old['peak_memory_kb']:.0f}KB -> {summary['peak_memory_kb']:.0f}KB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='*', choices=list(SOLVER_BACKENDS), default=list(SOLVER_BACKENDS))
+    parser.add_argument('--schedule-types', type=int, nargs='*', choices=(4, 5), default=[4, 5])
+    parser.add_argument('--scales', type=int, nargs='*', default=[1, 10, 100, 500])
+    parser.add_argument('--sample', type=int, help="benchmark this many random zero masks instead of all 128")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--time-tolerance', type=float, default=0.2)
+    parser.add_argument('--memory-tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results = []
+    with app.app_context():
+        for name, required_heads in sweep_cases(args.scales, args.sample, args.seed):
+            for schedule_type in args.schedule_types:
+                for backend in args.backends:
+                    results.append(run_case(name, required_heads, schedule_type, backend, args.repeat))
+
+    current = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'args': vars(args)
+        },
+        'summary': summarize(results),
+        'results': results
+    }
+
+    output = json.dumps(current, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    for backend, summary in current['summary'].items():
+        print(f"{backend}: {summary['cases']} cases, {summary['errors']} infeasible, "
+              f"{summary['total_ms']:.0f}ms total, peak {summary['peak_memory_kb']:.0f}KB", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.time_tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Compare schedule model build time before and after the incidence-matrix rewrite.
+
+The legacy builder is the original create_schedule construction: one
+``day_idx in patterns[p]`` membership test per pattern per day, plus equality
+constraints pinning zero days. Pattern sets larger than the 7-day catalog are
+synthesized to show how both approaches scale.
+
+Run from the server directory:
+
+    python -m benchmarks.model_build --repeat 5
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pulp
+
+from routes.employee_allocation import (
+    DEFAULT_WEIGHTS, build_cbc_model, build_highs_model, pattern_incidence, pattern_masks
+)
+
+
+def build_legacy_model(patterns, required_heads, schedule_type, weights):
+    work_days = [i for i, req in enumerate(required_heads) if req > 0]
+    zero_days = [i for i, req in enumerate(required_heads) if req == 0]
+
+    model = pulp.LpProblem("Minimize_Staffing_Variance", pulp.LpMinimize)
+    x = pulp.LpVariable.dicts('pattern_', range(len(patterns)), lowBound=0, cat='Integer')
+    over = pulp.LpVariable.dicts('over_', work_days, lowBound=0)
+    under = pulp.LpVariable.dicts('under_', work_days, lowBound=0)
+    max_pattern_size = pulp.LpVariable('max_pattern_size', lowBound=0)
+
+    model += pulp.lpSum(over[d] * weights['over'] + under[d] * weights['under'] for d in work_days) + max_pattern_size
+
+    for day_idx in work_days:
+        workers_on_day = pulp.lpSum(x[p] for p in range(len(patterns)) if day_idx in patterns[p])
+        model += workers_on_day - over[day_idx] + under[day_idx] == required_heads[day_idx], f"Day_{day_idx}_balance"
+        model += workers_on_day >= required_heads[day_idx], f"Day_{day_idx}_no_understaffing"
+
+    for day_idx in zero_days:
+        workers_on_day = pulp.lpSum(x[p] for p in range(len(patterns)) if day_idx in patterns[p])
+        model += workers_on_day == 0, f"Day_{day_idx}_no_workers"
+
+    if schedule_type == 5:
+        target_size = max(required_heads) // 3
+        for p in range(len(patterns)):
+            model += x[p] <= max_pattern_size, f"Pattern_{p}_max_size"
+            model += x[p] <= target_size + over[work_days[0]], f"Pattern_{p}_soft_limit"
+    return model
+
+
+def best_time(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def cases(required_heads, schedule_type, sizes, seed=0):
+    """Yield (label, incidence) for the catalog set and synthetic larger sets."""
+    incidence = pattern_incidence(pattern_masks(required_heads, schedule_type))
+    yield 'catalog', incidence
+
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        # Repeat catalog patterns to reach the requested column count
+        rows = rng.integers(0, incidence.shape[0], size=size)
+        yield f'{size} patterns', incidence[rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--schedule-type', type=int, choices=(4, 5), default=5)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[250, 1000, 5000])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    required_heads = [40, 120, 115, 110, 118, 125, 0]
+    weights = dict(DEFAULT_WEIGHTS)
+
+    print(f"{'case':<16}{'legacy ms':>12}{'pulp ms':>12}{'milp ms':>12}{'speedup':>10}")
+    for label, incidence in cases(required_heads, args.schedule_type, args.sizes):
+        patterns = [tuple(np.flatnonzero(row)) for row in incidence]
+        legacy = best_time(lambda: build_legacy_model(patterns, required_heads, args.schedule_type, weights), args.repeat)
+        cbc = best_time(lambda: build_cbc_model(incidence, required_heads, args.schedule_type, weights), args.repeat)
+        highs = best_time(lambda: build_highs_model(incidence, required_heads, args.schedule_type, weights), args.repeat)
+        print(f"{label:<16}{legacy * 1e3:>12.2f}{cbc * 1e3:>12.2f}{highs * 1e3:>12.2f}{legacy / cbc:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
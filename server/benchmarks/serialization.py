@@ -0,0 +1,93 @@
+"""Compare SerializerMixin.to_dict + jsonify with the compiled serializers.
+
+Builds transient employees shaped like the seed data (a job class with
+metrics, a department with its user, six metric values and a schedule per
+employee), checks that both paths produce byte-identical JSON, then times
+them.
+
+Run from the server directory:
+
+    python -m benchmarks.serialization --employees 10000
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import date, timedelta
+
+from config import app
+from models import Department, Employee, EmployeeMetric, JobClass, Metric, Schedule, User
+from serializers import dumps, json_response, serialize_many
+
+
+def build_employees(n, seed=0):
+    rng = random.Random(seed)
+    user = User(id=1, username='admin', email='admin@example.com', password_hash='x', is_admin=True)
+    department = Department(id=1, name='IT', description='Information Technology', user=user)
+    metrics = [Metric(id=i, name=f'Metric {i}', description='Measure', unit='rating') for i in range(1, 4)]
+    job_classes = [
+        JobClass(id=i, name=f'Class {i}', description='Position', base_pay_rate=20.0 + i,
+                 department=department, metrics=metrics[:2])
+        for i in range(1, 5)
+    ]
+
+    employees = []
+    for i in range(1, n + 1):
+        employee = Employee(
+            id=i, first_name=f'First{i}', last_name=f'Last{i}', email=f'employee{i}@example.com',
+            hire_date=date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+            hourly_rate=rng.uniform(15, 50), job_class=rng.choice(job_classes)
+        )
+        employee.metric_values = [
+            EmployeeMetric(id=i * 10 + k, value=rng.uniform(50, 150), metric_id=rng.choice(metrics).id,
+                           date=date(2024, 12, 1) + timedelta(days=k))
+            for k in range(6)
+        ]
+        employee.schedule = Schedule(id=i, monday=True, tuesday=rng.random() < 0.5, friday=True)
+        employees.append(employee)
+    return employees, job_classes
+
+
+def best_time(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    employees, job_classes = build_employees(args.employees)
+    cases = [
+        ('employees', employees, ()),
+        ('employees fields', employees, ('id', 'first_name', 'last_name', 'schedule')),
+        ('job_classes', job_classes, ()),
+    ]
+
+    with app.app_context():
+        print(f"{'case':<18}{'to_dict ms':>12}{'compiled ms':>13}{'jsonify ms':>12}{'dumps ms':>10}{'speedup':>9}")
+        for label, rows, only in cases:
+            legacy = [row.to_dict(only=only) for row in rows]
+            compiled = serialize_many(rows, only=only)
+            if app.json.response(legacy).get_data() != json_response(compiled).get_data():
+                raise SystemExit(f"{label}: compiled output differs from to_dict")
+
+            to_dict = best_time(lambda: [row.to_dict(only=only) for row in rows], args.repeat)
+            fast = best_time(lambda: serialize_many(rows, only=only), args.repeat)
+            jsonify = best_time(lambda: app.json.response(legacy), args.repeat)
+            encode = best_time(lambda: dumps(compiled), args.repeat)
+            speedup = (to_dict + jsonify) / (fast + encode)
+            print(f"{label:<18}{to_dict * 1e3:>12.1f}{fast * 1e3:>13.1f}{jsonify * 1e3:>12.1f}"
+                  f"{encode * 1e3:>10.1f}{speedup:>8.1f}x")
+        print("Output is byte-identical for every case")
+
+
+if __name__ == '__main__':
+    main()
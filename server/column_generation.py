@@ -0,0 +1,226 @@
+"""Column generation for rotating rosters that span several weeks.
+
+A pattern is a 0/1 work vector over the whole rotation (7 days per week).
+Every week it works exactly ``schedule_type`` days, never works a zero day,
+and rests on two consecutive days. A rest pair may start on a week's last
+day and end on the next week's first day. The last week wraps around to the
+first because the roster rotates. With one week this is the same rule
+has_two_consecutive_rest_days applies.
+
+Enumerating every pattern grows exponentially with the number of weeks.
+Here a small seed set is grown instead. The LP relaxation of the master
+problem is solved with HiGHS. A dynamic program over the days then prices
+the pattern that best uses the day-balance duals, and it joins the master
+with its whole-week shifts. When no column has negative reduced cost, the
+integer master is solved over the generated columns.
+"""
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+DAYS_PER_WEEK = 7
+REDUCED_COST_TOLERANCE = 1e-7
+
+
+def price_pattern(day_weights, work_allowed, schedule_type):
+    """Find the valid pattern with the largest total weight over its work days.
+
+    Returns (value, pattern) or (None, None) when no valid pattern exists.
+    """
+    n_days = len(day_weights)
+
+    # State: (day 0 is rest, previous day is rest, shifts this week, week has a rest pair)
+    layer = {}
+    for rest in (True, False):
+        if not rest and (not work_allowed[0] or schedule_type < 1):
+            continue
+        layer[(rest, rest, 0 if rest else 1, False)] = (0 if rest else day_weights[0], None)
+    history = [layer]
+
+    for t in range(1, n_days):
+        next_layer = {}
+        for state, (value, _) in layer.items():
+            first_rest, prev_rest, count, paired = state
+            for rest in (True, False):
+                if not rest and not work_allowed[t]:
+                    continue
+                if t % DAYS_PER_WEEK == 0:
+                    # The previous week closes here; its rest pair may span the seam
+                    if count != schedule_type or not (paired or (prev_rest and rest)):
+                        continue
+                    next_count, next_paired = (0 if rest else 1), False
+                else:
+                    next_count = count + (0 if rest else 1)
+                    if next_count > schedule_type:
+                        continue
+                    next_paired = paired or (prev_rest and rest)
+
+                next_state = (first_rest, rest, next_count, next_paired)
+                next_value = value + (0 if rest else day_weights[t])
+                if next_state not in next_layer or next_value > next_layer[next_state][0]:
+                    next_layer[next_state] = (next_value, state)
+        layer = next_layer
+        history.append(layer)
+
+    # The last week may pair its final day with day 0 of the rotation
+    best = None
+    for state, (value, _) in layer.items():
+        first_rest, prev_rest, count, paired = state
+        if count == schedule_type and (paired or (prev_rest and first_rest)):
+            if best is None or value > best[0]:
+                best = (value, state)
+    if best is None:
+        return None, None
+
+    pattern = np.zeros(n_days, dtype=np.int8)
+    state = best[1]
+    for t in range(n_days - 1, -1, -1):
+        pattern[t] = 0 if state[1] else 1
+        state = history[t][state][1]
+    return best[0], pattern
+
+
+def week_rotations(pattern, work_allowed):
+    """The pattern started one or more whole weeks later, where that avoids zero days.
+
+    The rest rules are the same for every week and wrap around the rotation,
+    so a shifted pattern is valid whenever it only works allowed days. The
+    LP rarely needs these, but the integer master often does.
+    """
+    for shift in range(DAYS_PER_WEEK, len(pattern), DAYS_PER_WEEK):
+        rotated = np.roll(pattern, shift)
+        if not (rotated & ~work_allowed).any():
+            yield rotated
+
+
+def seed_columns(work_allowed, schedule_type):
+    """Greedily price patterns until every reachable work day is covered once."""
+    columns = []
+    uncovered = work_allowed.copy()
+    while uncovered.any():
+        value, pattern = price_pattern(uncovered.astype(float), work_allowed, schedule_type)
+        if pattern is None or value <= 0:
+            break
+        columns.append(pattern)
+        uncovered &= pattern == 0
+    return columns
+
+
+def build_master(columns, required_heads, schedule_type, weights):
+    """Cost vector and constraint blocks of the master over the given columns.
+
+    Columns are [patterns..., over per work day..., under per work day...,
+    max_pattern_size], mirroring build_highs_model for a single week.
+    """
+    work_days = np.flatnonzero(required_heads > 0)
+    n_cols = len(columns)
+    n_work = len(work_days)
+    n_vars = n_cols + 2 * n_work + 1
+    over_col = n_cols
+    max_size_col = n_vars - 1
+
+    coverage = sparse.csr_matrix(np.array(columns)[:, work_days].T, dtype=float)
+    required = required_heads[work_days]
+
+    c = np.zeros(n_vars)
+    c[over_col:over_col + n_work] = weights['over']
+    c[over_col + n_work:max_size_col] = weights['under']
+    c[max_size_col] = 1
+
+    identity = sparse.identity(n_work, format='csr')
+    a_eq = sparse.hstack([coverage, -identity, identity, sparse.csr_matrix((n_work, 1))], format='csr')
+    a_ub = [sparse.hstack([-coverage, sparse.csr_matrix((n_work, n_vars - n_cols))], format='csr')]
+    b_ub = [-required]
+
+    if schedule_type == 5:
+        rows = np.arange(n_cols)
+        ones = np.concatenate([np.ones(n_cols), -np.ones(n_cols)])
+        for other_col, bound in ((max_size_col, 0), (over_col, required_heads.max() // 3)):
+            a_ub.append(sparse.csr_matrix(
+                (ones, (np.concatenate([rows, rows]), np.concatenate([rows, np.full(n_cols, other_col)]))),
+                shape=(n_cols, n_vars)
+            ))
+            b_ub.append(np.full(n_cols, bound))
+
+    return c, a_eq, required, sparse.vstack(a_ub, format='csr'), np.concatenate(b_ub)
+
+
+def solve_column_generation(required_heads, schedule_type, weights, time_limit=None,
+                            max_iterations=200, mip_rel_gap=0):
+    """Solve a rotating roster over len(required_heads) // 7 weeks.
+
+    Returns the generated patterns (0/1 arrays over the rotation), the worker
+    count per pattern, the solver status, the integer objective and the LP
+    bound from the last master relaxation.
+    """
+    started = time.monotonic()
+    required_heads = np.asarray(required_heads, dtype=float)
+    if len(required_heads) == 0 or len(required_heads) % DAYS_PER_WEEK:
+        raise ValueError("Required heads must cover whole weeks")
+
+    work_allowed = required_heads > 0
+    n_work = int(work_allowed.sum())
+    columns, seen = [], set()
+
+    def add_column(pattern):
+        for column in (pattern, *week_rotations(pattern, work_allowed)):
+            if column.tobytes() not in seen:
+                columns.append(column)
+                seen.add(column.tobytes())
+
+    for pattern in seed_columns(work_allowed, schedule_type):
+        add_column(pattern)
+    if not columns:
+        raise Exception("Could not generate valid patterns with given constraints")
+
+    converged = False
+    for iteration in range(1, max_iterations + 1):
+        c, a_eq, b_eq, a_ub, b_ub = build_master(columns, required_heads, schedule_type, weights)
+        lp = linprog(c, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=b_eq, bounds=(0, None), method='highs')
+        if lp.status != 0:
+            raise Exception("No feasible solution found")
+
+        # Reduced cost of a new column is -pattern . (balance dual - no-understaffing dual)
+        day_weights = np.zeros(len(required_heads))
+        day_weights[work_allowed] = lp.eqlin.marginals - lp.ineqlin.marginals[:n_work]
+        value, pattern = price_pattern(day_weights, work_allowed, schedule_type)
+        if pattern is None or value <= REDUCED_COST_TOLERANCE or pattern.tobytes() in seen:
+            converged = True
+            break
+        add_column(pattern)
+
+        if time_limit is not None and time.monotonic() - started > time_limit / 2:
+            break
+
+    c, a_eq, b_eq, a_ub, b_ub = build_master(columns, required_heads, schedule_type, weights)
+    integrality = np.zeros(len(c))
+    integrality[:len(columns)] = 1
+    options = {'disp': False, 'mip_rel_gap': mip_rel_gap}
+    if time_limit is not None:
+        options['time_limit'] = max(time_limit - (time.monotonic() - started), 1)
+
+    res = milp(
+        c,
+        constraints=[LinearConstraint(a_eq, b_eq, b_eq), LinearConstraint(a_ub, -np.inf, b_ub)],
+        integrality=integrality,
+        bounds=Bounds(0, np.inf),
+        options=options
+    )
+    if res.status == 0:
+        solver_status = 'optimal'
+    elif res.status == 1 and res.x is not None:
+        solver_status = 'timed_out'
+    else:
+        raise Exception("No feasible solution found")
+
+    return {
+        'patterns': columns,
+        'counts': [int(count) for count in np.rint(res.x[:len(columns)])],
+        'solver_status': solver_status,
+        'objective': res.fun,
+        'lp_bound': lp.fun,
+        'iterations': iteration,
+        'converged': converged
+    }
@@ -0,0 +1,101 @@
+"""Per-department data versions and the strong ETags derived from them.
+
+Every route that changes employees or schedules bumps the data_version of
+the departments involved, in the same transaction as the change. Listing
+endpoints hash the caller's department versions together with the request
+path and query string. When If-None-Match matches that hash, they can
+answer 304 without loading or serializing any rows.
+
+Listings also embed each department's owner, job classes and their
+metrics. Mapper events bump the owning departments when those rows are
+written through the ORM, inside the same flush. Bulk query.update()/delete()
+on them bypass the events and must call bump_department_versions().
+"""
+from flask import request
+from sqlalchemy import event, inspect as sa_inspect, select, update
+from models import db, Department, JobClass, Metric, User, job_class_metrics
+from config import app
+import hashlib
+
+
+def bump_department_versions(*department_ids):
+    """Increment data_version for the given departments; commit with the change."""
+    ids = {department_id for department_id in department_ids if department_id is not None}
+    if ids:
+        Department.query.filter(Department.id.in_(ids)) \
+            .update({Department.data_version: Department.data_version + 1}, synchronize_session=False)
+
+
+def department_versions(user_id):
+    """(id, data_version) for every department the user owns, in one query."""
+    return db.session.query(Department.id, Department.data_version) \
+        .filter(Department.user_id == user_id).order_by(Department.id).all()
+
+
+def listing_etag(versions):
+    """Strong ETag for this request URL over the given department versions."""
+    key = repr((
+        app.config['ETAG_SALT'],
+        request.path,
+        sorted(request.args.items(multi=True)),
+        [tuple(version) for version in versions]
+    ))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def not_modified(etag):
+    """A 304 response when the client already holds etag, else None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = app.response_class(status=304)
+    set_etag(response, etag)
+    return response
+
+
+def set_etag(response, etag):
+    response.set_etag(etag)
+    # Always revalidate, never serve from cache unchecked
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _bump_where(connection, condition):
+    departments = Department.__table__
+    connection.execute(
+        update(departments).where(condition).values(data_version=departments.c.data_version + 1)
+    )
+
+
+def _bump_owned_departments(mapper, connection, target):
+    _bump_where(connection, Department.__table__.c.user_id == target.id)
+
+
+def _bump_own_department(mapper, connection, target):
+    # Both departments when a job class moves between them
+    history = sa_inspect(target).attrs['department_id'].history
+    ids = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+    _bump_where(connection, Department.__table__.c.id.in_(ids))
+
+
+def _bump_departments_using_metric(mapper, connection, target):
+    job_classes = JobClass.__table__
+    _bump_where(connection, Department.__table__.c.id.in_(
+        select(job_classes.c.department_id)
+        .join(job_class_metrics, job_class_metrics.c.job_class_id == job_classes.c.id)
+        .where(job_class_metrics.c.metric_id == target.id)
+    ))
+
+
+def _bump_edited_department(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in ('name', 'description', 'user_id')):
+        _bump_where(connection, Department.__table__.c.id == target.id)
+
+
+event.listen(User, 'after_update', _bump_owned_departments)
+event.listen(Department, 'after_update', _bump_edited_department)
+for event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(JobClass, event_name, _bump_own_department)
+# Before delete, while the metric's job class links still exist
+for event_name in ('after_update', 'before_delete'):
+    event.listen(Metric, event_name, _bump_departments_using_metric)
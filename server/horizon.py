@@ -0,0 +1,184 @@
+"""Rolling-horizon rosters over many calendar weeks.
+
+Crews persist from week to week, so rest rules are checked where weeks
+actually meet. The single-week model wraps Saturday around to the same
+week's Sunday. Here a week passes the rest rule in one of two ways:
+- it has two consecutive rest days of its own, or
+- it rests on Saturday and the crew also rests on the following Sunday.
+
+Crews that end the horizon owing a Sunday rest are reported so the next
+horizon can start them on a rest day.
+
+Weeks are solved one at a time with HiGHS. Each week receives the crews
+from the week before, grouped by whether they still owe a Sunday rest.
+Existing crews must all be rostered, and new crews can be added when
+demand rises. Crews are never released: they stand for staff who stay on
+the roster, so a week whose demand falls is overstaffed and pays the over
+weight instead. Letting the model drop crews for free would also let it
+swap a crew that owes a Sunday rest for a new one, which is the seam rule
+this module exists to enforce. Each week's model has at most three columns
+per work pattern, so the total cost grows linearly with the number of weeks.
+"""
+from collections import deque
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+DAYS_PER_WEEK = 7
+FULL_WEEK = (1 << DAYS_PER_WEEK) - 1
+SUNDAY = 1 << 0
+SATURDAY = 1 << 6
+
+FREE = 'free'
+NEEDS_SUNDAY = 'needs_sunday'
+NEW = 'new'
+
+
+def has_internal_rest_pair(mask):
+    """True if the week rests on two consecutive days without wrapping around."""
+    rest = FULL_WEEK & ~mask
+    return bool(rest & (rest >> 1))
+
+
+def week_masks(required_week, schedule_type):
+    """Work masks usable in one week of the horizon."""
+    zero_mask = sum(1 << d for d, req in enumerate(required_week) if req <= 0)
+    return [
+        mask for mask in range(FULL_WEEK + 1)
+        if bin(mask).count('1') == schedule_type and not mask & zero_mask
+        and (has_internal_rest_pair(mask) or not mask & SATURDAY)
+    ]
+
+
+def solve_week(required_week, schedule_type, weights, carry, time_limit=None, mip_rel_gap=0):
+    """Roster one week given the crews carried in from the previous week.
+
+    carry maps FREE / NEEDS_SUNDAY to crew counts, and every carried worker
+    is rostered. Returns a list of (state, mask, workers) allocations and
+    the solver status and objective.
+    """
+    masks = week_masks(required_week, schedule_type)
+    if not masks:
+        raise Exception("Could not generate valid patterns with given constraints")
+
+    columns = [(NEW, mask) for mask in masks]
+    for state in (FREE, NEEDS_SUNDAY):
+        if carry.get(state):
+            allowed = [mask for mask in masks if state == FREE or not mask & SUNDAY]
+            if not allowed:
+                raise Exception(f"No valid pattern for crews carried in as {state}")
+            columns.extend((state, mask) for mask in allowed)
+
+    required = np.asarray(required_week, dtype=float)
+    work_days = np.flatnonzero(required > 0)
+    n_cols = len(columns)
+    n_work = len(work_days)
+    n_vars = n_cols + 2 * n_work
+
+    incidence = ((np.array([mask for _, mask in columns])[:, None] >> np.arange(DAYS_PER_WEEK)) & 1)
+    coverage = sparse.csr_matrix(incidence[:, work_days].T, dtype=float)
+    identity = sparse.identity(n_work, format='csr')
+
+    c = np.zeros(n_vars)
+    c[n_cols:n_cols + n_work] = weights['over']
+    c[n_cols + n_work:] = weights['under']
+
+    constraints = [
+        LinearConstraint(sparse.hstack([coverage, -identity, identity], format='csr'),
+                         required[work_days], required[work_days]),
+        LinearConstraint(sparse.hstack([coverage, sparse.csr_matrix((n_work, 2 * n_work))], format='csr'),
+                         required[work_days], np.inf)
+    ]
+    # Every carried crew is rostered this week
+    for state in (FREE, NEEDS_SUNDAY):
+        if carry.get(state):
+            row = np.zeros(n_vars)
+            row[[i for i, (column_state, _) in enumerate(columns) if column_state == state]] = 1
+            constraints.append(LinearConstraint(row, carry[state], carry[state]))
+
+    integrality = np.zeros(n_vars)
+    integrality[:n_cols] = 1
+    options = {'disp': False, 'mip_rel_gap': mip_rel_gap}
+    if time_limit is not None:
+        options['time_limit'] = time_limit
+
+    res = milp(c, constraints=constraints, integrality=integrality, bounds=Bounds(0, np.inf), options=options)
+    if res.status == 0:
+        status = 'optimal'
+    elif res.status == 1 and res.x is not None:
+        status = 'timed_out'
+    else:
+        raise Exception("No feasible solution found")
+
+    counts = np.rint(res.x[:n_cols]).astype(int)
+    allocations = [(state, mask, int(count)) for (state, mask), count in zip(columns, counts) if count > 0]
+    return allocations, status, res.fun
+
+
+def _assign(crews, allocations):
+    """Split carried crews across this week's masks, first come first served."""
+    waiting = deque(crews)
+    assigned = []
+    for mask, workers in allocations:
+        while workers > 0:
+            crew = waiting.popleft()
+            take = min(workers, crew['workers'])
+            if take < crew['workers']:
+                waiting.appendleft({'workers': crew['workers'] - take, 'history': crew['history']})
+            assigned.append({'workers': take, 'history': crew['history'] + [mask]})
+            workers -= take
+    return assigned
+
+
+def solve_rolling_horizon(required_heads, schedule_type, weights, time_limit=None, mip_rel_gap=0):
+    """Roster len(required_heads) // 7 consecutive weeks one week at a time.
+
+    Returns crews as {'workers', 'history', 'needs_sunday'} where history
+    holds one work mask per week (None before the crew was added) and
+    needs_sunday marks crews that must rest on the Sunday after the horizon.
+    Also returns the overall solver status and the summed objective.
+    """
+    started = time.monotonic()
+    if len(required_heads) == 0 or len(required_heads) % DAYS_PER_WEEK:
+        raise ValueError("Required heads must cover whole weeks")
+    n_weeks = len(required_heads) // DAYS_PER_WEEK
+
+    crews = {FREE: [], NEEDS_SUNDAY: []}
+    status = 'optimal'
+    objective = 0.0
+    for week in range(n_weeks):
+        required_week = required_heads[week * DAYS_PER_WEEK:(week + 1) * DAYS_PER_WEEK]
+        carry = {state: sum(crew['workers'] for crew in crews[state]) for state in crews}
+
+        week_limit = None
+        if time_limit is not None:
+            week_limit = max((time_limit - (time.monotonic() - started)) / (n_weeks - week), 0.1)
+        try:
+            allocations, week_status, week_objective = solve_week(
+                required_week, schedule_type, weights, carry, week_limit, mip_rel_gap
+            )
+        except Exception as e:
+            raise Exception(f"Week {week + 1}: {str(e)}")
+        if week_status != 'optimal':
+            status = week_status
+        objective += week_objective
+
+        rostered = []
+        for state in (FREE, NEEDS_SUNDAY):
+            rostered += _assign(crews[state], [(mask, n) for s, mask, n in allocations if s == state])
+        rostered += [{'workers': n, 'history': [None] * week + [mask]}
+                     for s, mask, n in allocations if s == NEW]
+
+        crews = {FREE: [], NEEDS_SUNDAY: []}
+        for crew in rostered:
+            state = FREE if has_internal_rest_pair(crew['history'][-1]) else NEEDS_SUNDAY
+            crews[state].append(crew)
+
+    return {
+        'crews': [{**crew, 'needs_sunday': state == NEEDS_SUNDAY} for state in crews for crew in crews[state]],
+        'solver_status': status,
+        'objective': objective,
+        'weeks': n_weeks
+    }
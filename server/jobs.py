@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from sqlalchemy import or_
+
+from config import app
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+JOB_CANCELLERS = {}
+PENDING_STATUSES = ('queued', 'running')
+
+# Identifies this process as the owner of the jobs it runs
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[-64:]
+
+executor = ThreadPoolExecutor(max_workers=app.config['JOB_WORKERS'], thread_name_prefix='job')
+_resume_lock = threading.Lock()
+_resumed = False
+
+
+def job_handler(kind, cancel=None):
+    """Register a function that turns (payload, job_id) into a JSON-able result.
+
+    ``cancel`` is called with the job id to interrupt a running job.
+    """
+    def register(f):
+        JOB_HANDLERS[kind] = f
+        if cancel is not None:
+            JOB_CANCELLERS[kind] = cancel
+        return f
+    return register
+
+
+def submit_job(kind, payload, user_id):
+    """Persist a new job and hand it to the background executor."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job = Job(id=uuid.uuid4().hex, kind=kind, status='queued', payload=payload, user_id=user_id)
+    db.session.add(job)
+    db.session.commit()
+
+    executor.submit(run_job, job.id)
+    return job
+
+
+def run_job(job_id):
+    """Execute a persisted job inside its own application context."""
+    with app.app_context():
+        # Claim the job atomically so a resumed copy cannot run it twice
+        now = datetime.utcnow()
+        claimed = Job.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'started_at': now, 'owner': OWNER_ID, 'heartbeat_at': now}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(Job, job_id)
+        kind = job.kind
+
+        try:
+            outcome = {'status': 'succeeded', 'result': JOB_HANDLERS[kind](job.payload, job.id)}
+        except Exception as e:
+            db.session.rollback()
+            outcome = {'status': 'failed', 'error': str(e)}
+        outcome['finished_at'] = datetime.utcnow()
+
+        # Only a job still running under this process's lease is finished
+        # here; a cancel that landed while the handler ran keeps the job
+        # cancelled, and a job another process reclaimed is left to it
+        finished = Job.query.filter_by(id=job_id, status='running', owner=OWNER_ID).update(outcome)
+        db.session.commit()
+        if not finished:
+            logger.info(f"Job {job_id} ({kind}) was cancelled or reclaimed while running; discarding its outcome")
+        elif outcome['status'] == 'failed':
+            logger.error(f"Job {job_id} ({kind}) failed: {outcome['error']}")
+
+
+def cancel_job(job):
+    """Cancel a queued job, or interrupt a running one through its cancel hook.
+
+    Running jobs without a cancel hook cannot be stopped and are left alone.
+    Returns False when the job was not cancelled.
+    """
+    if job.status == 'running' and job.kind not in JOB_CANCELLERS:
+        return False
+
+    # Conditional, so a job that finished in the meantime keeps its result
+    cancelled = Job.query.filter(Job.id == job.id, Job.status.in_(PENDING_STATUSES)) \
+        .update({'status': 'cancelled', 'finished_at': datetime.utcnow()}, synchronize_session=False)
+    was_running = job.status == 'running'
+    db.session.commit()
+    if not cancelled:
+        return False
+
+    if was_running:
+        JOB_CANCELLERS[job.kind](job.id)
+    return True
+
+
+def renew_leases():
+    """Mark this process's running jobs as still alive."""
+    Job.query.filter_by(owner=OWNER_ID, status='running') \
+        .update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+
+
+def reclaim_expired_jobs():
+    """Requeue running jobs whose owner stopped renewing its lease; returns their ids."""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['JOB_LEASE_SECONDS'])
+    expired = or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < cutoff)
+    job_ids = [job_id for (job_id,) in db.session.query(Job.id).filter(Job.status == 'running', expired)]
+    if not job_ids:
+        return []
+    # Conditional again, in case the owner renewed since the select
+    Job.query.filter(Job.id.in_(job_ids), Job.status == 'running', expired) \
+        .update({'status': 'queued', 'owner': None}, synchronize_session=False)
+    db.session.commit()
+    return [job_id for (job_id,) in db.session.query(Job.id).filter(Job.id.in_(job_ids), Job.status == 'queued')]
+
+
+def resume_pending_jobs():
+    """Submit queued jobs and requeue running jobs whose owner's lease expired.
+
+    Running jobs that another live process keeps renewing are left alone.
+    Queued jobs are safe to submit more than once: run_job claims each
+    job atomically, so only one copy runs it.
+    """
+    reclaimed = reclaim_expired_jobs()
+    queued = [job_id for (job_id,) in db.session.query(Job.id).filter_by(status='queued')]
+    for job_id in queued:
+        executor.submit(run_job, job_id)
+    if reclaimed:
+        logger.info(f"Requeued {len(reclaimed)} jobs whose owner stopped renewing its lease")
+    if queued:
+        logger.info(f"Resumed {len(queued)} queued jobs")
+
+
+def keep_leases():
+    """Renew this process's leases and take over expired ones, forever."""
+    while True:
+        time.sleep(app.config['JOB_HEARTBEAT_SECONDS'])
+        try:
+            with app.app_context():
+                renew_leases()
+                for job_id in reclaim_expired_jobs():
+                    executor.submit(run_job, job_id)
+        except Exception as e:
+            logger.error(f"Job lease upkeep failed: {str(e)}")
+
+
+@app.before_request
+def resume_jobs_once():
+    global _resumed
+    if _resumed:
+        return
+    with _resume_lock:
+        if not _resumed:
+            _resumed = True
+            resume_pending_jobs()
+            threading.Thread(target=keep_leases, name='job-leases', daemon=True).start()
@@ -0,0 +1,26 @@
+"""Add data_version to departments for listing ETags
+
+Revision ID: 5f2a8c4d9e13
+Revises: 3b7e9d1c5a20
+Create Date: 2026-10-18 14:03:27.551942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a8c4d9e13'
+down_revision = '3b7e9d1c5a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
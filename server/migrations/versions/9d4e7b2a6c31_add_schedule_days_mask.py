@@ -0,0 +1,36 @@
+"""Add days_mask bitmask to schedules
+
+Revision ID: 9d4e7b2a6c31
+Revises: 5f2a8c4d9e13
+Create Date: 2026-10-18 16:21:08.204517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4e7b2a6c31'
+down_revision = '5f2a8c4d9e13'
+branch_labels = None
+depends_on = None
+
+DAYS = ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')
+
+
+def upgrade():
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('days_mask', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_schedules_days_mask'), ['days_mask'], unique=False)
+
+    # Bit i is DAYS[i]; null day flags count as rest days
+    op.execute(
+        'UPDATE schedules SET days_mask = '
+        + ' + '.join(f'CASE WHEN {day} THEN {1 << i} ELSE 0 END' for i, day in enumerate(DAYS))
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_schedules_days_mask'))
+        batch_op.drop_column('days_mask')
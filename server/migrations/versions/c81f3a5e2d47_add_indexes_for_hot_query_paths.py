@@ -0,0 +1,71 @@
+"""Add indexes for department scoping, metric history, schedules and demand
+
+Revision ID: c81f3a5e2d47
+Revises: 9d4e7b2a6c31
+Create Date: 2026-10-18 17:48:52.930186
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f3a5e2d47'
+down_revision = '9d4e7b2a6c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unique indexes need the duplicates gone first. Employees keep their
+    # oldest schedule, the one the app already reads. Demand rows for the
+    # same date were summed by the scheduler, so fold them into one row.
+    op.execute(
+        'DELETE FROM schedules WHERE id NOT IN (SELECT MIN(id) FROM schedules GROUP BY employee_id)'
+    )
+    op.execute(
+        'UPDATE daily_demand SET total_cases = '
+        '(SELECT SUM(d.total_cases) FROM daily_demand d WHERE d.date = daily_demand.date) '
+        'WHERE id IN (SELECT MIN(id) FROM daily_demand GROUP BY date HAVING COUNT(*) > 1)'
+    )
+    op.execute(
+        'DELETE FROM daily_demand WHERE id NOT IN (SELECT MIN(id) FROM daily_demand GROUP BY date)'
+    )
+
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_departments_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('job_classes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_classes_department_id'), ['department_id'], unique=False)
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_employees_job_class_id'), ['job_class_id'], unique=False)
+
+    with op.batch_alter_table('employee_metrics', schema=None) as batch_op:
+        batch_op.create_index('ix_employee_metrics_employee_id_metric_id_date', ['employee_id', 'metric_id', 'date'], unique=False)
+
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_schedules_employee_id'), ['employee_id'], unique=True)
+
+    with op.batch_alter_table('daily_demand', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_demand_date'), ['date'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('daily_demand', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_daily_demand_date'))
+
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_schedules_employee_id'))
+
+    with op.batch_alter_table('employee_metrics', schema=None) as batch_op:
+        batch_op.drop_index('ix_employee_metrics_employee_id_metric_id_date')
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_employees_job_class_id'))
+
+    with op.batch_alter_table('job_classes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_classes_department_id'))
+
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_departments_user_id'))
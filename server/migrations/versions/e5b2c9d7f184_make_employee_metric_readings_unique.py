@@ -0,0 +1,33 @@
+"""Make (employee, metric, date) unique on employee_metrics for upserts
+
+Revision ID: e5b2c9d7f184
+Revises: c81f3a5e2d47
+Create Date: 2026-10-18 19:05:16.772309
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2c9d7f184'
+down_revision = 'c81f3a5e2d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the most recently written reading for each employee, metric and day
+    op.execute(
+        'DELETE FROM employee_metrics WHERE id NOT IN '
+        '(SELECT MAX(id) FROM employee_metrics GROUP BY employee_id, metric_id, date)'
+    )
+    with op.batch_alter_table('employee_metrics', schema=None) as batch_op:
+        batch_op.drop_index('ix_employee_metrics_employee_id_metric_id_date')
+        batch_op.create_index('ix_employee_metrics_employee_id_metric_id_date', ['employee_id', 'metric_id', 'date'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('employee_metrics', schema=None) as batch_op:
+        batch_op.drop_index('ix_employee_metrics_employee_id_metric_id_date')
+        batch_op.create_index('ix_employee_metrics_employee_id_metric_id_date', ['employee_id', 'metric_id', 'date'], unique=False)
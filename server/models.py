@@ -2,6 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy_serializer import SerializerMixin
 from werkzeug.security import check_password_hash, generate_password_hash
 from flask_login import UserMixin
+from sqlalchemy import event, inspect
 import re
 import secrets
 from datetime import datetime,timedelta
@@ -58,12 +59,15 @@ class Department(db.Model, SerializerMixin):
     name = db.Column(db.String, nullable=False)
     description = db.Column(db.String)
 
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     user = db.relationship('User', back_populates='departments')
 
+    # Bumped whenever anything the department's listings embed changes; feeds listing ETags
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
     job_classes = db.relationship('JobClass', back_populates='department', cascade='all, delete-orphan')
 
-    serialize_rules = ('-user.departments', '-job_classes.department',)
+    serialize_rules = ('-user.departments', '-job_classes.department', '-data_version',)
 
 job_class_metrics = db.Table('job_class_metrics',
     db.Column('job_class_id', db.Integer, db.ForeignKey('job_classes.id', ondelete='CASCADE'), primary_key=True),
@@ -78,7 +82,7 @@ class JobClass(db.Model, SerializerMixin):
     description = db.Column(db.Text)
     base_pay_rate = db.Column(db.Float)
 
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False, index=True)
     department = db.relationship('Department', back_populates='job_classes')
 
     employees = db.relationship('Employee', back_populates='job_class', cascade='all, delete-orphan')
@@ -108,7 +112,7 @@ class Employee(db.Model, SerializerMixin):
     hire_date = db.Column(db.Date, nullable=False)
     hourly_rate = db.Column(db.Float)
 
-    job_class_id = db.Column(db.Integer, db.ForeignKey('job_classes.id'), nullable=False)
+    job_class_id = db.Column(db.Integer, db.ForeignKey('job_classes.id'), nullable=False, index=True)
     job_class = db.relationship('JobClass', back_populates='employees')
 
     metric_values = db.relationship('EmployeeMetric', back_populates='employee', cascade='all, delete-orphan')
@@ -118,6 +122,11 @@ class Employee(db.Model, SerializerMixin):
 
 class EmployeeMetric(db.Model, SerializerMixin):
     __tablename__ = 'employee_metrics'
+    # One reading per employee, metric and day; ingestion upserts against it.
+    # Leads with employee_id, so it also serves lookups by employee alone
+    __table_args__ = (
+        db.Index('ix_employee_metrics_employee_id_metric_id_date', 'employee_id', 'metric_id', 'date', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     value = db.Column(db.Float, nullable=False)
@@ -131,6 +140,10 @@ class EmployeeMetric(db.Model, SerializerMixin):
 
     serialize_rules = ('-employee.metric_values', '-metric',)
 
+# Bit i of Schedule.days_mask is SCHEDULE_DAYS[i], the same layout as the solver's pattern masks
+SCHEDULE_DAYS = ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')
+SCHEDULE_MASKS = range(1 << len(SCHEDULE_DAYS))
+
 class Schedule(db.Model, SerializerMixin):
     __tablename__ = 'schedules'
 
@@ -142,15 +155,93 @@ class Schedule(db.Model, SerializerMixin):
     friday = db.Column(db.Boolean, default=False)
     saturday = db.Column(db.Boolean, default=False)
     sunday = db.Column(db.Boolean, default=False)
+    # The seven day columns packed into one integer, kept in sync on every ORM flush
+    days_mask = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
 
-    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False, unique=True, index=True)
     employee = db.relationship('Employee', back_populates='schedule')
 
     serialize_rules = ('-employee.schedule',)
 
+    @staticmethod
+    def mask_for(days):
+        """Mask for {day name: working} flags; missing or null days count as rest days."""
+        return sum(1 << i for i, day in enumerate(SCHEDULE_DAYS) if days.get(day))
+
+    @staticmethod
+    def days_for(mask):
+        """{day name: working} flags for a mask."""
+        return {day: bool(mask >> i & 1) for i, day in enumerate(SCHEDULE_DAYS)}
+
+    def set_days_mask(self, mask):
+        for day, working in Schedule.days_for(mask).items():
+            setattr(self, day, working)
+        self.days_mask = mask
+
+    def sync_days_mask(self):
+        """Make days_mask and the day columns agree.
+
+        A days_mask set on its own is copied to the day columns; otherwise
+        the mask is recomputed from them.
+        """
+        state = inspect(self)
+        days_changed = any(state.attrs[day].history.has_changes() for day in SCHEDULE_DAYS)
+        if state.attrs.days_mask.history.has_changes() and not days_changed:
+            self.set_days_mask(self.days_mask)
+        else:
+            self.days_mask = Schedule.mask_for({day: getattr(self, day) for day in SCHEDULE_DAYS})
+
+    # The filters are INs over the matching masks (at most 128), which the
+    # days_mask index can serve; bitwise expressions would force a table scan
+    @staticmethod
+    def works_all(mask):
+        """SQL filter: works every day in mask."""
+        return Schedule.days_mask.in_([m for m in SCHEDULE_MASKS if m & mask == mask])
+
+    @staticmethod
+    def works_any(mask):
+        """SQL filter: works at least one day in mask."""
+        return Schedule.days_mask.in_([m for m in SCHEDULE_MASKS if m & mask])
+
+    @staticmethod
+    def weekday_headcounts(mask_counts):
+        """{day name: schedules working it} from (days_mask, count) rows of a GROUP BY days_mask."""
+        headcounts = dict.fromkeys(SCHEDULE_DAYS, 0)
+        for mask, count in mask_counts:
+            for i, day in enumerate(SCHEDULE_DAYS):
+                if mask >> i & 1:
+                    headcounts[day] += count
+        return headcounts
+
+@event.listens_for(Schedule, 'before_insert')
+@event.listens_for(Schedule, 'before_update')
+def sync_schedule_days_mask(mapper, connection, target):
+    target.sync_days_mask()
+
 class DailyDemand(db.Model):
     __tablename__ = 'daily_demand'
 
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False)
-    total_cases = db.Column(db.Float, nullable=False)
\ No newline at end of file
+    date = db.Column(db.Date, nullable=False, unique=True, index=True)
+    total_cases = db.Column(db.Float, nullable=False)
+
+class Job(db.Model, SerializerMixin):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default='queued', index=True)
+    payload = db.Column(db.JSON, nullable=False)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Process running the job and when it last renewed its lease
+    owner = db.Column(db.String(64))
+    heartbeat_at = db.Column(db.DateTime)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user = db.relationship('User')
+
+    serialize_only = ('id', 'kind', 'status', 'error', 'created_at', 'started_at', 'finished_at')
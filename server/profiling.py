@@ -0,0 +1,141 @@
+"""Opt-in cProfile profiling of single API requests, for admins only.
+
+Send ``X-Profile: <mode>`` or ``?profile=<mode>`` with any /labinv/api/
+request. The mode chooses the output:
+- save: the stats are saved under PROFILE_DIR and the id is returned in
+  X-Profile-Id (1 and true also mean save),
+- prof: the response body is replaced with the pstats file,
+- collapsed: the response body is replaced with collapsed stacks.
+
+Every profiled response carries the top functions by cumulative time in
+X-Profile-Summary. Requests without the header or parameter only pay for
+one dict lookup.
+
+cProfile only sees the request thread. CBC time therefore shows up as
+waiting on the solver worker's pipe.
+"""
+from datetime import datetime
+from flask import Response, g, request
+from flask_login import current_user
+from config import app
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = {'1': 'save', 'true': 'save', 'save': 'save', 'prof': 'prof', 'collapsed': 'collapsed'}
+
+
+def requested_mode():
+    mode = request.headers.get('X-Profile') or request.args.get('profile')
+    if not mode or not request.path.startswith('/labinv/api/'):
+        return None
+    return PROFILE_MODES.get(mode.lower())
+
+
+def profile_path(profile_id, fmt='prof'):
+    return os.path.join(app.config['PROFILE_DIR'], f"{profile_id}.{fmt}")
+
+
+def summarize(stats, limit):
+    """One-line summary of the top functions by cumulative time."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    parts = []
+    for (filename, line, name), (_, calls, _, cumtime, _) in rows:
+        module = os.path.splitext(os.path.basename(filename))[0] if filename != '~' else 'builtin'
+        parts.append(f"{cumtime * 1e3:.1f}ms {calls}x {module}:{name}")
+    # Header values must stay printable ASCII
+    return '; '.join(parts).encode('ascii', 'replace').decode()
+
+
+def collapse(stats):
+    """Approximate collapsed stacks: each function under its heaviest caller chain.
+
+    cProfile records caller/callee pairs rather than full stacks, so every
+    function's own time is attributed to the single path made of the
+    callers that spent the most time calling it.
+    """
+    def label(func):
+        filename, line, name = func
+        module = os.path.splitext(os.path.basename(filename))[0] if filename != '~' else 'builtin'
+        return f"{module}:{name}"
+
+    lines = []
+    for func, (_, _, tottime, _, callers) in stats.stats.items():
+        if tottime <= 0:
+            continue
+        stack = [func]
+        seen = {func}
+        while callers:
+            caller = max(callers, key=lambda c: callers[c][3])
+            if caller in seen:
+                break
+            stack.append(caller)
+            seen.add(caller)
+            callers = stats.stats[caller][4] if caller in stats.stats else {}
+        lines.append(f"{';'.join(label(f) for f in reversed(stack))} {int(tottime * 1e6)}")
+    return '\n'.join(sorted(lines)) + '\n'
+
+
+@app.before_request
+def start_request_profile():
+    mode = requested_mode()
+    if mode is None:
+        return
+    if not (current_user.is_authenticated and current_user.is_admin):
+        return
+    g.profile_mode = mode
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+
+@app.after_request
+def finish_request_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.disable()
+
+    stats = pstats.Stats(profiler)
+    mode = g.pop('profile_mode')
+    profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{request.endpoint or 'unknown'}-{uuid.uuid4().hex[:8]}"
+    summary = summarize(stats, app.config['PROFILE_TOP_N'])
+
+    if mode == 'save':
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        stats.dump_stats(profile_path(profile_id))
+        logger.info(f"Saved profile {profile_id} for {request.method} {request.path}")
+    elif mode == 'prof':
+        response = Response(marshal.dumps(stats.stats), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = f'attachment; filename="{profile_id}.prof"'
+    else:
+        response = Response(collapse(stats), mimetype='text/plain')
+        response.headers['Content-Disposition'] = f'attachment; filename="{profile_id}.collapsed"'
+
+    response.headers['X-Profile-Id'] = profile_id
+    response.headers['X-Profile-Summary'] = summary
+    return response
+
+
+@app.teardown_request
+def stop_request_profile(exc):
+    # after_request is skipped on unhandled errors; never leave a profiler running
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+
+def load_profile(profile_id, fmt):
+    """Read a saved profile as .prof bytes or collapsed stacks, or None if missing."""
+    path = profile_path(os.path.basename(profile_id))
+    if not os.path.exists(path):
+        return None
+    if fmt == 'prof':
+        with open(path, 'rb') as f:
+            return f.read()
+    return collapse(pstats.Stats(path, stream=io.StringIO()))
@@ -0,0 +1,96 @@
+"""Per-request SQL statistics gathered from SQLAlchemy engine events.
+
+Every response gets two headers:
+- X-DB-Query-Count: the number of statements executed,
+- X-DB-Time-Ms: the total time spent executing them.
+
+Streamed responses get neither. Their headers are sent before the body
+runs its queries, so the counts would only cover the view itself.
+
+When one statement runs SQL_REPEAT_THRESHOLD times or more in a request,
+it is logged as a likely N+1 query and counted in
+X-DB-Repeated-Statements. Lazy loads repeat the same SQL with different
+parameters, which is how they are spotted.
+
+Statements slower than SQL_SLOW_QUERY_MS are logged with their
+parameters and the route that ran them.
+"""
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import app
+from metrics import registry
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DB_QUERY_SECONDS = registry.histogram(
+    'db_query_seconds', 'SQL statement execution time', ('endpoint',)
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    'db_queries_per_request', 'SQL statements executed per request', ('endpoint',),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+DB_REPEATED_STATEMENTS = registry.counter(
+    'db_repeated_statements_total', 'Requests with a statement repeated past the N+1 threshold', ('endpoint',)
+)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and app.config['SQL_QUERY_STATS'] and 'sql_stats' in g:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'sql_stats' in g):
+        return
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    stats = g.sql_stats
+    stats['count'] += 1
+    stats['time'] += elapsed
+    stats['statements'][statement] += 1
+    DB_QUERY_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown')
+
+    if elapsed * 1e3 >= app.config['SQL_SLOW_QUERY_MS']:
+        logger.warning(
+            "Slow query (%.1fms) in %s %s [%s]: %s params=%r",
+            elapsed * 1e3, request.method, request.path, request.endpoint, statement, parameters
+        )
+
+
+@app.before_request
+def start_query_stats():
+    if app.config['SQL_QUERY_STATS']:
+        g.sql_stats = {'count': 0, 'time': 0.0, 'statements': Counter()}
+
+
+@app.after_request
+def report_query_stats(response):
+    stats = g.pop('sql_stats', None)
+    if stats is None or response.is_streamed:
+        return response
+    endpoint = request.endpoint or 'unknown'
+
+    threshold = app.config['SQL_REPEAT_THRESHOLD']
+    repeated = [(statement, n) for statement, n in stats['statements'].items() if n >= threshold]
+    for statement, n in repeated:
+        logger.warning(
+            "Likely N+1 in %s %s [%s]: statement ran %d times: %s",
+            request.method, request.path, endpoint, n, statement
+        )
+    if repeated:
+        DB_REPEATED_STATEMENTS.inc(endpoint=endpoint)
+    DB_QUERIES_PER_REQUEST.observe(stats['count'], endpoint=endpoint)
+
+    response.headers['X-DB-Query-Count'] = str(stats['count'])
+    response.headers['X-DB-Time-Ms'] = f"{stats['time'] * 1e3:.2f}"
+    response.headers['X-DB-Repeated-Statements'] = str(len(repeated))
+    return response
@@ -0,0 +1,255 @@
+"""Read-through cache for reference data the routes check on every request.
+
+Cached lookups:
+- the logged-in user, for Flask-Login's user_loader,
+- the department ids each user owns,
+- job class definitions (used for department ownership checks),
+- metric definitions.
+
+Values are plain JSON-compatible data, never ORM instances, so every
+backend can hold them. REFERENCE_CACHE_URL chooses the backend:
+- 'local' (the default) is a per-process LRU/TTL cache,
+- a redis:// URL uses Redis, which the redis package must provide.
+
+Any client with Redis' get/set/delete commands can be passed to
+RedisBackend, so a local stand-in works for tests.
+
+Mapper events collect the keys that inserts, updates and deletes make
+stale. Those keys are dropped at flush and again after commit, which also
+clears entries a concurrent reader refilled in between. Other processes
+that use the local backend only see a change once the entry's TTL runs
+out; use Redis when that window matters. Bulk query.update()/delete()
+bypass mapper events and must call reference_cache.invalidate()
+themselves.
+"""
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from cache import TTLCache
+from config import app
+from metrics import registry
+from models import db, Department, JobClass, Metric, User
+import json
+import logging
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+REFERENCE_CACHE_LOOKUPS = registry.counter(
+    'reference_cache_lookups_total', 'Reference data cache lookups', ('namespace', 'result')
+)
+REFERENCE_CACHE_ERRORS = registry.counter(
+    'reference_cache_errors_total', 'Reference data cache backend errors', ('operation',)
+)
+
+
+class LocalBackend:
+    """Per-process LRU backed by TTLCache."""
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._cache.get(key, MISSING)
+
+    def set(self, key, value, ttl):
+        self._cache.set(key, value, ttl)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._cache.invalidate(key)
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class RedisBackend:
+    """Values stored as JSON under prefixed keys in Redis (or anything that speaks its get/set/delete)."""
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+
+def make_backend(config):
+    url = config['REFERENCE_CACHE_URL']
+    if url == 'local':
+        return LocalBackend(config['REFERENCE_CACHE_SIZE'], config['REFERENCE_CACHE_TTL'])
+    if redis is None:
+        raise Exception("REFERENCE_CACHE_URL points at Redis but the redis package is not installed")
+    return RedisBackend(redis.Redis.from_url(url), config['REFERENCE_CACHE_PREFIX'])
+
+
+class ReferenceCache:
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+
+    def fetch(self, key, loader, ttl=None):
+        """Return the cached value for key, calling loader() and storing its result on a miss.
+
+        Backend failures are logged and fall through to the loader; the
+        cache must never take a request down.
+        """
+        namespace = key.split(':', 1)[0]
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            REFERENCE_CACHE_ERRORS.inc(operation='get')
+            logger.warning("Reference cache get failed for %s: %s", key, e)
+            return loader()
+        if value is not MISSING:
+            REFERENCE_CACHE_LOOKUPS.inc(namespace=namespace, result='hit')
+            return value
+
+        REFERENCE_CACHE_LOOKUPS.inc(namespace=namespace, result='miss')
+        value = loader()
+        try:
+            self.backend.set(key, value, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            REFERENCE_CACHE_ERRORS.inc(operation='set')
+            logger.warning("Reference cache set failed for %s: %s", key, e)
+        return value
+
+    def invalidate(self, *keys):
+        try:
+            self.backend.delete(*keys)
+        except Exception as e:
+            REFERENCE_CACHE_ERRORS.inc(operation='delete')
+            logger.warning("Reference cache delete failed for %s: %s", keys, e)
+
+
+reference_cache = ReferenceCache(make_backend(app.config), app.config['REFERENCE_CACHE_TTL'])
+
+registry.gauge(
+    'reference_cache_entries', 'Reference data entries held by the local cache backend',
+    collect=lambda: {(): len(reference_cache.backend)} if isinstance(reference_cache.backend, LocalBackend) else {}
+)
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+def department_ids_key(user_id):
+    return f"departments:user:{user_id}"
+
+
+def job_class_key(job_class_id):
+    return f"job_class:{job_class_id}"
+
+
+METRICS_KEY = 'metrics:all'
+
+# Secrets (password hash, reset token) stay out of the cache and load on first access
+USER_COLUMNS = ('id', 'username', 'email', 'is_admin', 'has_subscription', 'must_change_password')
+
+
+def cached_user(user_id):
+    """The User for user_id, attached to the session without a query on a cache hit.
+
+    The cached columns are merged into the session as a clean persistent
+    instance, so relationships and uncached columns lazy-load and changes
+    commit as usual.
+    """
+    def load():
+        row = db.session.query(*(getattr(User, column) for column in USER_COLUMNS)) \
+            .filter(User.id == user_id).first()
+        return None if row is None else dict(row._mapping)
+
+    columns = reference_cache.fetch(user_key(user_id), load, ttl=app.config['USER_CACHE_TTL'])
+    if columns is None:
+        return None
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def user_department_ids(user_id):
+    """Ids of the departments the user owns."""
+    return reference_cache.fetch(department_ids_key(user_id), lambda: [
+        department_id for (department_id,) in
+        db.session.query(Department.id).filter(Department.user_id == user_id).order_by(Department.id)
+    ])
+
+
+def job_class_info(job_class_id):
+    """A job class's columns as a dict, or None when it does not exist."""
+    try:
+        job_class_id = int(job_class_id)
+    except (TypeError, ValueError):
+        return None
+
+    def load():
+        row = db.session.query(
+            JobClass.id, JobClass.name, JobClass.description, JobClass.base_pay_rate, JobClass.department_id
+        ).filter(JobClass.id == job_class_id).first()
+        return None if row is None else dict(row._mapping)
+    return reference_cache.fetch(job_class_key(job_class_id), load)
+
+
+def metric_definitions():
+    """Every metric's columns as a list of dicts ordered by id."""
+    return reference_cache.fetch(METRICS_KEY, lambda: [
+        dict(row._mapping) for row in
+        db.session.query(Metric.id, Metric.name, Metric.description, Metric.unit).order_by(Metric.id)
+    ])
+
+
+def _history_values(target, attr):
+    history = sa_inspect(target).attrs[attr].history
+    return set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+
+
+def _stale_keys(target):
+    if isinstance(target, User):
+        return {user_key(target.id)}
+    if isinstance(target, Department):
+        return {department_ids_key(user_id) for user_id in _history_values(target, 'user_id') if user_id is not None}
+    if isinstance(target, JobClass):
+        return {job_class_key(target.id)}
+    if isinstance(target, Metric):
+        return {METRICS_KEY}
+    return set()
+
+
+def _mark_stale(mapper, connection, target):
+    keys = _stale_keys(target)
+    session = sa_inspect(target).session
+    if session is not None:
+        session.info.setdefault('stale_reference_keys', set()).update(keys)
+    reference_cache.invalidate(*keys)
+
+
+for model in (User, Department, JobClass, Metric):
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, event_name, _mark_stale)
+
+
+@event.listens_for(Session, 'after_commit')
+def drop_stale_reference_keys(session):
+    keys = session.info.pop('stale_reference_keys', None)
+    if keys:
+        reference_cache.invalidate(*keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_stale_reference_keys(session):
+    # Already dropped at flush; nothing changed, so nothing more to invalidate
+    session.info.pop('stale_reference_keys', None)
@@ -1,18 +1,69 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 import numpy as np
 from collections import defaultdict
 import pulp
-from flask_login import login_required
+from scipy import sparse
+from scipy.optimize import milp, LinearConstraint, Bounds
+from flask_login import login_required, current_user
 from config import app
-from itertools import combinations, permutations
+from models import db, Job, DailyDemand
+from cache import TTLCache
+from reference_cache import user_department_ids
+from metrics import registry
+from jobs import job_handler, submit_job, cancel_job
+from solver_executor import SolverExecutor
+from column_generation import solve_column_generation
+from horizon import solve_rolling_horizon
 from typing import List
+from datetime import date, timedelta
+import math
+import copy
 import logging
+import threading
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 employee_allocation_bp = Blueprint('employee_allocation_api', __name__, url_prefix='/labinv/api')
 
+DEFAULT_WEIGHTS = {'over': 10, 'under': 5}
+SCHEDULE_METHODS = ('enumerate', 'column_generation', 'rolling_horizon')
+
+schedule_cache = TTLCache(maxsize=app.config['SCHEDULE_CACHE_SIZE'], ttl=app.config['SCHEDULE_CACHE_TTL'])
+
+# Last model and solution per (user, department) for incremental re-solves
+incremental_sessions = TTLCache(
+    maxsize=app.config['INCREMENTAL_SESSION_SIZE'],
+    ttl=app.config['INCREMENTAL_SESSION_TTL']
+)
+
+SCHEDULE_PHASE_SECONDS = registry.histogram(
+    'schedule_phase_seconds', 'Time spent in each phase of a schedule solve', ('phase', 'backend')
+)
+SCHEDULE_SOLVES = registry.counter(
+    'schedule_solves_total', 'Schedule solves by method, backend and solver status', ('method', 'backend', 'status')
+)
+SCHEDULE_PATTERN_COUNT = registry.histogram(
+    'schedule_pattern_count', 'Candidate patterns per schedule model', ('schedule_type',),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+registry.gauge(
+    'schedule_cache_entries', 'Solved schedules held in the result cache',
+    collect=lambda: {(): len(schedule_cache)}
+)
+registry.gauge(
+    'schedule_cache_lookups_total', 'Schedule result cache lookups by result', ('result',),
+    collect=lambda: {('hit',): schedule_cache.stats()['hits'], ('miss',): schedule_cache.stats()['misses']},
+    kind='counter'
+)
+
+solver_executor = SolverExecutor(
+    max_workers=app.config['SOLVER_WORKERS'],
+    time_limit=app.config['SOLVER_TIME_LIMIT'],
+    gap_rel=app.config['SOLVER_MIP_GAP'],
+    threads=app.config['SOLVER_THREADS'],
+    kill_grace=app.config['SOLVER_KILL_GRACE']
+)
+
 def has_two_consecutive_rest_days(rest_days, n_days):
     """Check if there are at least two consecutive rest days"""
     if len(rest_days) < 2:
@@ -31,118 +82,93 @@ def has_two_consecutive_rest_days(rest_days, n_days):
         
     return False
 
-def rotate_pattern(pattern, n_days=7):
-    """Rotate a pattern by one day."""
-    return tuple((day + 1) % n_days for day in pattern)
+def days_to_mask(days):
+    """Pack a collection of day indexes into a 7-bit mask (bit 0 is Sunday)."""
+    mask = 0
+    for day in days:
+        mask |= 1 << day
+    return mask
 
-def add_rotated_patterns(patterns, zero_days, n_rotations=7):
-    """Add rotated versions of existing patterns, excluding zero_days as workdays."""
-    days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    original_patterns = patterns.copy()
-    for _ in range(n_rotations - 1):
-        rotated = [rotate_pattern(p) for p in original_patterns]
-        for p in rotated:
-            # Skip patterns that assign workdays to zero_days
-            if any(d in zero_days for d in p):
-                continue
-            # Check if pattern is unique and satisfies rest day constraints
-            if p not in patterns and has_two_consecutive_rest_days([d for d in range(7) if d not in p], 7):
-                patterns.append(p)
-                logger.debug(f"Added rotated pattern - Work: {[days[d] for d in p]}")
-    return patterns
+def mask_to_days(mask, n_days=7):
+    """Unpack a day mask into a sorted tuple of day indexes."""
+    return tuple(day for day in range(n_days) if mask >> day & 1)
 
-def generate_all_patterns(required_heads, schedule_type):
-    """Generate all valid work patterns based on combinations."""
-    days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    n_days = len(days)
-    work_days = [i for i, req in enumerate(required_heads) if req > 0]
-    
-    patterns = []
-    
-    # Generate all combinations of work_days with the given schedule_type
-    for work_sequence in combinations(work_days, schedule_type):
-        rest_sequence = [i for i in range(n_days) if i not in work_sequence]
-        
-        if has_two_consecutive_rest_days(rest_sequence, n_days):
-            patterns.append(tuple(work_sequence))
-            logger.debug(f"Added pattern - Work: {[days[d] for d in work_sequence]}")
-    
-    logger.info(f"Generated {len(patterns)} valid patterns from combinations")
-    return patterns
+def zero_day_mask(required_heads):
+    """Mask of the days that need no workers."""
+    return days_to_mask(i for i, req in enumerate(required_heads) if req <= 0)
 
-def generate_permuted_patterns(required_heads, schedule_type):
-    """Generate permuted patterns to increase diversity."""
-    work_days = [i for i, req in enumerate(required_heads) if req > 0]
-    patterns = set()
-    
-    # Generate unique permutations of workdays
-    for p in permutations(work_days, schedule_type):
-        p = tuple(sorted(p))
-        if p not in patterns and has_two_consecutive_rest_days([d for d in range(7) if d not in p], 7):
-            patterns.add(p)
-    
-    logger.info(f"Generated {len(patterns)} unique permuted patterns")
-    return list(patterns)
+def rotate_mask(mask, n_days=7):
+    """Shift every work day in a mask one day later, Saturday wrapping to Sunday."""
+    return (mask << 1 | mask >> (n_days - 1)) & ((1 << n_days) - 1)
 
-def add_additional_patterns(patterns, required_heads, schedule_type):
-    """Manually add additional diverse patterns if needed."""
-    days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    additional_patterns = [
-        (0, 2, 3, 4, 6),  # Sunday, Tuesday, Wednesday, Thursday, Saturday
-        (1, 3, 4, 5, 6),  # Monday, Wednesday, Thursday, Friday, Saturday
-        # Add more based on specific requirements or insights
-    ]
-    
-    for p in additional_patterns:
-        if p not in patterns and has_two_consecutive_rest_days([d for d in range(7) if d not in p], 7):
-            patterns.append(p)
-            logger.debug(f"Added additional pattern - Work: {[days[d] for d in p]}")
-    
-    logger.info(f"Total patterns after adding additional patterns: {len(patterns)}")
-    return patterns
+def build_pattern_catalog(n_days=7):
+    """Index every valid work pattern by (schedule_type, zero-day mask).
+
+    All 2**n_days day subsets are checked for the rest-day rule once; each
+    entry holds the work masks of that size that avoid the zero days, in the
+    same order itertools.combinations would yield them.
+
+    The entry then repeats the mask of every pattern that works Saturday,
+    rotated one day, when the rotation avoids the zero days. The original
+    generator added those rotations as separate columns (they only differed
+    in tuple order), and the 5-day Pattern_{p}_soft_limit bound is per
+    column, so the duplicates raise how many workers a pattern can carry.
+    Dropping them changes solver results.
+    """
+    full_mask = (1 << n_days) - 1
+    saturday = 1 << (n_days - 1)
+    valid_masks = sorted(
+        (mask for mask in range(1 << n_days)
+         if has_two_consecutive_rest_days(mask_to_days(full_mask ^ mask, n_days), n_days)),
+        key=lambda mask: mask_to_days(mask, n_days)
+    )
+    catalog = {}
+    for zero_mask in range(1 << n_days):
+        for schedule_type in range(n_days + 1):
+            masks = tuple(
+                mask for mask in valid_masks
+                if not mask & zero_mask and bin(mask).count('1') == schedule_type
+            )
+            rotated = tuple(
+                rotate_mask(mask, n_days) for mask in masks
+                if mask & saturday and not rotate_mask(mask, n_days) & zero_mask
+            )
+            catalog[(schedule_type, zero_mask)] = masks + rotated
+    return catalog
+
+PATTERN_DAYS = tuple(mask_to_days(mask) for mask in range(1 << 7))
+PATTERN_INCIDENCE = ((np.arange(1 << 7)[:, None] >> np.arange(7)) & 1).astype(np.int8)
+PATTERN_CATALOG = build_pattern_catalog()
+
+def pattern_masks(required_heads, schedule_type):
+    """Look up the valid work masks for a requirement vector."""
+    return PATTERN_CATALOG.get((schedule_type, zero_day_mask(required_heads)), ())
+
+def pattern_incidence(masks):
+    """0/1 pattern x day matrix for a sequence of work masks."""
+    return PATTERN_INCIDENCE[list(masks)]
 
 def generate_diverse_rest_patterns(required_heads, schedule_type):
-    """Generate a diverse set of work patterns."""
-    work_days = [i for i, req in enumerate(required_heads) if req > 0]
-    zero_days = [i for i, req in enumerate(required_heads) if req == 0]
-    
-    comb_patterns = generate_all_patterns(required_heads, schedule_type)
-    perm_patterns = generate_permuted_patterns(required_heads, schedule_type)
-    
-    # Combine and remove duplicates
-    combined_patterns = list(set(comb_patterns + perm_patterns))
-    
-    # Add rotated patterns without including zero_days
-    combined_patterns = add_rotated_patterns(combined_patterns, zero_days)
-    
-    # Add additional diverse patterns
-    combined_patterns = add_additional_patterns(combined_patterns, required_heads, schedule_type)
-    
-    logger.info(f"Total diverse patterns generated: {len(combined_patterns)}")
-    return combined_patterns
+    """Return every catalog column as a tuple of day indexes (repeats included)."""
+    patterns = [PATTERN_DAYS[mask] for mask in pattern_masks(required_heads, schedule_type)]
+    logger.info("Total diverse patterns generated: %d", len(patterns))
+    return patterns
 
-def create_schedule(required_heads: List[int], schedule_type: int = 4):
-    """Create optimized schedule minimizing variance from requirements"""
-    days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    n_days = len(days)
-    
+def build_cbc_model(incidence, required_heads, schedule_type, weights):
+    """Build the PuLP model from a pattern x day incidence matrix.
+
+    Each day's coverage row is assembled directly from the nonzero entries of
+    its incidence column, and patterns never touch zero days, so those days
+    need no constraints at all. Returns the model and the pattern variables.
+    """
+    n_patterns = incidence.shape[0]
     work_days = [i for i, req in enumerate(required_heads) if req > 0]
-    zero_days = [i for i, req in enumerate(required_heads) if req == 0]
-    
-    logger.info(f"Work days: {[days[i] for i in work_days]}")
-    logger.info(f"Zero days: {[days[i] for i in zero_days]}")
-    
-    # Generate diverse patterns
-    patterns = generate_diverse_rest_patterns(required_heads, schedule_type)
-    
-    if not patterns:
-        raise Exception("Could not generate valid patterns with given constraints")
-    
+
     # Initialize optimization model
     model = pulp.LpProblem("Minimize_Staffing_Variance", pulp.LpMinimize)
     
     # Decision variables for pattern assignments
-    x = pulp.LpVariable.dicts('pattern_', range(len(patterns)), lowBound=0, cat='Integer')
+    x = pulp.LpVariable.dicts('pattern_', range(n_patterns), lowBound=0, cat='Integer')
     
     # Variables for tracking over/under staffing
     over = pulp.LpVariable.dicts('over_', work_days, lowBound=0)
@@ -151,59 +177,253 @@ def create_schedule(required_heads: List[int], schedule_type: int = 4):
     # Variable for maximum pattern size
     max_pattern_size = pulp.LpVariable('max_pattern_size', lowBound=0)
     
-    # Assign higher weight to overstaffing to reduce variance
-    over_weight = 10  # Example weight
-    under_weight = 5  # Example weight
-    
     # Primary objective: Minimize overstaffing, understaffing, and maximum pattern size
-    model += pulp.lpSum(over[d] * over_weight + under[d] * under_weight for d in work_days) + max_pattern_size
+    model += pulp.LpAffineExpression(
+        [(over[d], weights['over']) for d in work_days]
+        + [(under[d], weights['under']) for d in work_days]
+        + [(max_pattern_size, 1)]
+    )
     
     # Constraints for each working day
     for day_idx in work_days:
-        workers_on_day = pulp.lpSum(x[p] for p in range(len(patterns)) 
-                                  if day_idx in patterns[p])
-        model += workers_on_day - over[day_idx] + under[day_idx] == required_heads[day_idx], f"Day_{day_idx}_balance"
-        model += workers_on_day >= required_heads[day_idx], f"Day_{day_idx}_no_understaffing"
-    
-    # Constraints for zero-days: No workers should be assigned
-    for day_idx in zero_days:
-        workers_on_day = pulp.lpSum(x[p] for p in range(len(patterns)) 
-                                  if day_idx in patterns[p])
-        model += workers_on_day == 0, f"Day_{day_idx}_no_workers"
+        workers_on_day = [(x[p], 1) for p in np.flatnonzero(incidence[:, day_idx])]
+        model.addConstraint(pulp.LpConstraint(
+            pulp.LpAffineExpression(workers_on_day + [(over[day_idx], -1), (under[day_idx], 1)]),
+            pulp.LpConstraintEQ, f"Day_{day_idx}_balance", required_heads[day_idx]
+        ))
+        model.addConstraint(pulp.LpConstraint(
+            pulp.LpAffineExpression(workers_on_day),
+            pulp.LpConstraintGE, f"Day_{day_idx}_no_understaffing", required_heads[day_idx]
+        ))
     
     # For 5-day schedules, add pattern size constraints
     if schedule_type == 5:
         max_req = max(required_heads)
         target_size = max_req // 3  # Target roughly 3 patterns minimum
         
-        for p in range(len(patterns)):
+        for p in range(n_patterns):
             # Each pattern size is bounded by max_pattern_size
-            model += x[p] <= max_pattern_size, f"Pattern_{p}_max_size"
+            model.addConstraint(pulp.LpConstraint(
+                pulp.LpAffineExpression([(x[p], 1), (max_pattern_size, -1)]),
+                pulp.LpConstraintLE, f"Pattern_{p}_max_size", 0
+            ))
             # Encourage smaller patterns by setting soft upper limit
-            model += x[p] <= target_size + over[work_days[0]], f"Pattern_{p}_soft_limit"
-    
-    # Solve model
-    logger.info("Solving optimization model...")
-    status = model.solve()
-    
-    if pulp.LpStatus[model.status] != 'Optimal':
+            model.addConstraint(pulp.LpConstraint(
+                pulp.LpAffineExpression([(x[p], 1), (over[work_days[0]], -1)]),
+                pulp.LpConstraintLE, f"Pattern_{p}_soft_limit", target_size
+            ))
+
+    return model, x
+
+def solve_with_cbc(incidence, required_heads, schedule_type, weights, time_limit=None, cancel_key=None):
+    """Solve the PuLP model with CBC on the solver executor."""
+    with SCHEDULE_PHASE_SECONDS.time(phase='build', backend='cbc'):
+        model, x = build_cbc_model(incidence, required_heads, schedule_type, weights)
+
+    logger.info("Solving optimization model with CBC...")
+    with SCHEDULE_PHASE_SECONDS.time(phase='solve', backend='cbc'):
+        solver_status = solver_executor.solve(model, time_limit=time_limit, cancel_key=cancel_key)
+
+    counts = [int(pulp.value(x[p])) for p in range(incidence.shape[0])]
+    return counts, solver_status, pulp.value(model.objective)
+
+def update_model_requirements(model, old_heads, new_heads, schedule_type):
+    """Change only the right-hand sides that differ between two requirement vectors.
+
+    Both vectors must share the same work days, so the model structure holds.
+    """
+    for day_idx, (old, new) in enumerate(zip(old_heads, new_heads)):
+        if new > 0 and new != old:
+            model.constraints[f"Day_{day_idx}_balance"].changeRHS(new)
+            model.constraints[f"Day_{day_idx}_no_understaffing"].changeRHS(new)
+
+    if schedule_type == 5 and max(old_heads) // 3 != max(new_heads) // 3:
+        target_size = max(new_heads) // 3
+        for name, constraint in model.constraints.items():
+            if name.endswith('_soft_limit'):
+                constraint.changeRHS(target_size)
+
+def solve_with_cbc_incremental(session_key, incidence, required_heads, schedule_type, weights,
+                               time_limit=None, cancel_key=None):
+    """Re-solve the session's previous CBC model with a MIP start.
+
+    The model is kept while the schedule type, zero days and weights stay the
+    same; otherwise it is rebuilt and solved cold.
+    """
+    structure = (schedule_type, zero_day_mask(required_heads), tuple(sorted(weights.items())))
+    session = incremental_sessions.get(session_key)
+
+    if session is None or session['structure'] != structure:
+        with SCHEDULE_PHASE_SECONDS.time(phase='build', backend='cbc_incremental'):
+            model, x = build_cbc_model(incidence, required_heads, schedule_type, weights)
+        session = {
+            'structure': structure,
+            'model': model,
+            'x': x,
+            'required_heads': list(required_heads),
+            'solved': False,
+            'lock': threading.Lock()
+        }
+        incremental_sessions.set(session_key, session)
+
+    with session['lock']:
+        model, x = session['model'], session['x']
+        update_model_requirements(model, session['required_heads'], required_heads, schedule_type)
+        session['required_heads'] = list(required_heads)
+
+        warm_start = session['solved']
+        logger.info(f"Solving optimization model with CBC ({'warm' if warm_start else 'cold'} start)...")
+        with SCHEDULE_PHASE_SECONDS.time(phase='solve', backend='cbc_incremental'):
+            solver_status = solver_executor.solve(model, time_limit=time_limit, cancel_key=cancel_key,
+                                                  warm_start=warm_start)
+        session['solved'] = True
+        incremental_sessions.set(session_key, session)
+
+        counts = [int(pulp.value(x[p])) for p in range(incidence.shape[0])]
+        return counts, solver_status, pulp.value(model.objective)
+
+def build_highs_model(incidence, required_heads, schedule_type, weights):
+    """Build the milp cost vector and sparse constraint blocks.
+
+    Columns are [patterns..., over per work day..., under per work day...,
+    max_pattern_size].
+    """
+    work_days = [i for i, req in enumerate(required_heads) if req > 0]
+    n_patterns = incidence.shape[0]
+    n_work = len(work_days)
+    n_vars = n_patterns + 2 * n_work + 1
+    over_col = n_patterns
+    under_col = n_patterns + n_work
+    max_size_col = n_vars - 1
+
+    coverage = sparse.csr_matrix(incidence[:, work_days].T, dtype=float)
+    required = np.array([required_heads[d] for d in work_days], dtype=float)
+
+    c = np.zeros(n_vars)
+    c[over_col:under_col] = weights['over']
+    c[under_col:max_size_col] = weights['under']
+    c[max_size_col] = 1
+
+    # Day balance: coverage - over + under == required, and no understaffing
+    identity = sparse.identity(n_work, format='csr')
+    balance = sparse.hstack([coverage, -identity, identity, sparse.csr_matrix((n_work, 1))], format='csr')
+    staffing = sparse.hstack([coverage, sparse.csr_matrix((n_work, n_vars - n_patterns))], format='csr')
+    constraints = [
+        LinearConstraint(balance, required, required),
+        LinearConstraint(staffing, required, np.inf)
+    ]
+
+    if schedule_type == 5:
+        target_size = max(required_heads) // 3
+        rows = np.arange(n_patterns)
+        max_size = sparse.csr_matrix(
+            (np.concatenate([np.ones(n_patterns), -np.ones(n_patterns)]),
+             (np.concatenate([rows, rows]), np.concatenate([rows, np.full(n_patterns, max_size_col)]))),
+            shape=(n_patterns, n_vars)
+        )
+        soft_limit = sparse.csr_matrix(
+            (np.concatenate([np.ones(n_patterns), -np.ones(n_patterns)]),
+             (np.concatenate([rows, rows]), np.concatenate([rows, np.full(n_patterns, over_col)]))),
+            shape=(n_patterns, n_vars)
+        )
+        constraints.append(LinearConstraint(max_size, -np.inf, 0))
+        constraints.append(LinearConstraint(soft_limit, -np.inf, target_size))
+
+    integrality = np.zeros(n_vars)
+    integrality[:n_patterns] = 1
+    return c, constraints, integrality
+
+def solve_with_highs(incidence, required_heads, schedule_type, weights, time_limit=None, cancel_key=None):
+    """Solve the same model in memory with scipy.optimize.milp (HiGHS).
+
+    No model file is written and no solver process is started.
+    """
+    with SCHEDULE_PHASE_SECONDS.time(phase='build', backend='highs'):
+        c, constraints, integrality = build_highs_model(incidence, required_heads, schedule_type, weights)
+    options = {'disp': False, 'mip_rel_gap': app.config['SOLVER_MIP_GAP']}
+    options['time_limit'] = app.config['SOLVER_TIME_LIMIT'] if time_limit is None else time_limit
+
+    logger.info("Solving optimization model with HiGHS...")
+    with SCHEDULE_PHASE_SECONDS.time(phase='solve', backend='highs'):
+        res = milp(c, constraints=constraints, integrality=integrality, bounds=Bounds(0, np.inf), options=options)
+
+    if res.status == 0:
+        solver_status = 'optimal'
+    elif res.status == 1 and res.x is not None:
+        solver_status = 'timed_out'
+    else:
         raise Exception("No feasible solution found")
-    
-    # Create schedule
+
+    counts = [int(count) for count in np.rint(res.x[:incidence.shape[0]])]
+    return counts, solver_status, res.fun
+
+SOLVER_BACKENDS = {
+    'cbc': solve_with_cbc,
+    'highs': solve_with_highs
+}
+
+def extract_schedule(patterns, counts, days):
+    """Turn per-pattern worker counts into the schedule dict and daily totals."""
     schedule = {}
     daily_totals = defaultdict(int)
     
     for p in range(len(patterns)):
-        workers = int(pulp.value(x[p]))
+        workers = counts[p]
         if workers > 0:
             pattern = {days[d]: workers if d in patterns[p] else 0 
-                      for d in range(n_days)}
+                      for d in range(len(days))}
             schedule[f"Pattern_{p+1}"] = pattern
             
             for day, count in pattern.items():
                 daily_totals[day] += count
                 
-            logger.debug(f"Pattern_{p+1}: {workers} workers: {pattern}")
+            logger.debug("Pattern_%d: %d workers: %s", p + 1, workers, pattern)
+    return schedule, daily_totals
+
+def solve_schedule(required_heads: List[int], schedule_type: int = 4, weights: dict = None,
+                   time_limit: float = None, cancel_key=None, backend: str = 'cbc', session_key=None):
+    """Solve the staffing model and report the solver status with the schedule.
+
+    solver_status is 'optimal', or 'timed_out' when the time limit was hit and
+    the schedule is the best incumbent the backend found. With a session_key
+    the CBC model is kept and re-solved incrementally on the next call.
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+    
+    work_days = [i for i, req in enumerate(required_heads) if req > 0]
+    zero_days = [i for i, req in enumerate(required_heads) if req == 0]
+    
+    backend_label = 'cbc_incremental' if session_key is not None else backend
+    
+    logger.info("Work days: %s", [days[i] for i in work_days])
+    logger.info("Zero days: %s", [days[i] for i in zero_days])
+    
+    # Generate diverse patterns
+    with SCHEDULE_PHASE_SECONDS.time(phase='patterns', backend=backend_label):
+        patterns = generate_diverse_rest_patterns(required_heads, schedule_type)
+        incidence = pattern_incidence(pattern_masks(required_heads, schedule_type))
+    SCHEDULE_PATTERN_COUNT.observe(len(patterns), schedule_type=schedule_type)
+    
+    if not patterns:
+        SCHEDULE_SOLVES.inc(method='enumerate', backend=backend_label, status='no_patterns')
+        raise Exception("Could not generate valid patterns with given constraints")
+
+    try:
+        if session_key is not None:
+            counts, solver_status, objective = solve_with_cbc_incremental(
+                session_key, incidence, required_heads, schedule_type, weights, time_limit, cancel_key
+            )
+        else:
+            solve = SOLVER_BACKENDS[backend]
+            counts, solver_status, objective = solve(incidence, required_heads, schedule_type, weights, time_limit, cancel_key)
+    except Exception:
+        SCHEDULE_SOLVES.inc(method='enumerate', backend=backend_label, status='failed')
+        raise
+    SCHEDULE_SOLVES.inc(method='enumerate', backend=backend_label, status=solver_status)
+    
+    with SCHEDULE_PHASE_SECONDS.time(phase='extract', backend=backend_label):
+        schedule, daily_totals = extract_schedule(patterns, counts, days)
     
     # Verify schedule
     variance_sum = 0
@@ -218,10 +438,215 @@ def create_schedule(required_heads: List[int], schedule_type: int = 4):
         if req == 0 and actual > 0:
             raise Exception(f"Schedule has {actual} workers on zero-requirement day {day}")
     
-    logger.info(f"Schedule variance: {variance_sum / len(required_heads)}")
-    logger.info(f"Daily totals: {dict(daily_totals)}")
+    logger.info("Schedule variance: %s", variance_sum / len(required_heads))
+    logger.info("Daily totals: %s", daily_totals)
     
-    return schedule
+    return {'schedule': schedule, 'solver_status': solver_status, 'objective': objective}
+
+def create_schedule(required_heads: List[int], schedule_type: int = 4, weights: dict = None):
+    """Create optimized schedule minimizing variance from requirements"""
+    return solve_schedule(required_heads, schedule_type, weights)['schedule']
+
+def solve_rotation(required_heads: List[int], schedule_type: int = 4, weights: dict = None,
+                   time_limit: float = None):
+    """Solve a rotating roster over len(required_heads) // 7 weeks by column generation.
+
+    Single-week rosters keep the usual {day: workers} pattern shape; longer
+    rotations nest the days under Week_1, Week_2, ...
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+    n_weeks = len(required_heads) // len(days)
+
+    try:
+        with SCHEDULE_PHASE_SECONDS.time(phase='solve', backend='column_generation'):
+            result = solve_column_generation(
+                required_heads, schedule_type, weights,
+                time_limit=app.config['SOLVER_TIME_LIMIT'] if time_limit is None else time_limit,
+                max_iterations=app.config['COLUMN_GENERATION_MAX_ITERATIONS'],
+                mip_rel_gap=app.config['SOLVER_MIP_GAP']
+            )
+    except Exception:
+        SCHEDULE_SOLVES.inc(method='column_generation', backend='highs', status='failed')
+        raise
+    SCHEDULE_SOLVES.inc(method='column_generation', backend='highs', status=result['solver_status'])
+    SCHEDULE_PATTERN_COUNT.observe(len(result['patterns']), schedule_type=schedule_type)
+    logger.info(f"Column generation: {len(result['patterns'])} patterns after {result['iterations']} iterations, "
+                f"objective {result['objective']} (LP bound {result['lp_bound']})")
+
+    schedule = {}
+    totals = np.zeros(len(required_heads), dtype=int)
+    for p, (pattern, workers) in enumerate(zip(result['patterns'], result['counts'])):
+        if workers > 0:
+            weeks = [{days[d]: workers * int(pattern[w * len(days) + d]) for d in range(len(days))}
+                     for w in range(n_weeks)]
+            schedule[f"Pattern_{p+1}"] = weeks[0] if n_weeks == 1 else {
+                f"Week_{w+1}": week for w, week in enumerate(weeks)
+            }
+            totals += workers * pattern
+
+    # Verify schedule
+    for t, req in enumerate(required_heads):
+        day = f"{days[t % len(days)]} of week {t // len(days) + 1}"
+        if req > 0 and totals[t] < req:
+            raise Exception(f"Schedule doesn't meet requirements for {day}. Need {req}, got {totals[t]}")
+        if req <= 0 and totals[t] > 0:
+            raise Exception(f"Schedule has {totals[t]} workers on zero-requirement day {day}")
+
+    return {
+        'schedule': schedule,
+        'solver_status': result['solver_status'],
+        'objective': result['objective'],
+        'lp_bound': result['lp_bound'],
+        'weeks': n_weeks
+    }
+
+def solve_horizon(required_heads: List[int], schedule_type: int = 4, weights: dict = None,
+                  time_limit: float = None):
+    """Solve a roster over len(required_heads) // 7 calendar weeks with a rolling horizon.
+
+    Each crew gets its own Week_1, Week_2, ... entries; weeks before the crew
+    was added are all zeros. Crews that end on a Saturday rest are listed in
+    next_sunday_rest and must be off on the Sunday after the horizon.
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+    try:
+        with SCHEDULE_PHASE_SECONDS.time(phase='solve', backend='rolling_horizon'):
+            result = solve_rolling_horizon(
+                required_heads, schedule_type, weights,
+                time_limit=app.config['SOLVER_TIME_LIMIT'] if time_limit is None else time_limit,
+                mip_rel_gap=app.config['SOLVER_MIP_GAP']
+            )
+    except Exception:
+        SCHEDULE_SOLVES.inc(method='rolling_horizon', backend='highs', status='failed')
+        raise
+    SCHEDULE_SOLVES.inc(method='rolling_horizon', backend='highs', status=result['solver_status'])
+    n_weeks = result['weeks']
+    logger.info(f"Rolling horizon: {len(result['crews'])} crews over {n_weeks} weeks, "
+                f"objective {result['objective']}")
+
+    schedule = {}
+    totals = np.zeros(len(required_heads), dtype=int)
+    for c, crew in enumerate(result['crews']):
+        work = [0 if mask is None else mask for mask in crew['history']]
+        rest = [None if mask is None else 0x7f & ~mask for mask in crew['history']]
+        for w, mask in enumerate(rest):
+            if mask is None:
+                continue
+            # Rest pair inside the week, or Saturday followed by next week's Sunday
+            seam = mask & 0x40 and (w + 1 == n_weeks or rest[w + 1] & 0x01)
+            if not (mask & (mask >> 1) or seam):
+                raise Exception(f"Crew {c+1} has no two consecutive rest days around week {w+1}")
+
+        schedule[f"Crew_{c+1}"] = {
+            f"Week_{w+1}": {days[d]: crew['workers'] * ((mask >> d) & 1) for d in range(len(days))}
+            for w, mask in enumerate(work)
+        }
+        for w, mask in enumerate(work):
+            for d in range(len(days)):
+                totals[w * len(days) + d] += crew['workers'] * ((mask >> d) & 1)
+
+    # Verify schedule
+    for t, req in enumerate(required_heads):
+        day = f"{days[t % len(days)]} of week {t // len(days) + 1}"
+        if req > 0 and totals[t] < req:
+            raise Exception(f"Schedule doesn't meet requirements for {day}. Need {req}, got {totals[t]}")
+        if req <= 0 and totals[t] > 0:
+            raise Exception(f"Schedule has {totals[t]} workers on zero-requirement day {day}")
+
+    return {
+        'schedule': schedule,
+        'solver_status': result['solver_status'],
+        'objective': result['objective'],
+        'weeks': n_weeks,
+        'next_sunday_rest': [f"Crew_{c+1}" for c, crew in enumerate(result['crews']) if crew['needs_sunday']]
+    }
+
+def required_heads_from_demand(start_date: date, weeks: int, cases_per_head: float):
+    """Turn DailyDemand case volumes into required heads for whole weeks.
+
+    The horizon starts on the Sunday on or before start_date; days without a
+    demand row need nobody.
+    """
+    start = start_date - timedelta(days=(start_date.weekday() + 1) % 7)
+    end = start + timedelta(days=7 * weeks)
+    rows = DailyDemand.query.filter(DailyDemand.date >= start, DailyDemand.date < end).all()
+
+    required_heads = [0] * (7 * weeks)
+    for row in rows:
+        required_heads[(row.date - start).days] += row.total_cases
+    return start, [math.ceil(cases / cases_per_head) for cases in required_heads]
+
+def schedule_cache_key(required_heads, schedule_type, weights=None, backend='cbc'):
+    """Normalize a request into a hashable cache key."""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    return (tuple(required_heads), int(schedule_type), tuple(sorted(weights.items())), backend)
+
+def cached_solve_schedule(required_heads: List[int], schedule_type: int = 4, weights: dict = None,
+                          time_limit: float = None, cancel_key=None, backend: str = 'cbc'):
+    """solve_schedule behind the bounded LRU/TTL result cache.
+
+    Only optimal results are cached; a timed-out incumbent is re-solved next time.
+    """
+    key = schedule_cache_key(required_heads, schedule_type, weights, backend)
+    result = schedule_cache.get(key)
+    if result is None:
+        result = solve_schedule(required_heads, schedule_type, weights, time_limit, cancel_key, backend)
+        if result['solver_status'] == 'optimal':
+            schedule_cache.set(key, result)
+    return copy.deepcopy(result)
+
+def validate_weights(weights):
+    """Return an error message if the objective weights are malformed."""
+    if weights is None:
+        return None
+    if not isinstance(weights, dict) or set(weights) - set(DEFAULT_WEIGHTS):
+        return f"Weights may only contain: {', '.join(DEFAULT_WEIGHTS)}"
+    for name, value in weights.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            return f"Weight '{name}' must be a non-negative number"
+    return None
+
+def validate_time_limit(time_limit):
+    """Return an error message if the requested solver time limit is malformed."""
+    if time_limit is None:
+        return None
+    max_time_limit = app.config['SOLVER_MAX_TIME_LIMIT']
+    if isinstance(time_limit, bool) or not isinstance(time_limit, (int, float)) \
+            or not 0 < time_limit <= max_time_limit:
+        return f"Time limit must be a number of seconds between 0 and {max_time_limit}"
+    return None
+
+@job_handler('schedule', cancel=solver_executor.cancel)
+def run_schedule_request(payload, job_id=None):
+    """Solve a validated /schedule payload into the response data block."""
+    schedule_type = payload['schedule_type']
+    if payload.get('method') == 'column_generation':
+        result = solve_rotation(payload['required_heads'], int(schedule_type), payload.get('weights'),
+                                payload.get('time_limit'))
+    elif payload.get('method') == 'rolling_horizon':
+        result = solve_horizon(payload['required_heads'], int(schedule_type), payload.get('weights'),
+                               payload.get('time_limit'))
+    elif payload.get('session_key'):
+        result = solve_schedule(payload['required_heads'], int(schedule_type), payload.get('weights'),
+                                payload.get('time_limit'), cancel_key=job_id,
+                                session_key=tuple(payload['session_key']))
+    else:
+        solve = cached_solve_schedule if payload.get('use_cache', True) else solve_schedule
+        result = solve(payload['required_heads'], int(schedule_type), payload.get('weights'),
+                       payload.get('time_limit'), cancel_key=job_id,
+                       backend=payload.get('backend') or app.config['SOLVER_BACKEND'])
+    return {
+        'schedule': result['schedule'],
+        'schedule_type': f"{schedule_type}-day",
+        'package_type': payload.get('package_type'),
+        'solver_status': result['solver_status'],
+        'weeks': result.get('weeks', 1),
+        'start_date': payload.get('start_date'),
+        'next_sunday_rest': result.get('next_sunday_rest')
+    }
 
 # @employee_allocation_bp.route('/schedule', methods=['POST'])
 # @login_required
@@ -275,6 +700,68 @@ def generate_schedule():
         required_heads = data.get('required_heads')
         schedule_type = data.get('schedule_type', '4')
         package_type = data.get('package_type')
+        weights = data.get('weights')
+        use_cache = data.get('use_cache', True)
+        mode = data.get('mode', 'sync')
+        time_limit = data.get('time_limit')
+        backend = data.get('backend', app.config['SOLVER_BACKEND'])
+        incremental = data.get('incremental', False)
+        department_id = data.get('department_id')
+        method = data.get('method', 'enumerate')
+
+        if mode not in ('sync', 'async'):
+            return jsonify({"error": "Mode must be 'sync' or 'async'"}), 400
+        if method not in SCHEDULE_METHODS:
+            return jsonify({"error": f"Method must be one of: {', '.join(SCHEDULE_METHODS)}"}), 400
+        if method == 'column_generation':
+            max_weeks = app.config['SCHEDULE_MAX_WEEKS']
+            if not isinstance(required_heads, list) or not required_heads or len(required_heads) % 7 \
+                    or len(required_heads) // 7 > max_weeks:
+                return jsonify({
+                    "error": f"Column generation needs required heads for 1 to {max_weeks} whole weeks"
+                }), 400
+            if incremental:
+                return jsonify({"error": "Incremental mode is not available with column generation"}), 400
+        start_date = None
+        if method == 'rolling_horizon':
+            max_weeks = app.config['HORIZON_MAX_WEEKS']
+            demand = data.get('demand')
+            if demand is not None:
+                try:
+                    weeks = int(demand['weeks'])
+                    cases_per_head = float(demand['cases_per_head'])
+                    start = date.fromisoformat(demand['start_date'])
+                except (TypeError, KeyError, ValueError):
+                    return jsonify({
+                        "error": "Demand needs start_date (YYYY-MM-DD), weeks and cases_per_head"
+                    }), 400
+                if not 1 <= weeks <= max_weeks or cases_per_head <= 0:
+                    return jsonify({
+                        "error": f"Demand needs 1 to {max_weeks} weeks and a positive cases_per_head"
+                    }), 400
+                start, required_heads = required_heads_from_demand(start, weeks, cases_per_head)
+                start_date = start.isoformat()
+            if not isinstance(required_heads, list) or not required_heads or len(required_heads) % 7 \
+                    or len(required_heads) // 7 > max_weeks:
+                return jsonify({
+                    "error": f"Rolling horizon needs required heads for 1 to {max_weeks} whole weeks"
+                }), 400
+            if incremental:
+                return jsonify({"error": "Incremental mode is not available with a rolling horizon"}), 400
+        if backend not in SOLVER_BACKENDS:
+            return jsonify({"error": f"Backend must be one of: {', '.join(SOLVER_BACKENDS)}"}), 400
+        if incremental:
+            if backend != 'cbc':
+                return jsonify({"error": "Incremental mode requires the cbc backend"}), 400
+            if department_id not in user_department_ids(current_user.id):
+                return jsonify({"error": "Incremental mode requires one of your department IDs"}), 400
+        time_limit_error = validate_time_limit(time_limit)
+        if time_limit_error:
+            return jsonify({"error": time_limit_error}), 400
+
+        weights_error = validate_weights(weights)
+        if weights_error:
+            return jsonify({"error": weights_error}), 400
         
         # Validate package requirements
         if package_type == '7-day':
@@ -292,15 +779,32 @@ def generate_schedule():
                     "error": "6-day package only supports 4-day schedules"
                 }), 400
         
+        payload = {
+            'required_heads': required_heads,
+            'schedule_type': schedule_type,
+            'package_type': package_type,
+            'weights': weights,
+            'use_cache': use_cache,
+            'time_limit': time_limit,
+            'backend': backend,
+            'method': method,
+            'start_date': start_date,
+            'session_key': [current_user.id, department_id] if incremental else None
+        }
+
+        if mode == 'async':
+            job = submit_job('schedule', payload, current_user.id)
+            return jsonify({
+                'status': job.status,
+                'job_id': job.id,
+                'status_url': url_for('employee_allocation_api.get_schedule_job', job_id=job.id),
+                'result_url': url_for('employee_allocation_api.get_schedule_job_result', job_id=job.id)
+            }), 202
+
         try:
-            schedule_data = create_schedule(required_heads, int(schedule_type))
             return jsonify({
                 'status': 'success',
-                'data': {
-                    'schedule': schedule_data,
-                    'schedule_type': f"{schedule_type}-day",
-                    'package_type': package_type
-                }
+                'data': run_schedule_request(payload)
             })
         except Exception as e:
             logger.error(f"Schedule generation error: {str(e)}")
@@ -316,4 +820,60 @@ def generate_schedule():
             'error': str(e)
         }), 500
 
+def get_user_schedule_job(job_id):
+    job = db.session.get(Job, job_id)
+    if not job or job.kind != 'schedule' or job.user_id != current_user.id:
+        return None
+    return job
+
+@employee_allocation_bp.route('/schedule/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_schedule_job(job_id):
+    job = get_user_schedule_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
+
+@employee_allocation_bp.route('/schedule/jobs/<job_id>/result', methods=['GET'])
+@login_required
+def get_schedule_job_result(job_id):
+    job = get_user_schedule_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job.status == 'succeeded':
+        return jsonify({
+            'status': 'success',
+            'data': job.result
+        }), 200
+    if job.status == 'failed':
+        return jsonify({
+            'status': 'error',
+            'error': f"Scheduling error: {job.error}"
+        }), 400
+    return jsonify({'status': job.status, 'job_id': job.id}), 202
+
+@employee_allocation_bp.route('/schedule/jobs/<job_id>', methods=['DELETE'])
+@login_required
+def cancel_schedule_job(job_id):
+    job = get_user_schedule_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if not cancel_job(job):
+        return jsonify({'error': f"Job is already {job.status}"}), 409
+    return jsonify(job.to_dict()), 200
+
+@employee_allocation_bp.route('/schedule/cache', methods=['GET'])
+@login_required
+def get_schedule_cache_stats():
+    return jsonify(schedule_cache.stats()), 200
+
+@employee_allocation_bp.route('/schedule/cache', methods=['DELETE'])
+@login_required
+def clear_schedule_cache():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Only administrators can clear the schedule cache'}), 403
+    schedule_cache.invalidate()
+    return jsonify({'message': 'Schedule cache cleared'}), 200
+
 app.register_blueprint(employee_allocation_bp)
@@ -0,0 +1,140 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from models import db, Department, Employee, EmployeeMetric, JobClass, Metric, Schedule, SCHEDULE_DAYS
+from config import app
+from reference_cache import user_department_ids
+from .employee_management import parse_id_list
+from flask_login import login_required, current_user
+from sqlalchemy import select
+from openpyxl import Workbook
+from datetime import date, datetime
+import csv
+import io
+import json
+import tempfile
+
+employee_export_bp = Blueprint('employee_export_api', __name__, url_prefix='/labinv/api')
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def employees_statement(department_ids, args):
+    return select(
+        Employee.id, Employee.first_name, Employee.last_name, Employee.email, Employee.hire_date,
+        Employee.hourly_rate, Employee.job_class_id, JobClass.name.label('job_class'),
+        JobClass.department_id, Department.name.label('department')
+    ).join(JobClass, Employee.job_class_id == JobClass.id) \
+        .join(Department, JobClass.department_id == Department.id) \
+        .where(JobClass.department_id.in_(department_ids)).order_by(Employee.id)
+
+def schedules_statement(department_ids, args):
+    return select(
+        Employee.id.label('employee_id'), Employee.first_name, Employee.last_name, JobClass.department_id,
+        *(getattr(Schedule, day) for day in SCHEDULE_DAYS), Schedule.days_mask
+    ).join(Employee, Schedule.employee_id == Employee.id) \
+        .join(JobClass, Employee.job_class_id == JobClass.id) \
+        .where(JobClass.department_id.in_(department_ids)).order_by(Employee.id)
+
+def employee_metrics_statement(department_ids, args):
+    statement = select(
+        EmployeeMetric.id, EmployeeMetric.employee_id, EmployeeMetric.metric_id, Metric.name.label('metric'),
+        Metric.unit, EmployeeMetric.date, EmployeeMetric.value
+    ).join(Metric, EmployeeMetric.metric_id == Metric.id) \
+        .join(Employee, EmployeeMetric.employee_id == Employee.id) \
+        .join(JobClass, Employee.job_class_id == JobClass.id) \
+        .where(JobClass.department_id.in_(department_ids))
+    if args.get('start_date'):
+        statement = statement.where(EmployeeMetric.date >= date.fromisoformat(args['start_date']))
+    if args.get('end_date'):
+        statement = statement.where(EmployeeMetric.date <= date.fromisoformat(args['end_date']))
+    return statement.order_by(EmployeeMetric.employee_id, EmployeeMetric.date, EmployeeMetric.id)
+
+EXPORT_DATASETS = {
+    'employees': employees_statement,
+    'schedules': schedules_statement,
+    'employee_metrics': employee_metrics_statement,
+}
+
+def stream_rows(statement):
+    """Column names and an iterator of row batches read EXPORT_CHUNK_SIZE at a time from a server-side cursor."""
+    result = db.session.execute(statement.execution_options(yield_per=app.config['EXPORT_CHUNK_SIZE']))
+    return list(result.keys()), result.partitions()
+
+def json_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield ''.join(
+            json.dumps(dict(zip(columns, (json_value(value) for value in row))), separators=(',', ':')) + '\n'
+            for row in rows
+        )
+
+def xlsx_chunks(columns, batches, title):
+    """Build the workbook in write-only mode, then stream the finished file.
+
+    A zip archive cannot be sent before it is complete. Write-only mode
+    spills rows to disk as they are appended, so memory stays flat, but
+    the first byte only goes out once the last row is written.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(columns)
+    for rows in batches:
+        for row in rows:
+            sheet.append(tuple(row))
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        while block := f.read(64 * 1024):
+            yield block
+
+@employee_export_bp.route('/export/<dataset>', methods=['GET'])
+@login_required
+def export_dataset(dataset):
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f"Dataset must be one of: {', '.join(EXPORT_DATASETS)}"}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    try:
+        requested = parse_id_list(request.args.get('department_id'), 'department_id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    department_ids = user_department_ids(current_user.id)
+    if requested is not None:
+        department_ids = [department_id for department_id in department_ids if department_id in requested]
+    try:
+        statement = EXPORT_DATASETS[dataset](department_ids, request.args)
+    except ValueError:
+        return jsonify({'error': 'start_date and end_date must be YYYY-MM-DD dates'}), 400
+
+    columns, batches = stream_rows(statement)
+    if fmt == 'csv':
+        body = csv_chunks(columns, batches)
+    elif fmt == 'ndjson':
+        body = ndjson_chunks(columns, batches)
+    else:
+        body = xlsx_chunks(columns, batches, dataset)
+
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt])
+    filename = f"{dataset}-{date.today():%Y%m%d}.{fmt}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+app.register_blueprint(employee_export_bp)
@@ -0,0 +1,221 @@
+from flask import Blueprint, request, jsonify
+from models import db, Employee, Job, JobClass
+from config import app
+from reference_cache import user_department_ids
+from etags import bump_department_versions
+from jobs import job_handler, submit_job
+from flask_login import login_required, current_user
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+import pandas as pd
+import logging
+import os
+import uuid
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+employee_import_bp = Blueprint('employee_import_api', __name__, url_prefix='/labinv/api')
+
+IMPORT_COLUMNS = ('first_name', 'last_name', 'email', 'hire_date', 'hourly_rate', 'job_class_id')
+IMPORT_FORMATS = {'.csv': 'csv', '.xlsx': 'xlsx'}
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+def normalize_header(name):
+    return '' if name is None else str(name).strip().lower().replace(' ', '_')
+
+def read_chunks(path, fmt, chunksize):
+    """Yield DataFrames of at most chunksize rows, indexed by their row number in the file.
+
+    The header is row 1, as a spreadsheet shows it, and empty rows are
+    dropped without shifting the numbers of the rows after them. CSV values
+    stay strings; xlsx values keep their cell types, so real dates pass
+    through.
+    """
+    if fmt == 'csv':
+        # Blank lines are kept as rows so the index stays the line number
+        with pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False,
+                         skip_blank_lines=False) as reader:
+            for chunk in reader:
+                chunk.columns = [normalize_header(column) for column in chunk.columns]
+                chunk.index = chunk.index + 2
+                chunk = chunk[(chunk.apply(lambda column: column.str.strip()) != '').any(axis=1)]
+                if len(chunk):
+                    yield chunk
+        return
+
+    # read_only streams rows from the zip instead of building the whole sheet
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [normalize_header(column) for column in next(rows, ())]
+        batch, numbers = [], []
+        for number, row in enumerate(rows, start=2):
+            if all(cell is None or cell == '' for cell in row):
+                continue
+            batch.append(row[:len(header)])
+            numbers.append(number)
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header, index=numbers)
+                batch, numbers = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, index=numbers)
+    finally:
+        workbook.close()
+
+def owned_job_class_departments(user_id):
+    """{job class id: department id} for every job class in the user's departments."""
+    return dict(db.session.query(JobClass.id, JobClass.department_id)
+                .filter(JobClass.department_id.in_(user_department_ids(user_id))))
+
+def validate_chunk(chunk, job_class_departments, seen_emails):
+    """Check a chunk column by column.
+
+    Returns the insertable records and {row number: [messages]} for the
+    rows that failed. seen_emails carries the file's emails across chunks.
+    """
+    text = {column: chunk[column].fillna('').astype(str).str.strip()
+            for column in ('first_name', 'last_name', 'email')}
+    email = text['email']
+    email_ok = email.str.match(EMAIL_PATTERN)
+    repeated = email.duplicated(keep='first') | email.isin(seen_emails)
+    seen_emails.update(email[email != ''])
+
+    candidates = email[email_ok & ~repeated].unique().tolist()
+    existing = {row.email for row in db.session.query(Employee.email).filter(Employee.email.in_(candidates))} \
+        if candidates else set()
+
+    hire_date = pd.to_datetime(chunk['hire_date'], format='%Y-%m-%d', errors='coerce')
+    hourly_rate = pd.to_numeric(chunk['hourly_rate'], errors='coerce')
+    job_class_id = pd.to_numeric(chunk['job_class_id'], errors='coerce')
+
+    checks = [
+        (text['first_name'] == '', 'first_name is required'),
+        (text['last_name'] == '', 'last_name is required'),
+        (~email_ok, 'email is missing or invalid'),
+        (email_ok & repeated, 'email appears earlier in the file'),
+        (email.isin(existing), 'email already exists'),
+        (hire_date.isna(), 'hire_date must be a YYYY-MM-DD date'),
+        (hourly_rate.isna() | (hourly_rate < 0), 'hourly_rate must be a non-negative number'),
+        (~job_class_id.isin(list(job_class_departments)), 'job_class_id is not one of your job classes'),
+    ]
+    errors = {}
+    failed = pd.Series(False, index=chunk.index)
+    for mask, message in checks:
+        failed |= mask
+        for row in mask[mask].index:
+            errors.setdefault(int(row), []).append(message)
+
+    valid = ~failed
+    records = pd.DataFrame({
+        'first_name': text['first_name'][valid],
+        'last_name': text['last_name'][valid],
+        'email': email[valid],
+        'hire_date': hire_date[valid].dt.date,
+        'hourly_rate': hourly_rate[valid].astype(float),
+        'job_class_id': job_class_id[valid].astype(int),
+    }).to_dict('records')
+    return records, errors
+
+def import_employees(path, fmt, user_id, dry_run=False):
+    """Validate and insert employees from an uploaded file, one transaction per chunk.
+
+    Rows that pass validation are inserted even when others fail; the
+    result lists every failed row with its reasons. With dry_run nothing
+    is written.
+    """
+    job_class_departments = owned_job_class_departments(user_id)
+    max_errors = app.config['IMPORT_MAX_ERRORS']
+    seen_emails = set()
+    report = {'rows': 0, 'imported': 0, 'failed': 0, 'dry_run': dry_run, 'errors': [], 'errors_truncated': False}
+
+    def record_errors(errors):
+        report['failed'] += len(errors)
+        for row, messages in sorted(errors.items()):
+            if len(report['errors']) < max_errors:
+                report['errors'].append({'row': row, 'errors': messages})
+            else:
+                report['errors_truncated'] = True
+
+    for number, chunk in enumerate(read_chunks(path, fmt, app.config['IMPORT_CHUNK_SIZE'])):
+        if number == 0:
+            missing = [column for column in IMPORT_COLUMNS if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        records, errors = validate_chunk(chunk, job_class_departments, seen_emails)
+        report['rows'] += len(chunk)
+        if records and not dry_run:
+            try:
+                db.session.execute(insert(Employee), records)
+                bump_department_versions(*{job_class_departments[record['job_class_id']] for record in records})
+                db.session.commit()
+            except IntegrityError as e:
+                # Another writer took one of the emails since validation; fail the whole chunk
+                db.session.rollback()
+                logger.warning("Employee import chunk ending at row %s failed: %s", chunk.index[-1], e.orig)
+                valid_rows = chunk.index.difference(pd.Index(list(errors)))
+                errors.update({int(row): ['row could not be inserted: email already exists'] for row in valid_rows})
+                records = []
+        report['imported'] += len(records)
+        record_errors(errors)
+
+    logger.info("Employee import for user %s: %d rows, %d imported, %d failed%s",
+                user_id, report['rows'], report['imported'], report['failed'], ' (dry run)' if dry_run else '')
+    return report
+
+@job_handler('employee_import')
+def run_employee_import(payload, job_id=None):
+    try:
+        return import_employees(payload['path'], payload['format'], payload['user_id'], payload['dry_run'])
+    finally:
+        if os.path.exists(payload['path']):
+            os.remove(payload['path'])
+
+@employee_import_bp.route('/employees/import', methods=['POST'])
+@login_required
+def import_employees_file():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'Upload a .csv or .xlsx file as "file"'}), 400
+    fmt = IMPORT_FORMATS.get(os.path.splitext(upload.filename)[1].lower())
+    if fmt is None:
+        return jsonify({'error': 'File must be .csv or .xlsx'}), 400
+
+    path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}-{secure_filename(upload.filename)}")
+    upload.save(path)
+    dry_run = request.values.get('dry_run', 'false').lower() == 'true'
+    background = request.values.get('background', 'false').lower() == 'true' \
+        or os.path.getsize(path) > app.config['IMPORT_BACKGROUND_BYTES']
+
+    if background:
+        payload = {'path': path, 'format': fmt, 'user_id': current_user.id, 'dry_run': dry_run}
+        job = submit_job('employee_import', payload, current_user.id)
+        return jsonify({'status': job.status, 'job_id': job.id}), 202
+
+    try:
+        return jsonify(import_employees(path, fmt, current_user.id, dry_run)), 200
+    except (ValueError, InvalidFileException, zipfile.BadZipFile) as e:
+        return jsonify({'error': f"Could not read {upload.filename}: {str(e)}"}), 400
+    finally:
+        os.remove(path)
+
+@employee_import_bp.route('/employees/import/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_employee_import_job(job_id):
+    job = db.session.get(Job, job_id)
+    if not job or job.kind != 'employee_import' or job.user_id != current_user.id:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({
+        'id': job.id,
+        'status': job.status,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }), 200
+
+app.register_blueprint(employee_import_bp)
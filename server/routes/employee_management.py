@@ -1,24 +1,178 @@
 from flask import Blueprint, request, jsonify
-from models import db, Employee, JobClass, Schedule, Department
+from models import db, Employee, JobClass, Schedule, Department, SCHEDULE_DAYS
 from config import app
+from serializers import json_response, serialize_many, serializer_for
+from reference_cache import job_class_info, user_department_ids
+from etags import bump_department_versions, department_versions, listing_etag, not_modified, set_etag
 from flask_login import login_required, current_user
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, joinedload, load_only, selectinload
 from datetime import datetime
 
 employee_bp = Blueprint('employee_api', __name__, url_prefix='/labinv/api')
 
+# Loader strategies matching what to_dict walks, keyed by the relationship
+# they serve, so listing cost stays a fixed number of queries however many
+# rows come back. Collections use selectin (one IN query each); small
+# many-to-one hops are joined onto their parent.
+EMPLOYEE_COLUMNS = ('id', 'first_name', 'last_name', 'email', 'hire_date', 'hourly_rate', 'job_class_id')
+EMPLOYEE_LOADERS = {
+    'job_class': (
+        contains_eager(Employee.job_class).joinedload(JobClass.department).joinedload(Department.user),
+        contains_eager(Employee.job_class).selectinload(JobClass.metrics),
+    ),
+    'metric_values': (selectinload(Employee.metric_values),),
+    'schedule': (selectinload(Employee.schedule),),
+}
+
+JOB_CLASS_COLUMNS = ('id', 'name', 'description', 'base_pay_rate', 'department_id')
+JOB_CLASS_LOADERS = {
+    'department': (joinedload(JobClass.department).joinedload(Department.user),),
+    'metrics': (selectinload(JobClass.metrics),),
+    'employees': (
+        selectinload(JobClass.employees).selectinload(Employee.metric_values),
+        selectinload(JobClass.employees).selectinload(Employee.schedule),
+    ),
+}
+
+BULK_EMPLOYEE_FIELDS = ('first_name', 'last_name', 'email', 'hire_date', 'hourly_rate', 'job_class_id')
+
+# Compile the default listing serializers up front rather than on the first request
+serializer_for(Employee)
+serializer_for(JobClass)
+
+def parse_id_list(value, name):
+    """Parse a comma-separated id filter; None when the parameter is absent."""
+    if value is None:
+        return None
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of IDs")
+
+def parse_fields(value, columns, loaders):
+    """Parse ?fields= into the names to serialize; None means everything."""
+    if value is None:
+        return None
+    fields = tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+    unknown = [field for field in fields if field not in columns and field not in loaders]
+    if unknown or not fields:
+        raise ValueError(f"fields may only contain: {', '.join(columns + tuple(loaders))}")
+    return fields
+
+def parse_page(args):
+    """Parse ?cursor= and ?limit=; both None means an unpaginated listing."""
+    cursor, limit = args.get('cursor'), args.get('limit')
+    if cursor is None and limit is None:
+        return None, None
+    max_limit = app.config['PAGE_MAX_LIMIT']
+    try:
+        cursor = int(cursor) if cursor is not None else None
+        limit = int(limit) if limit is not None else app.config['PAGE_DEFAULT_LIMIT']
+    except ValueError:
+        raise ValueError("cursor and limit must be integers")
+    if not 1 <= limit <= max_limit:
+        raise ValueError(f"limit must be between 1 and {max_limit}")
+    return cursor, limit
+
+def listing_options(model, fields, columns, loaders):
+    """Loader options that fetch only the requested columns and relationships."""
+    if fields is None:
+        return [option for options in loaders.values() for option in options]
+    wanted = [getattr(model, field) for field in fields if field in columns]
+    options = [load_only(*(wanted or [model.id]))]
+    for field in fields:
+        options.extend(loaders.get(field, ()))
+    return options
+
+def fetch_page(query, key, cursor, limit):
+    """Run a listing query, keyset-paginated on key when a limit is given.
+
+    Returns the rows and the cursor for the next page (None on the last one).
+    """
+    if limit is None:
+        return query.all(), None
+    if cursor is not None:
+        query = query.filter(key > cursor)
+    rows = query.order_by(key).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
+
+def listing_response(rows, fields, next_cursor, etag):
+    response = json_response(serialize_many(rows, only=fields or ()))
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return set_etag(response, etag)
+
+def owned_job_class(job_class_id):
+    """Cached job class definition if it belongs to one of the user's departments, else None."""
+    job_class = job_class_info(job_class_id)
+    if job_class is None or job_class['department_id'] not in user_department_ids(current_user.id):
+        return None
+    return job_class
+
+def owned_department_id(employee):
+    """The employee's department id if the user owns it, else None."""
+    job_class = owned_job_class(employee.job_class_id) if employee else None
+    return job_class and job_class['department_id']
+
 @employee_bp.route('/employees', methods=['GET'])
 @login_required
 def get_employees():
-    user_departments = [dept.id for dept in current_user.departments]
-    employees = Employee.query.join(JobClass).join(Department).filter(Department.id.in_(user_departments)).all()
-    return jsonify([employee.to_dict() for employee in employees]), 200
+    versions = department_versions(current_user.id)
+    try:
+        department_ids = parse_id_list(request.args.get('department_id'), 'department_id')
+        job_class_ids = parse_id_list(request.args.get('job_class_id'), 'job_class_id')
+        works_on = parse_days(request.args.get('works_on'))
+        fields = parse_fields(request.args.get('fields'), EMPLOYEE_COLUMNS, EMPLOYEE_LOADERS)
+        cursor, limit = parse_page(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    etag = listing_etag(versions)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    user_departments = [dept_id for dept_id, _ in versions]
+    if department_ids is not None:
+        user_departments = [dept_id for dept_id in user_departments if dept_id in department_ids]
+    query = Employee.query.join(Employee.job_class).filter(JobClass.department_id.in_(user_departments))
+    if job_class_ids is not None:
+        query = query.filter(Employee.job_class_id.in_(job_class_ids))
+    if works_on is not None:
+        query = query.join(Schedule, Schedule.employee_id == Employee.id).filter(Schedule.works_all(works_on))
+    query = query.options(*listing_options(Employee, fields, EMPLOYEE_COLUMNS, EMPLOYEE_LOADERS))
+
+    employees, next_cursor = fetch_page(query, Employee.id, cursor, limit)
+    return listing_response(employees, fields, next_cursor, etag)
 
 @employee_bp.route('/job_classes', methods=['GET'])
 @login_required
 def get_job_classes():
-    user_departments = [dept.id for dept in current_user.departments]
-    job_classes = JobClass.query.filter(JobClass.department_id.in_(user_departments)).all()
-    return jsonify([job_class.to_dict() for job_class in job_classes]), 200
+    versions = department_versions(current_user.id)
+    try:
+        department_ids = parse_id_list(request.args.get('department_id'), 'department_id')
+        fields = parse_fields(request.args.get('fields'), JOB_CLASS_COLUMNS, JOB_CLASS_LOADERS)
+        cursor, limit = parse_page(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    etag = listing_etag(versions)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    user_departments = [dept_id for dept_id, _ in versions]
+    if department_ids is not None:
+        user_departments = [dept_id for dept_id in user_departments if dept_id in department_ids]
+    query = JobClass.query.filter(JobClass.department_id.in_(user_departments)) \
+        .options(*listing_options(JobClass, fields, JOB_CLASS_COLUMNS, JOB_CLASS_LOADERS))
+
+    job_classes, next_cursor = fetch_page(query, JobClass.id, cursor, limit)
+    return listing_response(job_classes, fields, next_cursor, etag)
 
 @employee_bp.route('/add_employee', methods=['POST'])
 @login_required
@@ -34,8 +188,8 @@ def add_employee():
     if not job_class_id:
         return jsonify({'error': 'Job Class ID is required'}), 400
 
-    job_class = JobClass.query.get(job_class_id)
-    if not job_class or job_class.department_id not in [dept.id for dept in current_user.departments]:
+    job_class = owned_job_class(job_class_id)
+    if not job_class:
         return jsonify({'error': 'Invalid Job Class ID'}), 400
 
     hire_date = datetime.strptime(data.get('hire_date'), '%Y-%m-%d').date()
@@ -50,6 +204,7 @@ def add_employee():
     )
 
     db.session.add(new_employee)
+    bump_department_versions(job_class['department_id'])
     db.session.commit()
 
     return jsonify(new_employee.to_dict()), 201
@@ -58,18 +213,22 @@ def add_employee():
 @login_required
 def update_employee(employee_id):
     employee = Employee.query.get(employee_id)
-    if not employee or employee.job_class.department_id not in [dept.id for dept in current_user.departments]:
+    department_id = owned_department_id(employee)
+    if department_id is None:
         return jsonify({'error': 'Employee not found or you do not have permission to update this employee'}), 404
 
     data = request.get_json()
+    department_ids = [department_id]
     for field in ['first_name', 'last_name', 'email', 'hire_date', 'hourly_rate', 'job_class_id']:
         if field in data:
             if field == 'job_class_id':
-                job_class = JobClass.query.get(data[field])
-                if not job_class or job_class.department_id not in [dept.id for dept in current_user.departments]:
+                job_class = owned_job_class(data[field])
+                if not job_class:
                     return jsonify({'error': 'Invalid Job Class ID'}), 400
+                department_ids.append(job_class['department_id'])
             setattr(employee, field, data[field])
 
+    bump_department_versions(*department_ids)
     db.session.commit()
     return jsonify(employee.to_dict()), 200
 
@@ -77,9 +236,11 @@ def update_employee(employee_id):
 @login_required
 def delete_employee(employee_id):
     employee = Employee.query.get(employee_id)
-    if not employee or employee.job_class.department_id not in [dept.id for dept in current_user.departments]:
+    department_id = owned_department_id(employee)
+    if department_id is None:
         return jsonify({'error': 'Employee not found or you do not have permission to delete this employee'}), 404
     
+    bump_department_versions(department_id)
     db.session.delete(employee)
     db.session.commit()
     return jsonify({'message': 'Employee deleted successfully'}), 200
@@ -88,7 +249,8 @@ def delete_employee(employee_id):
 @login_required
 def update_employee_schedule(employee_id):
     employee = Employee.query.get(employee_id)
-    if not employee or employee.job_class.department_id not in [dept.id for dept in current_user.departments]:
+    department_id = owned_department_id(employee)
+    if department_id is None:
         return jsonify({'error': 'Employee not found or you do not have permission to update this employee\'s schedule'}), 404
 
     data = request.get_json()
@@ -101,6 +263,7 @@ def update_employee_schedule(employee_id):
         if day in data:
             setattr(schedule, day, data[day])
 
+    bump_department_versions(department_id)
     db.session.commit()
 
     return jsonify({
@@ -108,4 +271,181 @@ def update_employee_schedule(employee_id):
         'schedule': {day: getattr(schedule, day) for day in ['sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']}
     }), 200
 
+@employee_bp.route('/schedules/coverage', methods=['GET'])
+@login_required
+def get_schedule_coverage():
+    """Headcount per work pattern (days_mask), grouped in SQL, and per weekday summed from those groups."""
+    try:
+        department_ids = parse_id_list(request.args.get('department_id'), 'department_id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    owned = user_department_ids(current_user.id)
+    if department_ids is not None:
+        owned = [department_id for department_id in owned if department_id in department_ids]
+
+    def scoped(query):
+        return query.join(Employee, Schedule.employee_id == Employee.id) \
+            .join(JobClass, Employee.job_class_id == JobClass.id).filter(JobClass.department_id.in_(owned))
+
+    patterns = scoped(db.session.query(Schedule.days_mask, func.count())) \
+        .group_by(Schedule.days_mask).order_by(func.count().desc(), Schedule.days_mask).all()
+    return jsonify({
+        'headcount': Schedule.weekday_headcounts(patterns),
+        'patterns': [
+            {'days_mask': mask, 'days': [i for i in range(len(SCHEDULE_DAYS)) if mask >> i & 1], 'employees': count}
+            for mask, count in patterns
+        ]
+    }), 200
+
+def partial_schedule_update():
+    """UPDATE that overwrites only the given days, computing the mask and day columns in SQL.
+
+    Bind keep_mask (days left alone), set_mask (days now worked) and
+    b_employee_id per row. Bulk statements skip the mapper events that
+    normally keep days_mask in sync, so both are written here.
+    """
+    schedules = Schedule.__table__
+    mask = schedules.c.days_mask.op('&')(bindparam('keep_mask')).op('|')(bindparam('set_mask'))
+    return update(schedules).where(schedules.c.employee_id == bindparam('b_employee_id')).values(
+        days_mask=mask, **{day: mask.op('&')(1 << i) != 0 for i, day in enumerate(SCHEDULE_DAYS)}
+    )
+
+def parse_days(value):
+    """Parse ?works_on=monday,tuesday into a day mask; None when absent."""
+    if value is None:
+        return None
+    days = [day.strip().lower() for day in value.split(',') if day.strip()]
+    unknown = [day for day in days if day not in SCHEDULE_DAYS]
+    if unknown or not days:
+        raise ValueError(f"works_on must be a comma-separated list of: {', '.join(SCHEDULE_DAYS)}")
+    return Schedule.mask_for(dict.fromkeys(days, True))
+
+def parse_bulk_change(change):
+    """Check one bulk change's fields; returns (employee values, schedule days, errors)."""
+    errors = []
+    values = {}
+    unknown = set(change) - set(BULK_EMPLOYEE_FIELDS) - {'id', 'schedule'}
+    if unknown:
+        errors.append(f"Unknown fields: {', '.join(sorted(unknown))}")
+    for field in BULK_EMPLOYEE_FIELDS:
+        if field not in change:
+            continue
+        value = change[field]
+        try:
+            if field == 'hire_date':
+                value = datetime.strptime(value, '%Y-%m-%d').date()
+            elif field == 'hourly_rate':
+                value = float(value)
+            elif field == 'job_class_id':
+                value = int(value)
+            elif not isinstance(value, str) or not value.strip():
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"Invalid {field}")
+            continue
+        values[field] = value
+
+    days = change.get('schedule') or {}
+    if not isinstance(days, dict) or set(days) - set(SCHEDULE_DAYS) \
+            or not all(isinstance(working, bool) for working in days.values()):
+        errors.append('schedule must map day names to true or false')
+        days = {}
+    return values, days, errors
+
+@employee_bp.route('/employees/bulk_update', methods=['PATCH'])
+@login_required
+def bulk_update_employees():
+    """Apply many employee field and schedule changes in one transaction.
+
+    By default nothing is written unless every change is valid; with
+    "partial": true the valid changes are applied and the rest reported.
+    """
+    data = request.get_json(silent=True) or {}
+    changes = data.get('updates')
+    max_rows = app.config['BULK_UPDATE_MAX_ROWS']
+    if not isinstance(changes, list) or not 1 <= len(changes) <= max_rows:
+        return jsonify({'error': f"updates must be a list of 1 to {max_rows} changes"}), 400
+    partial = data.get('partial', False) is True
+
+    def change_id(change):
+        employee_id = change.get('id') if isinstance(change, dict) else None
+        return employee_id if isinstance(employee_id, int) and not isinstance(employee_id, bool) else None
+
+    # One query decides ownership and the current department for the whole batch
+    ids = {change_id(change) for change in changes} - {None}
+    current_departments = dict(
+        db.session.query(Employee.id, JobClass.department_id).join(Employee.job_class)
+        .filter(Employee.id.in_(ids), JobClass.department_id.in_(user_department_ids(current_user.id)))
+    )
+    emails = [change['email'] for change in changes if isinstance(change, dict) and isinstance(change.get('email'), str)]
+    email_owners = dict(db.session.query(Employee.email, Employee.id).filter(Employee.email.in_(emails))) if emails else {}
+
+    results, employee_rows, schedule_days, department_ids = [], [], {}, set()
+    seen_ids, seen_emails = set(), set()
+    for change in changes:
+        employee_id = change_id(change)
+        if not isinstance(change, dict):
+            results.append({'id': None, 'status': 'error', 'errors': ['Each change must be an object']})
+            continue
+        values, days, errors = parse_bulk_change(change)
+        if employee_id not in current_departments:
+            errors.insert(0, 'Employee not found or you do not have permission to update this employee')
+        elif employee_id in seen_ids:
+            errors.append('Employee appears more than once')
+        seen_ids.add(employee_id)
+
+        job_class = owned_job_class(values['job_class_id']) if 'job_class_id' in values else None
+        if 'job_class_id' in values and not job_class:
+            errors.append('Invalid Job Class ID')
+        if 'email' in values:
+            if email_owners.get(values['email'], employee_id) != employee_id or values['email'] in seen_emails:
+                errors.append('Email already exists')
+            seen_emails.add(values['email'])
+
+        if errors:
+            results.append({'id': employee_id, 'status': 'error', 'errors': errors})
+            continue
+        department_ids.add(current_departments[employee_id])
+        if job_class:
+            department_ids.add(job_class['department_id'])
+        if values:
+            employee_rows.append({'id': employee_id, **values})
+        if days:
+            schedule_days[employee_id] = days
+        results.append({'id': employee_id, 'status': 'updated'})
+
+    failed = sum(result['status'] == 'error' for result in results)
+    if failed and not partial:
+        for result in results:
+            if result['status'] == 'updated':
+                result['status'] = 'not_applied'
+        return jsonify({'updated': 0, 'failed': failed, 'results': results}), 400
+
+    try:
+        if employee_rows:
+            db.session.execute(update(Employee), employee_rows)
+        if schedule_days:
+            scheduled = {employee_id for (employee_id,) in db.session.query(Schedule.employee_id)
+                         .filter(Schedule.employee_id.in_(list(schedule_days)))}
+            schedule_updates = [
+                {'b_employee_id': employee_id, 'keep_mask': 0x7f & ~Schedule.mask_for(dict.fromkeys(days, True)),
+                 'set_mask': Schedule.mask_for(days)}
+                for employee_id, days in schedule_days.items() if employee_id in scheduled
+            ]
+            schedule_inserts = [
+                {'employee_id': employee_id, 'days_mask': Schedule.mask_for(days), **Schedule.days_for(Schedule.mask_for(days))}
+                for employee_id, days in schedule_days.items() if employee_id not in scheduled
+            ]
+            if schedule_updates:
+                db.session.execute(partial_schedule_update(), schedule_updates)
+            if schedule_inserts:
+                db.session.execute(insert(Schedule), schedule_inserts)
+        bump_department_versions(*department_ids)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Another change took one of these emails; nothing was updated'}), 409
+
+    return jsonify({'updated': len(results) - failed, 'failed': failed, 'results': results}), 200
+
 app.register_blueprint(employee_bp)
\ No newline at end of file
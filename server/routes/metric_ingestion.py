@@ -0,0 +1,243 @@
+from flask import Blueprint, request, jsonify
+from models import db, Employee, EmployeeMetric, JobClass
+from config import app
+from reference_cache import metric_definitions, user_department_ids
+from etags import bump_department_versions
+from flask_login import login_required, current_user
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date
+import csv
+import json
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+metric_ingestion_bp = Blueprint('metric_ingestion_api', __name__, url_prefix='/labinv/api')
+
+INGEST_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def upsert_statement():
+    """INSERT ... ON CONFLICT (employee_id, metric_id, date) DO UPDATE SET value for this database."""
+    dialect = db.engine.dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise Exception(f"Metric ingestion needs upserts, which are not supported on {dialect}")
+    statement = UPSERT_DIALECTS[dialect](EmployeeMetric.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=['employee_id', 'metric_id', 'date'], set_={'value': statement.excluded.value}
+    )
+
+class BodyLines:
+    """A byte stream's lines as text, read in blocks and decoded one line at a time.
+
+    A byte that is not UTF-8 stops the body at the line holding it, and
+    offset is then the position of that line's first byte.
+    """
+
+    def __init__(self, stream, block_size=64 * 1024):
+        self.stream = stream
+        self.block_size = block_size
+        self.offset = 0
+
+    def decode(self, line):
+        text = line.decode('utf-8')
+        self.offset += len(line)
+        return text
+
+    def __iter__(self):
+        pending = b''
+        while block := self.stream.read(self.block_size):
+            lines = (pending + block).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield self.decode(line + b'\n')
+        if pending:
+            yield self.decode(pending)
+
+def ndjson_records(lines):
+    """Yield (line number, dict or error message) for each non-blank line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, 'line is not valid JSON'
+            continue
+        yield number, record if isinstance(record, dict) else 'line must be a JSON object'
+
+def csv_records(lines):
+    """Yield (row number, dict) for each non-blank row; the header is row 1."""
+    reader = csv.reader(lines)
+    try:
+        header = [column.strip().lower() for column in next(reader, [])]
+        for number, row in enumerate(reader, start=2):
+            if any(cell.strip() for cell in row):
+                yield number, dict(zip(header, row))
+    except csv.Error as e:
+        raise csv.Error(f"line {reader.line_num}: {e}")
+
+def parse_reading(record, metric_ids):
+    """Turn one record into (employee key, metric id, date, value), or raise ValueError with the reason.
+
+    The employee key is ('id', int) or ('email', str); metrics can be given
+    by metric_id or by name.
+    """
+    if record.get('employee_id') not in (None, ''):
+        try:
+            employee = ('id', int(record['employee_id']))
+        except (TypeError, ValueError):
+            raise ValueError('employee_id must be an integer')
+    elif record.get('email'):
+        employee = ('email', str(record['email']).strip())
+    else:
+        raise ValueError('employee_id or email is required')
+
+    if record.get('metric_id') not in (None, ''):
+        try:
+            metric_id = int(record['metric_id'])
+        except (TypeError, ValueError):
+            raise ValueError('metric_id must be an integer')
+        if metric_id not in metric_ids.values():
+            raise ValueError(f"unknown metric_id {metric_id}")
+    elif record.get('metric'):
+        metric_id = metric_ids.get(str(record['metric']).strip())
+        if metric_id is None:
+            raise ValueError(f"unknown metric {record['metric']!r}")
+    else:
+        raise ValueError('metric_id or metric is required')
+
+    try:
+        day = date.fromisoformat(str(record.get('date', '')).strip())
+    except ValueError:
+        raise ValueError('date must be a YYYY-MM-DD date')
+    try:
+        value = float(record.get('value'))
+    except (TypeError, ValueError):
+        raise ValueError('value must be a number')
+    if not math.isfinite(value):
+        raise ValueError('value must be a finite number')
+    return employee, metric_id, day, value
+
+def write_batch(batch, department_ids, statement):
+    """Resolve a batch's employees in one query and upsert its readings.
+
+    Returns {line number: error} for the readings that could not be
+    resolved. Later readings of the same employee, metric and day win.
+    """
+    keys = {reading[0] for _, reading in batch}
+    ids = [key for kind, key in keys if kind == 'id']
+    emails = [key for kind, key in keys if kind == 'email']
+    found = db.session.query(Employee.id, Employee.email, JobClass.department_id).join(Employee.job_class) \
+        .filter(JobClass.department_id.in_(department_ids)) \
+        .filter(or_(Employee.id.in_(ids), Employee.email.in_(emails))).all()
+    employees = {('id', employee_id): (employee_id, department_id) for employee_id, _, department_id in found}
+    employees.update({('email', email): (employee_id, department_id) for employee_id, email, department_id in found})
+
+    errors, rows, touched = {}, {}, set()
+    for number, (employee, metric_id, day, value) in batch:
+        if employee not in employees:
+            errors[number] = 'employee not found in your departments'
+            continue
+        employee_id, department_id = employees[employee]
+        rows[(employee_id, metric_id, day)] = value
+        touched.add(department_id)
+
+    if rows:
+        db.session.execute(statement, [
+            {'employee_id': employee_id, 'metric_id': metric_id, 'date': day, 'value': value}
+            for (employee_id, metric_id, day), value in rows.items()
+        ])
+        bump_department_versions(*touched)
+    db.session.commit()
+    return errors, len(rows)
+
+def empty_report():
+    return {'rows': 0, 'written': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+
+def ingest_readings(records, user_id, report):
+    """Validate, resolve and upsert readings in INGEST_BATCH_SIZE transactions.
+
+    report is filled in as batches commit, so it stays accurate when the
+    body turns out to be unreadable partway. In that case the readings
+    before the bad input are still written, and the error is re-raised.
+    """
+    statement = upsert_statement()
+    department_ids = user_department_ids(user_id)
+    metric_ids = {metric['name']: metric['id'] for metric in metric_definitions()}
+    batch_size = app.config['INGEST_BATCH_SIZE']
+    max_errors = app.config['INGEST_MAX_ERRORS']
+
+    def record_errors(errors):
+        report['failed'] += len(errors)
+        for number, message in sorted(errors.items()):
+            if len(report['errors']) < max_errors:
+                report['errors'].append({'line': number, 'error': message})
+            else:
+                report['errors_truncated'] = True
+
+    def flush(batch):
+        if batch:
+            errors, written = write_batch(batch, department_ids, statement)
+            record_errors(errors)
+            report['written'] += written
+
+    batch = []
+    try:
+        for number, record in records:
+            report['rows'] += 1
+            try:
+                if isinstance(record, str):
+                    raise ValueError(record)
+                batch.append((number, parse_reading(record, metric_ids)))
+            except ValueError as e:
+                record_errors({number: str(e)})
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+    except (UnicodeDecodeError, csv.Error):
+        flush(batch)
+        raise
+    flush(batch)
+
+    logger.info("Metric ingestion for user %s: %d rows, %d written, %d failed",
+                user_id, report['rows'], report['written'], report['failed'])
+    return report
+
+@metric_ingestion_bp.route('/employee_metrics/ingest', methods=['POST'])
+@login_required
+def ingest_employee_metrics():
+    """Upsert EmployeeMetric readings from an NDJSON or CSV request body.
+
+    Each record names an employee (employee_id or email), a metric
+    (metric_id or metric name), a date and a value. Re-sending a batch
+    overwrites the same readings rather than duplicating them.
+    """
+    fmt = request.args.get('format') or INGEST_FORMATS.get(request.mimetype)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson'}), 415
+
+    # Decode the body as it arrives rather than reading it into memory
+    lines = BodyLines(request.stream)
+    records = csv_records(lines) if fmt == 'csv' else ndjson_records(lines)
+    report = empty_report()
+    # Earlier batches are committed by the time the body turns out to be
+    # unreadable, so the error response carries the report so far
+    try:
+        ingest_readings(records, current_user.id, report)
+    except UnicodeDecodeError as e:
+        db.session.rollback()
+        offset = lines.offset + e.start
+        return jsonify({**report, 'error': f"Body must be UTF-8 text; byte {offset} is not", 'offset': offset}), 400
+    except csv.Error as e:
+        db.session.rollback()
+        return jsonify({**report, 'error': f"Malformed CSV at {e}"}), 400
+    return jsonify(report), 200
+
+app.register_blueprint(metric_ingestion_bp)
@@ -0,0 +1,43 @@
+from flask import Blueprint, Response, request, jsonify
+from flask_login import login_required, current_user
+from config import app
+from metrics import registry
+from profiling import load_profile
+import query_stats  # registers the per-request SQL event hooks
+import hmac
+
+monitoring_bp = Blueprint('monitoring_api', __name__, url_prefix='/labinv/api')
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint; needs METRICS_TOKEN as a bearer token, or an admin session."""
+    token = app.config['METRICS_TOKEN']
+    if token:
+        header = request.headers.get('Authorization', '')
+        supplied = header[7:] if header.startswith('Bearer ') else ''
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify({'error': 'Invalid metrics token'}), 401
+    elif not (current_user.is_authenticated and current_user.is_admin):
+        return jsonify({'error': 'Admin access required'}), 403
+
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@monitoring_bp.route('/profiles/<profile_id>', methods=['GET'])
+@login_required
+def download_profile(profile_id):
+    """Download a saved request profile as .prof (default) or collapsed stacks."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    fmt = request.args.get('format', 'prof')
+    if fmt not in ('prof', 'collapsed'):
+        return jsonify({'error': "Format must be 'prof' or 'collapsed'"}), 400
+
+    data = load_profile(profile_id, fmt)
+    if data is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    mimetype = 'application/octet-stream' if fmt == 'prof' else 'text/plain'
+    response = Response(data, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{profile_id}.{fmt}"'
+    return response
+
+app.register_blueprint(monitoring_bp)
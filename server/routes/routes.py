@@ -1,3 +1,7 @@
 from .user_management import *
 from .employee_management import *
-from .employee_allocation import *
\ No newline at end of file
+from .employee_allocation import *
+from .monitoring import *
+from .employee_import import *
+from .employee_export import *
+from .metric_ingestion import *
\ No newline at end of file
@@ -4,6 +4,7 @@ from config import app
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, login_required, logout_user, current_user
 from middleware import check_origin
+from reference_cache import reference_cache, user_key
 import stripe
 import os
 from dotenv import load_dotenv
@@ -152,6 +153,7 @@ def login():
 @api_bp.route('/logout', methods=['POST'])
 @login_required
 def logout():
+    reference_cache.invalidate(user_key(current_user.id))
     logout_user()
     return jsonify({"message": "Logged out successfully"}), 200
 
@@ -139,12 +139,13 @@ def seed():
         # Create employee metrics
         for employee in employees:
             for metric in employee.job_class.metrics:
-                for _ in range(3):  # 3 metrics per employee per metric type
+                # 3 metrics per employee per metric type, on distinct days (one reading per day)
+                for days_ago in random.sample(range(1, 16), 3):
                     employee_metric = EmployeeMetric(
                         employee=employee,
                         metric=metric,
                         value=random.uniform(50, 150),
-                        date=datetime.now() - timedelta(days=random.randint(1, 15))
+                        date=datetime.now() - timedelta(days=days_ago)
                     )
                     db.session.add(employee_metric)
         db.session.commit()
@@ -0,0 +1,182 @@
+"""Compiled serializers that produce the same output as SerializerMixin.to_dict.
+
+to_dict re-reads serialize_rules, introspects the mapper and forks a schema
+tree for every object it serializes. These serializers replay the
+sqlalchemy_serializer schema logic once per (model, only, rules) combination.
+The result is generated as one flat Python function with a dict literal per
+model, and is cached.
+
+Models that the compiler cannot reproduce exactly fall back to to_dict.
+That covers:
+- custom serialize_types, serializable_keys or a tzinfo callback,
+- properties or other non-column, non-relationship keys,
+- rules that recurse without end.
+
+dumps() renders JSON exactly as Flask's jsonify does, with a reused
+encoder. Set JSON_ENCODER=orjson to use orjson when it is installed. That
+output is faster but not byte-identical: it writes non-ASCII characters
+raw and formats float exponents differently.
+"""
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import ColumnProperty, RelationshipProperty, configure_mappers
+from sqlalchemy_serializer import SerializerMixin
+from sqlalchemy_serializer.lib.schema import Schema
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_DEPTH = 16
+ATOMIC_TYPES = (int, str, float, bool, type(None))
+
+_serializers = {}
+_lock = threading.Lock()
+_encoder = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(',', ':'))
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class _Fallback(Exception):
+    """Raised at run time for a value the compiled code cannot format."""
+    pass
+
+
+def _uses_defaults(cls):
+    return (
+        not cls.serialize_types and not cls.serializable_keys and not cls.exclude_values
+        and not cls.auto_serialize_properties and not cls.serialize_columns
+        and cls.get_tzinfo is SerializerMixin.get_tzinfo
+    )
+
+
+class _Compiler:
+    def __init__(self, root):
+        self.date_format = root.date_format
+        self.datetime_format = root.datetime_format
+        self.lines = []
+        self.count = 0
+
+    def value_converter(self):
+        date_format, datetime_format = self.date_format, self.datetime_format
+
+        def convert(value):
+            # Same dispatch order as Serializer.init_callbacks for the types columns hold
+            if isinstance(value, datetime):
+                return value.strftime(datetime_format)
+            if isinstance(value, date):
+                return value.strftime(date_format)
+            raise _Fallback(type(value).__name__)
+        return convert
+
+    def compile_model(self, cls, schema, depth):
+        if depth > MAX_DEPTH:
+            raise NotCompilable(f"rules for {cls.__name__} nest deeper than {MAX_DEPTH}")
+        if not issubclass(cls, SerializerMixin) or not _uses_defaults(cls):
+            raise NotCompilable(f"{cls.__name__} customizes serialization")
+
+        schema.update(only=cls.serialize_only, extend=cls.serialize_rules)
+        mapper = sa_inspect(cls)
+        keys = schema.keys
+        if schema.is_greedy:
+            keys.update(attr.key for attr in mapper.attrs)
+
+        name = f"_serialize_{cls.__name__}_{self.count}"
+        self.count += 1
+        items = []
+        for key in sorted(keys):
+            if not schema.is_included(key):
+                continue
+            prop = mapper.attrs.get(key)
+            if isinstance(prop, ColumnProperty):
+                items.append((key, f"_v if type(_v := obj.{key}) in _ATOMIC else _convert(_v)"))
+            elif isinstance(prop, RelationshipProperty):
+                child = self.compile_model(prop.mapper.class_, schema.fork(key), depth + 1)
+                if prop.uselist:
+                    items.append((key, f"[{child}(item) for item in obj.{key}]"))
+                else:
+                    items.append((key, f"None if (_r := obj.{key}) is None else {child}(_r)"))
+            else:
+                raise NotCompilable(f"{cls.__name__}.{key} is not a column or relationship")
+
+        body = ',\n        '.join(f"{key!r}: ({expr})" for key, expr in items)
+        self.lines.append(f"def {name}(obj):\n    return {{\n        {body}\n    }}\n")
+        return name
+
+    def build(self, cls, only, rules):
+        schema = Schema()
+        schema.update(only=only, extend=rules)
+        entry = self.compile_model(cls, schema, 0)
+        namespace = {'_ATOMIC': ATOMIC_TYPES, '_convert': self.value_converter()}
+        exec(compile('\n'.join(self.lines), f"<serializer {cls.__name__}>", 'exec'), namespace)
+        return namespace[entry]
+
+
+def _compile(cls, only, rules):
+    configure_mappers()
+    try:
+        return _Compiler(cls).build(cls, only, rules)
+    except NotCompilable:
+        return None
+
+
+def _with_fallback(compiled, only, rules):
+    def serializer(obj):
+        if compiled is not None:
+            try:
+                return compiled(obj)
+            except _Fallback:
+                pass
+        return obj.to_dict(only=only, rules=rules)
+    return serializer
+
+
+def serializer_for(cls, only=(), rules=()):
+    """Return a cached callable obj -> dict equivalent to obj.to_dict(only, rules)."""
+    key = (cls, tuple(only), tuple(rules))
+    serializer = _serializers.get(key)
+    if serializer is None:
+        with _lock:
+            serializer = _serializers.get(key)
+            if serializer is None:
+                serializer = _with_fallback(_compile(cls, key[1], key[2]), key[1], key[2])
+                _serializers[key] = serializer
+    return serializer
+
+
+def serialize(obj, only=(), rules=()):
+    return serializer_for(type(obj), only, rules)(obj)
+
+
+def serialize_many(objs, only=(), rules=()):
+    serializers = {}
+    result = []
+    for obj in objs:
+        cls = type(obj)
+        if cls not in serializers:
+            serializers[cls] = serializer_for(cls, only, rules)
+        result.append(serializers[cls](obj))
+    return result
+
+
+def dumps(data):
+    """Encode data as Flask's jsonify would in production (compact, sorted keys)."""
+    if orjson is not None and current_app.config.get('JSON_ENCODER') == 'orjson':
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode() + '\n'
+    return _encoder.encode(data) + '\n'
+
+
+def json_response(data, status=200):
+    """Like jsonify(data) with the given status, but with the reused encoder."""
+    if current_app.json.compact is False or (current_app.json.compact is None and current_app.debug):
+        # Pretty-printed debug output stays with Flask's provider
+        response = current_app.json.response(data)
+        response.status_code = status
+        return response
+    return current_app.response_class(dumps(data), status=status, mimetype=current_app.json.mimetype)
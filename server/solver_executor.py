@@ -0,0 +1,170 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+
+import pulp
+
+logger = logging.getLogger(__name__)
+
+SOLVER_STATUS_OPTIMAL = 'optimal'
+SOLVER_STATUS_TIMED_OUT = 'timed_out'
+
+
+class SolverError(Exception):
+    pass
+
+
+class SolverKilled(SolverError):
+    """Raised when a solve overran its hard deadline or was cancelled."""
+    pass
+
+
+def _solve_model_dict(model_dict, options):
+    variables, model = pulp.LpProblem.fromDict(model_dict)
+    model.solve(pulp.PULP_CBC_CMD(msg=False, **options))
+    return {
+        'status': model.status,
+        'sol_status': model.sol_status,
+        'values': {name: variable.varValue for name, variable in variables.items()}
+    }
+
+
+def _worker_loop(conn):
+    # Own process group, so killing the worker also takes down its cbc subprocess
+    os.setsid()
+    while True:
+        try:
+            model_dict, options = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send(_solve_model_dict(model_dict, options))
+        except Exception as e:
+            conn.send({'error': str(e)})
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SolverExecutor:
+    """Run CBC solves on a pool of long-lived worker processes.
+
+    Each solve gets a CBC time limit, MIP gap and thread count. A worker that
+    is still busy ``kill_grace`` seconds after its time limit, or whose solve
+    is cancelled, is killed together with its cbc process and replaced.
+    """
+
+    def __init__(self, max_workers=2, time_limit=30, gap_rel=None, threads=1, kill_grace=5):
+        self.max_workers = max_workers
+        self.time_limit = time_limit
+        self.gap_rel = gap_rel
+        self.threads = threads
+        self.kill_grace = kill_grace
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._busy = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        if 'forkserver' in methods:
+            self._context.set_forkserver_preload([__name__])
+
+    def solve(self, model, time_limit=None, gap_rel=None, threads=None, cancel_key=None, warm_start=False):
+        """Solve a PuLP model on a worker process and load the solution back into it.
+
+        With warm_start, the variables' current values are passed to CBC as a
+        MIP start. Returns 'optimal', or 'timed_out' when CBC hit the time
+        limit and the model holds the best incumbent found so far.
+        """
+        time_limit = self.time_limit if time_limit is None else time_limit
+        options = {
+            'timeLimit': time_limit,
+            'gapRel': self.gap_rel if gap_rel is None else gap_rel,
+            'threads': self.threads if threads is None else threads,
+            'warmStart': warm_start
+        }
+
+        with self._slots:
+            result = self._run(model.toDict(), options, time_limit + self.kill_grace, cancel_key)
+
+        if 'error' in result:
+            raise SolverError(result['error'])
+
+        for variable in model.variables():
+            variable.varValue = result['values'].get(variable.name)
+        model.status = result['status']
+        model.sol_status = result['sol_status']
+
+        if model.sol_status == pulp.LpSolutionOptimal:
+            return SOLVER_STATUS_OPTIMAL
+        if model.sol_status == pulp.LpSolutionIntegerFeasible:
+            return SOLVER_STATUS_TIMED_OUT
+        raise SolverError("No feasible solution found")
+
+    def cancel(self, cancel_key):
+        """Kill the solve registered under cancel_key; True if one was running."""
+        with self._lock:
+            worker = self._busy.get(cancel_key)
+            if worker is None:
+                return False
+            self._cancelled.add(cancel_key)
+        worker.kill()
+        return True
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+    def _run(self, model_dict, options, deadline, cancel_key):
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            worker = _Worker(self._context)
+
+        if cancel_key is not None:
+            with self._lock:
+                self._busy[cancel_key] = worker
+
+        try:
+            worker.conn.send((model_dict, options))
+            result = worker.conn.recv() if worker.conn.poll(deadline) else None
+        except (EOFError, OSError):
+            result = None
+        finally:
+            with self._lock:
+                self._busy.pop(cancel_key, None)
+                cancelled = cancel_key in self._cancelled
+                self._cancelled.discard(cancel_key)
+
+        if result is not None and not cancelled:
+            self._idle.put(worker)
+            return result
+
+        if worker.process.exitcode is None:
+            worker.kill()
+        if cancelled:
+            raise SolverKilled("Solve was cancelled")
+        logger.warning(f"Solver worker {worker.process.pid} killed after {deadline}s")
+        raise SolverKilled(f"Solver did not finish within {deadline} seconds")
@@ -0,0 +1,15 @@
+"""Server tests.
+
+Run from the server directory:
+
+    python -m unittest discover -s tests -t .
+
+Every run gets its own SQLite file (DATABASE_URL is set before config is
+imported), so the development database is never touched.
+"""
+import os
+import tempfile
+
+os.environ.setdefault(
+    'DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='smart-roster-tests-'), 'test.db')
+)
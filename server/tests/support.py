@@ -0,0 +1,57 @@
+"""Shared setup for tests that need the app and a migrated database."""
+import os
+import re
+import threading
+
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+import app as _app  # noqa: F401 -- registers every blueprint
+from config import app
+from models import db, User
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+_migrate_lock = threading.Lock()
+_migrated = False
+
+
+def migrate_database():
+    """Bring the test database to the latest migration, once per run."""
+    global _migrated
+    with _migrate_lock:
+        if not _migrated:
+            with app.app_context():
+                upgrade(directory=MIGRATIONS)
+            _migrated = True
+
+
+def create_user(username, password='TestPass123!', is_admin=False):
+    """Add a subscribed user and return its id."""
+    with app.app_context():
+        user = User(username=username, email=f"{username}@example.com", is_admin=is_admin, has_subscription=True)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def logged_in_client(username, password='TestPass123!'):
+    client = app.test_client()
+    response = client.post('/labinv/api/login', json={'username': username, 'password': password})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return client
+
+
+def query_plan(statement):
+    """SQLite's EXPLAIN QUERY PLAN for a SQL string or SQLAlchemy statement, one detail line per step."""
+    with app.app_context():
+        if not isinstance(statement, str):
+            statement = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        return [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}"))]
+
+
+def searches_index(plan, table, index):
+    """True when a plan step looks rows of table up through index (covering or not)."""
+    pattern = re.compile(rf"^SEARCH {table} USING (COVERING )?INDEX {index}\b")
+    return any(pattern.match(step) for step in plan)
@@ -0,0 +1,153 @@
+"""Bulk employee updates: all-or-nothing by default, partial on request."""
+from datetime import date
+import unittest
+
+from sqlalchemy import event
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, Department, Employee, JobClass, Schedule
+
+BULK_UPDATE = '/labinv/api/employees/bulk_update'
+NOT_FOUND = 'Employee not found or you do not have permission to update this employee'
+
+
+class BulkUpdateTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        user_id = create_user('bulk_user')
+        other_id = create_user('bulk_other')
+        with app.app_context():
+            job_class = JobClass(name='Bulk class', department=Department(name='Bulk', user_id=user_id))
+            second_class = JobClass(name='Bulk second class', department=Department(name='Bulk 2', user_id=user_id))
+            other_class = JobClass(name='Bulk other class', department=Department(name='Not bulk', user_id=other_id))
+            employees = [
+                Employee(first_name='Bu', last_name=f"Lk{i}", email=f"bulk{i}@example.com", hire_date=date(2024, 1, 1),
+                         hourly_rate=20, job_class=job_class)
+                for i in range(3)
+            ]
+            other = Employee(first_name='Not', last_name='Mine', email='bulk.other@example.com',
+                             hire_date=date(2024, 1, 1), job_class=other_class)
+            db.session.add_all([*employees, second_class, other])
+            db.session.commit()
+            cls.employee_ids = [employee.id for employee in employees]
+            cls.other_employee_id = other.id
+            cls.job_class_id = job_class.id
+            cls.second_class_id = second_class.id
+            cls.other_class_id = other_class.id
+        cls.client = logged_in_client('bulk_user')
+
+    def setUp(self):
+        with app.app_context():
+            for i, employee_id in enumerate(self.employee_ids):
+                employee = db.session.get(Employee, employee_id)
+                employee.last_name, employee.email = f"Lk{i}", f"bulk{i}@example.com"
+                employee.hourly_rate, employee.job_class_id = 20, self.job_class_id
+                if employee.schedule:
+                    db.session.delete(employee.schedule)
+            db.session.commit()
+            db.session.add(Schedule(employee_id=self.employee_ids[0], monday=True, wednesday=True))
+            db.session.commit()
+
+    def bulk_update(self, updates, **options):
+        return self.client.patch(BULK_UPDATE, json={'updates': updates, **options})
+
+    def employee(self, employee_id):
+        with app.app_context():
+            employee = db.session.get(Employee, employee_id)
+            schedule = employee.schedule and {day: getattr(employee.schedule, day) for day in ('monday', 'tuesday', 'wednesday')}
+            return employee.last_name, employee.hourly_rate, employee.job_class_id, schedule
+
+    def test_valid_batch_is_one_transaction(self):
+        commits = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn: commits.append(conn)
+        event.listen(engine, 'commit', listener)
+        try:
+            response = self.bulk_update([
+                {'id': self.employee_ids[0], 'last_name': 'Renamed', 'schedule': {'tuesday': True, 'wednesday': False}},
+                {'id': self.employee_ids[1], 'hourly_rate': '22.5', 'job_class_id': self.second_class_id},
+                {'id': self.employee_ids[2], 'schedule': {'monday': True}},
+            ])
+        finally:
+            event.remove(engine, 'commit', listener)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['updated'], 3)
+        self.assertEqual(len(commits), 1)
+        # Existing schedules keep the days a change leaves out; missing ones are created
+        self.assertEqual(self.employee(self.employee_ids[0]),
+                         ('Renamed', 20, self.job_class_id, {'monday': True, 'tuesday': True, 'wednesday': False}))
+        self.assertEqual(self.employee(self.employee_ids[1]), ('Lk1', 22.5, self.second_class_id, None))
+        self.assertEqual(self.employee(self.employee_ids[2]),
+                         ('Lk2', 20, self.job_class_id, {'monday': True, 'tuesday': False, 'wednesday': False}))
+
+    def test_any_error_applies_nothing_by_default(self):
+        response = self.bulk_update([
+            {'id': self.employee_ids[0], 'last_name': 'Renamed'},
+            {'id': self.employee_ids[1], 'hourly_rate': 'lots'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {'updated': 0, 'failed': 1, 'results': [
+            {'id': self.employee_ids[0], 'status': 'not_applied'},
+            {'id': self.employee_ids[1], 'status': 'error', 'errors': ['Invalid hourly_rate']},
+        ]})
+        self.assertEqual(self.employee(self.employee_ids[0])[0], 'Lk0')
+
+    def test_partial_applies_valid_changes(self):
+        response = self.bulk_update([
+            {'id': self.employee_ids[0], 'last_name': 'Renamed'},
+            {'id': self.employee_ids[1], 'hire_date': '01/02/2024', 'colour': 'blue'},
+            {'id': self.employee_ids[2], 'schedule': {'funday': True}},
+        ], partial=True)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual((body['updated'], body['failed']), (1, 2))
+        self.assertEqual([result['status'] for result in body['results']], ['updated', 'error', 'error'])
+        self.assertEqual(body['results'][1]['errors'], ['Unknown fields: colour', 'Invalid hire_date'])
+        self.assertEqual(body['results'][2]['errors'], ['schedule must map day names to true or false'])
+        self.assertEqual(self.employee(self.employee_ids[0])[0], 'Renamed')
+
+    def test_duplicate_ids_and_emails_are_reported(self):
+        response = self.bulk_update([
+            {'id': self.employee_ids[0], 'last_name': 'First'},
+            {'id': self.employee_ids[0], 'last_name': 'Second'},
+            {'id': self.employee_ids[1], 'email': 'bulk.new@example.com'},
+            {'id': self.employee_ids[2], 'email': 'bulk.new@example.com'},
+            {'id': self.employee_ids[2], 'email': 'bulk0@example.com'},
+        ], partial=True)
+        results = response.get_json()['results']
+        self.assertEqual([result['status'] for result in results], ['updated', 'error', 'updated', 'error', 'error'])
+        self.assertEqual(results[1]['errors'], ['Employee appears more than once'])
+        self.assertEqual(results[3]['errors'], ['Email already exists'])
+        self.assertEqual(results[4]['errors'], ['Employee appears more than once', 'Email already exists'])
+        self.assertEqual(self.employee(self.employee_ids[0])[0], 'First')
+
+    def test_other_users_employees_and_job_classes_are_rejected(self):
+        response = self.bulk_update([
+            {'id': self.other_employee_id, 'last_name': 'Taken'},
+            {'id': self.employee_ids[0], 'job_class_id': self.other_class_id},
+            {'id': 'abc', 'last_name': 'Nobody'},
+            'not an object',
+        ], partial=True)
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual(results, [
+            {'id': self.other_employee_id, 'status': 'error', 'errors': [NOT_FOUND]},
+            {'id': self.employee_ids[0], 'status': 'error', 'errors': ['Invalid Job Class ID']},
+            {'id': None, 'status': 'error', 'errors': [NOT_FOUND]},
+            {'id': None, 'status': 'error', 'errors': ['Each change must be an object']},
+        ])
+        with app.app_context():
+            self.assertEqual(db.session.get(Employee, self.other_employee_id).last_name, 'Mine')
+
+    def test_bad_payloads(self):
+        self.assertEqual(self.client.patch(BULK_UPDATE, json={}).status_code, 400)
+        self.assertEqual(self.bulk_update([]).status_code, 400)
+        too_many = [{'id': self.employee_ids[0]}] * (app.config['BULK_UPDATE_MAX_ROWS'] + 1)
+        self.assertEqual(self.bulk_update(too_many).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Streaming exports of employees, schedules and metric readings."""
+from datetime import date
+import csv
+import io
+import json
+import unittest
+
+from openpyxl import load_workbook
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, Department, Employee, EmployeeMetric, JobClass, Metric, Schedule
+
+EXPORT = '/labinv/api/export'
+EMPLOYEE_COLUMNS = ['id', 'first_name', 'last_name', 'email', 'hire_date', 'hourly_rate', 'job_class_id',
+                    'job_class', 'department_id', 'department']
+
+
+class EmployeeExportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        user_id = create_user('export_user')
+        create_user('export_empty')
+        with app.app_context():
+            metric = Metric(name='export metric', unit='cases')
+            job_class = JobClass(name='Export class', department=Department(name='Export', user_id=user_id))
+            employees = [
+                Employee(first_name='Ex', last_name=f"Port{i}", email=f"export{i}@example.com",
+                         hire_date=date(2024, 1, 1 + i), hourly_rate=20 + i, job_class=job_class,
+                         schedule=Schedule(monday=True, tuesday=i > 0),
+                         metric_values=[EmployeeMetric(metric=metric, date=date(2024, 3, day), value=i * day)
+                                        for day in (1, 2)])
+                for i in range(3)
+            ]
+            db.session.add_all(employees)
+            db.session.commit()
+            cls.employee_ids = [employee.id for employee in employees]
+            cls.job_class_id = job_class.id
+            cls.department_id = job_class.department_id
+        cls.client = logged_in_client('export_user')
+
+    def setUp(self):
+        chunk_size = app.config['EXPORT_CHUNK_SIZE']
+        self.addCleanup(app.config.__setitem__, 'EXPORT_CHUNK_SIZE', chunk_size)
+        # Smaller than the row count, so every format writes several batches
+        app.config['EXPORT_CHUNK_SIZE'] = 2
+
+    def export(self, dataset, client=None, **args):
+        response = (client or self.client).get(f"{EXPORT}/{dataset}", query_string=args)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_attachment(self, response, dataset, fmt, mimetype):
+        self.assertEqual(response.mimetype, mimetype)
+        self.assertEqual(response.headers['Content-Disposition'],
+                         f'attachment; filename="{dataset}-{date.today():%Y%m%d}.{fmt}"')
+
+    def test_csv(self):
+        response = self.export('employees', format='csv')
+        self.assert_attachment(response, 'employees', 'csv', 'text/csv')
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows[0], EMPLOYEE_COLUMNS)
+        self.assertEqual(rows[1:], [
+            [str(employee_id), 'Ex', f"Port{i}", f"export{i}@example.com", f"2024-01-0{i + 1}", f"{20 + i}.0",
+             str(self.job_class_id), 'Export class', str(self.department_id), 'Export']
+            for i, employee_id in enumerate(self.employee_ids)
+        ])
+
+    def test_ndjson(self):
+        response = self.export('employee_metrics', format='ndjson', start_date='2024-03-02')
+        self.assert_attachment(response, 'employee_metrics', 'ndjson', 'application/x-ndjson')
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([(record['employee_id'], record['date'], record['value'], record['metric'], record['unit'])
+                          for record in records],
+                         [(employee_id, '2024-03-02', i * 2.0, 'export metric', 'cases')
+                          for i, employee_id in enumerate(self.employee_ids)])
+
+    def test_xlsx(self):
+        response = self.export('schedules', format='xlsx')
+        self.assert_attachment(response, 'schedules', 'xlsx',
+                               'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        sheet = load_workbook(io.BytesIO(response.get_data()), read_only=True)['schedules']
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:5], ('employee_id', 'first_name', 'last_name', 'department_id', 'sunday'))
+        self.assertEqual([(row[0], row[2], row[rows[0].index('monday')], row[rows[0].index('tuesday')])
+                          for row in rows[1:]],
+                         [(employee_id, f"Port{i}", True, i > 0) for i, employee_id in enumerate(self.employee_ids)])
+
+    def test_empty_result(self):
+        client = logged_in_client('export_empty')
+        csv_body = self.export('employees', client, format='csv').get_data(as_text=True)
+        self.assertEqual(list(csv.reader(io.StringIO(csv_body))), [EMPLOYEE_COLUMNS])
+
+        self.assertEqual(self.export('employees', client, format='ndjson').get_data(), b'')
+
+        xlsx = self.export('employees', client, format='xlsx').get_data()
+        rows = list(load_workbook(io.BytesIO(xlsx), read_only=True)['employees'].iter_rows(values_only=True))
+        self.assertEqual(rows, [tuple(EMPLOYEE_COLUMNS)])
+
+    def test_department_filter_outside_own_departments_is_empty(self):
+        body = self.export('employees', format='ndjson', department_id=str(self.department_id + 1000)).get_data()
+        self.assertEqual(body, b'')
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(f"{EXPORT}/payroll").status_code, 404)
+        self.assertEqual(self.client.get(f"{EXPORT}/employees?format=pdf").status_code, 400)
+        self.assertEqual(self.client.get(f"{EXPORT}/employee_metrics?start_date=March").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
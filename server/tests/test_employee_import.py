@@ -0,0 +1,117 @@
+"""Importing employees from uploaded CSV and xlsx files."""
+from datetime import date
+import io
+import unittest
+
+from openpyxl import Workbook
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, Department, Employee, JobClass
+
+IMPORT = '/labinv/api/employees/import'
+HEADER = 'First Name,Last Name,Email,Hire Date,Hourly Rate,Job Class ID\n'
+
+
+class EmployeeImportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        user_id = create_user('import_user')
+        other_id = create_user('import_other')
+        with app.app_context():
+            job_class = JobClass(name='Import class', department=Department(name='Import', user_id=user_id))
+            other_class = JobClass(name='Import other class', department=Department(name='Other', user_id=other_id))
+            db.session.add_all([job_class, other_class])
+            db.session.commit()
+            cls.job_class_id = job_class.id
+            cls.other_class_id = other_class.id
+        cls.client = logged_in_client('import_user')
+
+    def setUp(self):
+        chunk_size = app.config['IMPORT_CHUNK_SIZE']
+        self.addCleanup(app.config.__setitem__, 'IMPORT_CHUNK_SIZE', chunk_size)
+        with app.app_context():
+            Employee.query.filter(Employee.job_class_id == self.job_class_id).delete()
+            db.session.commit()
+
+    def row(self, i, **overrides):
+        values = {'first': f"Im{i}", 'last': 'Porter', 'email': f"import{i}@example.com",
+                  'hire_date': '2024-02-01', 'rate': '21.5', 'job_class_id': self.job_class_id}
+        values.update(overrides)
+        return ','.join(str(values[key]) for key in ('first', 'last', 'email', 'hire_date', 'rate', 'job_class_id')) + '\n'
+
+    def upload(self, body, filename='employees.csv', **form):
+        data = {'file': (io.BytesIO(body), filename), **form}
+        return self.client.post(IMPORT, data=data, content_type='multipart/form-data')
+
+    def imported_emails(self):
+        with app.app_context():
+            return sorted(email for (email,) in db.session.query(Employee.email)
+                          .filter(Employee.job_class_id == self.job_class_id))
+
+    def test_valid_csv(self):
+        response = self.upload((HEADER + ''.join(self.row(i) for i in range(3))).encode())
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual((report['rows'], report['imported'], report['failed'], report['errors']), (3, 3, 0, []))
+        self.assertEqual(self.imported_emails(), [f"import{i}@example.com" for i in range(3)])
+        with app.app_context():
+            employee = Employee.query.filter_by(email='import0@example.com').one()
+            self.assertEqual((employee.hire_date, employee.hourly_rate), (date(2024, 2, 1), 21.5))
+
+    def test_row_errors_report_line_numbers(self):
+        body = HEADER + self.row(0) + '\n' + self.row(1, email='not-an-email') + ',,,,,\n\n' \
+            + self.row(2, hire_date='02/01/2024', rate='-1') + self.row(3, job_class_id=self.other_class_id) \
+            + self.row(4)
+        report = self.upload(body.encode()).get_json()
+        self.assertEqual((report['rows'], report['imported'], report['failed']), (5, 2, 3))
+        # Blank lines 3, 5 and 6 are skipped but still counted in the line numbers
+        self.assertEqual(report['errors'], [
+            {'row': 4, 'errors': ['email is missing or invalid']},
+            {'row': 7, 'errors': ['hire_date must be a YYYY-MM-DD date', 'hourly_rate must be a non-negative number']},
+            {'row': 8, 'errors': ['job_class_id is not one of your job classes']},
+        ])
+        self.assertEqual(self.imported_emails(), ['import0@example.com', 'import4@example.com'])
+
+    def test_chunks_keep_line_numbers_and_seen_emails(self):
+        app.config['IMPORT_CHUNK_SIZE'] = 2
+        body = HEADER + self.row(0) + '\n' + self.row(1) + self.row(2) + '\n\n' \
+            + self.row(3, email='import0@example.com') + self.row(4)
+        report = self.upload(body.encode()).get_json()
+        self.assertEqual((report['rows'], report['imported'], report['failed']), (5, 4, 1))
+        self.assertEqual(report['errors'], [{'row': 8, 'errors': ['email appears earlier in the file']}])
+        self.assertEqual(len(self.imported_emails()), 4)
+
+    def test_existing_email_and_dry_run(self):
+        self.upload((HEADER + self.row(0)).encode())
+        report = self.upload((HEADER + self.row(0) + self.row(1)).encode(), dry_run='true').get_json()
+        self.assertTrue(report['dry_run'])
+        self.assertEqual((report['imported'], report['errors']),
+                         (1, [{'row': 2, 'errors': ['email already exists']}]))
+        self.assertEqual(self.imported_emails(), ['import0@example.com'])
+
+    def test_xlsx_with_empty_rows(self):
+        app.config['IMPORT_CHUNK_SIZE'] = 2
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(HEADER.strip().split(','))
+        sheet.append(['Xl', 'Sx', 'importx0@example.com', date(2024, 3, 1), 20, self.job_class_id])
+        sheet.append([None] * 6)
+        sheet.append(['Xl', '', 'importx1@example.com', '2024-03-01', 20, self.job_class_id])
+        sheet.append(['Xl', 'Sx', 'importx2@example.com', '2024-03-01', 20, self.job_class_id])
+        body = io.BytesIO()
+        workbook.save(body)
+        report = self.upload(body.getvalue(), 'employees.xlsx').get_json()
+        self.assertEqual((report['rows'], report['imported']), (3, 2))
+        self.assertEqual(report['errors'], [{'row': 4, 'errors': ['last_name is required']}])
+
+    def test_missing_columns_and_bad_files(self):
+        response = self.upload(b'first_name,email\nA,a@example.com\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing columns', response.get_json()['error'])
+        self.assertEqual(self.upload(b'x', 'employees.txt').status_code, 400)
+        self.assertEqual(self.upload(b'not a zip', 'employees.xlsx').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Rest rules where the weeks of a rolling-horizon roster meet."""
+import unittest
+
+from horizon import (FREE, NEEDS_SUNDAY, NEW, SATURDAY, SUNDAY, _assign, has_internal_rest_pair,
+                     solve_rolling_horizon, solve_week)
+from routes.employee_allocation import solve_horizon
+
+WEIGHTS = {'over': 10, 'under': 5}
+
+# (schedule type, three weeks of demand); each ends with crews owing a Sunday rest
+HORIZONS = [
+    (4, [11, 10, 4, 7, 11, 9, 12, 11, 3, 11, 2, 9, 6, 10, 5, 5, 9, 10, 10, 9, 8]),
+    (4, [5, 12, 4, 10, 8, 2, 12, 3, 4, 11, 2, 6, 2, 6, 9, 11, 8, 8, 8, 11, 9]),
+    (5, [12, 2, 6, 11, 12, 4, 7, 10, 11, 11, 3, 12, 5, 12, 11, 6, 6, 3, 3, 9, 12]),
+    (5, [3, 7, 3, 8, 4, 2, 6, 8, 8, 3, 2, 11, 11, 2, 8, 11, 7, 10, 6, 10, 5]),
+]
+
+
+class SeamRuleTest(unittest.TestCase):
+    def test_crews_keep_rest_rules_across_weeks(self):
+        for schedule_type, required_heads in HORIZONS:
+            with self.subTest(schedule_type=schedule_type, required_heads=required_heads):
+                result = solve_rolling_horizon(required_heads, schedule_type, WEIGHTS)
+                self.assertTrue(any(crew['needs_sunday'] for crew in result['crews']))
+                for crew in result['crews']:
+                    history = crew['history']
+                    started = next(w for w, mask in enumerate(history) if mask is not None)
+                    # Carried crews are rostered every week once added
+                    self.assertTrue(all(mask is not None for mask in history[started:]), history)
+                    for w in range(started, len(history)):
+                        mask = history[w]
+                        self.assertEqual(bin(mask).count('1'), schedule_type)
+                        if has_internal_rest_pair(mask):
+                            continue
+                        # Otherwise Saturday starts a rest pair that ends on the next Sunday
+                        self.assertFalse(mask & SATURDAY, history)
+                        if w + 1 < len(history):
+                            self.assertFalse(history[w + 1] & SUNDAY, history)
+                    self.assertEqual(crew['needs_sunday'], not has_internal_rest_pair(history[-1]))
+
+    def test_carried_crews_are_never_released(self):
+        # Demand drops by half after week 1; the crews stay and the week is overstaffed
+        required_heads = [10] * 7 + [5] * 7
+        result = solve_rolling_horizon(required_heads, 5, WEIGHTS)
+        week_workers = [sum(crew['workers'] for crew in result['crews'] if crew['history'][w] is not None)
+                        for w in range(2)]
+        self.assertEqual(week_workers[0], week_workers[1])
+        self.assertGreater(result['objective'], 0)
+
+    def test_crews_owing_sunday_rest_do_not_work_sunday(self):
+        allocations, status, _ = solve_week([9, 6, 6, 6, 6, 6, 6], 5, WEIGHTS, {FREE: 2, NEEDS_SUNDAY: 4})
+        self.assertEqual(status, 'optimal')
+        carried = {FREE: 0, NEEDS_SUNDAY: 0}
+        for state, mask, workers in allocations:
+            if state == NEEDS_SUNDAY:
+                self.assertFalse(mask & SUNDAY)
+            if state != NEW:
+                carried[state] += workers
+        self.assertEqual(carried, {FREE: 2, NEEDS_SUNDAY: 4})
+
+    def test_assign_splits_crews_and_keeps_their_history(self):
+        crews = [{'workers': 3, 'history': [1]}, {'workers': 2, 'history': [None]}]
+        assigned = _assign(crews, [(5, 2), (6, 3)])
+        self.assertEqual(assigned, [
+            {'workers': 2, 'history': [1, 5]},
+            {'workers': 1, 'history': [1, 6]},
+            {'workers': 2, 'history': [None, 6]},
+        ])
+
+    def test_schedule_reports_crews_owing_next_sunday(self):
+        schedule_type, required_heads = HORIZONS[0]
+        result = solve_horizon(required_heads, schedule_type)
+        self.assertEqual(result['weeks'], 3)
+        self.assertTrue(result['next_sunday_rest'])
+        for crew in result['next_sunday_rest']:
+            self.assertEqual(result['schedule'][crew]['Week_3']['Saturday'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
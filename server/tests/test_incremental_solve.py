@@ -0,0 +1,61 @@
+"""Re-solving a kept CBC model after the demand changes."""
+import unittest
+from unittest import mock
+
+from routes import employee_allocation
+from routes.employee_allocation import incremental_sessions, solve_schedule
+
+SESSION = ('incremental_test', 1)
+FIRST = [3, 10, 12, 8, 9, 11, 4]
+# Same work days, new demand on Monday and Thursday
+SECOND = [3, 14, 12, 8, 6, 11, 4]
+
+
+def constraint_terms(model):
+    """Each constraint's coefficients and right-hand side, by name."""
+    return {
+        name: ({var.name: coef for var, coef in constraint.items()}, -constraint.constant)
+        for name, constraint in model.constraints.items()
+    }
+
+
+class IncrementalSolveTest(unittest.TestCase):
+    def setUp(self):
+        incremental_sessions.invalidate()
+        self.addCleanup(incremental_sessions.invalidate)
+
+    def test_second_demand_changes_only_right_hand_sides(self):
+        with mock.patch.object(employee_allocation, 'build_cbc_model',
+                               wraps=employee_allocation.build_cbc_model) as build:
+            solve_schedule(FIRST, 4, session_key=SESSION)
+            model = incremental_sessions.get(SESSION)['model']
+            before = constraint_terms(model)
+
+            warm = solve_schedule(SECOND, 4, session_key=SESSION)
+            after = constraint_terms(incremental_sessions.get(SESSION)['model'])
+        self.assertEqual(build.call_count, 1)
+        self.assertIs(incremental_sessions.get(SESSION)['model'], model)
+
+        # Same rows and coefficients; only the changed days' right-hand sides moved
+        self.assertEqual(before.keys(), after.keys())
+        changed = {name for name in before if before[name][1] != after[name][1]}
+        self.assertEqual(changed, {f"Day_{day}_{row}" for day in (1, 4) for row in ('balance', 'no_understaffing')})
+        for name in before:
+            self.assertEqual(before[name][0], after[name][0], name)
+        self.assertEqual(after['Day_1_balance'][1], 14)
+        self.assertEqual(after['Day_4_no_understaffing'][1], 6)
+
+        cold = solve_schedule(SECOND, 4)
+        self.assertEqual(warm['solver_status'], cold['solver_status'])
+        self.assertAlmostEqual(warm['objective'], cold['objective'])
+
+    def test_changed_zero_days_rebuild_the_model(self):
+        solve_schedule(FIRST, 4, session_key=SESSION)
+        model = incremental_sessions.get(SESSION)['model']
+        result = solve_schedule([0] + FIRST[1:], 4, session_key=SESSION)
+        self.assertIsNot(incremental_sessions.get(SESSION)['model'], model)
+        self.assertAlmostEqual(result['objective'], solve_schedule([0] + FIRST[1:], 4)['objective'])
+
+
+if __name__ == '__main__':
+    unittest.main()
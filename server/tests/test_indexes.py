@@ -0,0 +1,71 @@
+"""Hot lookups scan their table before the index migration and search an index after it."""
+import unittest
+
+from flask_migrate import downgrade, upgrade
+
+from tests.support import MIGRATIONS, app, migrate_database, query_plan, searches_index
+
+BEFORE_INDEXES = '9d4e7b2a6c31'
+
+# name: (SQL, table, index the migrated database must search)
+LOOKUPS = {
+    'employees by department': (
+        "SELECT employees.id FROM employees JOIN job_classes ON job_classes.id = employees.job_class_id "
+        "WHERE job_classes.department_id IN (1, 2)",
+        'employees', 'ix_employees_job_class_id',
+    ),
+    'job classes by department': (
+        "SELECT id, name FROM job_classes WHERE department_id = 1",
+        'job_classes', 'ix_job_classes_department_id',
+    ),
+    'departments by user': (
+        "SELECT id FROM departments WHERE user_id = 1",
+        'departments', 'ix_departments_user_id',
+    ),
+    'metric history': (
+        "SELECT date, value FROM employee_metrics "
+        "WHERE employee_id = 1 AND metric_id = 2 AND date BETWEEN '2024-01-01' AND '2024-03-31'",
+        'employee_metrics', 'ix_employee_metrics_employee_id_metric_id_date',
+    ),
+    'metrics by employee': (
+        "SELECT id, value FROM employee_metrics WHERE employee_id = 1",
+        'employee_metrics', 'ix_employee_metrics_employee_id_metric_id_date',
+    ),
+    'schedule by employee': (
+        "SELECT * FROM schedules WHERE employee_id = 1",
+        'schedules', 'ix_schedules_employee_id',
+    ),
+    'demand date range': (
+        "SELECT date, total_cases FROM daily_demand WHERE date BETWEEN '2024-01-01' AND '2024-03-31'",
+        'daily_demand', 'ix_daily_demand_date',
+    ),
+}
+
+
+class IndexMigrationPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        try:
+            with app.app_context():
+                downgrade(directory=MIGRATIONS, revision=BEFORE_INDEXES)
+            cls.before = {name: query_plan(sql) for name, (sql, _, _) in LOOKUPS.items()}
+        finally:
+            with app.app_context():
+                upgrade(directory=MIGRATIONS)
+        cls.after = {name: query_plan(sql) for name, (sql, _, _) in LOOKUPS.items()}
+
+    def test_lookups_scan_before_migration(self):
+        for name, (_, table, _) in LOOKUPS.items():
+            with self.subTest(name):
+                self.assertIn(f"SCAN {table}", self.before[name])
+
+    def test_lookups_search_index_after_migration(self):
+        for name, (_, table, index) in LOOKUPS.items():
+            with self.subTest(name):
+                self.assertTrue(searches_index(self.after[name], table, index), self.after[name])
+                self.assertNotIn(f"SCAN {table}", self.after[name])
+
+
+if __name__ == '__main__':
+    unittest.main()
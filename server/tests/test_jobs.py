@@ -0,0 +1,143 @@
+"""Cancelling background jobs and taking over jobs whose owner died."""
+from datetime import datetime, timedelta
+import threading
+import time
+import unittest
+from unittest import mock
+import uuid
+
+from tests.support import app, create_user, migrate_database
+import jobs
+from jobs import JOB_CANCELLERS, JOB_HANDLERS, cancel_job, job_handler, resume_pending_jobs, submit_job
+from models import db, Job
+
+started = threading.Event()
+release = threading.Event()
+
+
+def wait_for_job(job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            job = db.session.get(Job, job_id)
+            if job.status in statuses:
+                return job.status, job.result
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+
+@job_handler('test_unstoppable', cancel=lambda job_id: None)
+def unstoppable(payload, job_id=None):
+    """Ignores its cancel hook, like a solve on a backend that cannot be killed."""
+    started.set()
+    release.wait(10)
+    return {'done': True}
+
+
+@job_handler('test_no_hook')
+def no_hook(payload, job_id=None):
+    started.set()
+    release.wait(10)
+    return {'done': True}
+
+
+class CancelJobTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        cls.user_id = create_user('jobs_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        for kind in ('test_unstoppable', 'test_no_hook'):
+            JOB_HANDLERS.pop(kind, None)
+            JOB_CANCELLERS.pop(kind, None)
+
+    def setUp(self):
+        started.clear()
+        release.clear()
+
+    def submit_running(self, kind):
+        """Submit a job and wait for its handler to start; self.run is the executor's future for it."""
+        submit = jobs.executor.submit
+
+        def keep_future(*args):
+            self.run = submit(*args)
+            return self.run
+
+        with app.app_context(), mock.patch.object(jobs.executor, 'submit', side_effect=keep_future):
+            job_id = submit_job(kind, {}, self.user_id).id
+        self.assertTrue(started.wait(10))
+        return job_id
+
+    def test_cancelled_running_job_does_not_finish_as_succeeded(self):
+        job_id = self.submit_running('test_unstoppable')
+        with app.app_context():
+            self.assertTrue(cancel_job(db.session.get(Job, job_id)))
+        release.set()
+        # run_job has written (or discarded) the outcome once its future is done
+        self.run.result(10)
+        self.assertEqual(wait_for_job(job_id, ('cancelled', 'succeeded')), ('cancelled', None))
+
+    def test_running_job_without_cancel_hook_is_not_cancelled(self):
+        job_id = self.submit_running('test_no_hook')
+        with app.app_context():
+            self.assertFalse(cancel_job(db.session.get(Job, job_id)))
+        release.set()
+        self.assertEqual(wait_for_job(job_id, ('succeeded', 'cancelled')), ('succeeded', {'done': True}))
+
+    def test_finished_job_cannot_be_cancelled(self):
+        job_id = self.submit_running('test_unstoppable')
+        release.set()
+        wait_for_job(job_id, ('succeeded',))
+        with app.app_context():
+            job = db.session.get(Job, job_id)
+            self.assertFalse(cancel_job(job))
+            self.assertEqual(job.status, 'succeeded')
+
+
+class JobLeaseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        cls.user_id = create_user('jobs_lease_user')
+
+    def add_running(self, heartbeat_age):
+        """A job another process claimed, whose lease was last renewed heartbeat_age seconds ago."""
+        with app.app_context():
+            job = Job(id=uuid.uuid4().hex, kind='test_no_hook', status='running', payload={},
+                      user_id=self.user_id, owner='other-host:1:abcd1234',
+                      heartbeat_at=datetime.utcnow() - timedelta(seconds=heartbeat_age))
+            db.session.add(job)
+            db.session.commit()
+            self.addCleanup(self.delete, job.id)
+            return job.id
+
+    def delete(self, job_id):
+        with app.app_context():
+            Job.query.filter_by(id=job_id).delete()
+            db.session.commit()
+
+    def resume(self):
+        with app.app_context(), mock.patch.object(jobs.executor, 'submit') as submit:
+            resume_pending_jobs()
+        return {call.args[1] for call in submit.call_args_list}
+
+    def status(self, job_id):
+        with app.app_context():
+            job = db.session.get(Job, job_id)
+            return job.status, job.owner
+
+    def test_job_owned_by_live_executor_is_not_resubmitted(self):
+        job_id = self.add_running(heartbeat_age=1)
+        self.assertNotIn(job_id, self.resume())
+        self.assertEqual(self.status(job_id), ('running', 'other-host:1:abcd1234'))
+
+    def test_job_with_expired_lease_is_requeued_and_submitted(self):
+        job_id = self.add_running(heartbeat_age=app.config['JOB_LEASE_SECONDS'] + 1)
+        self.assertIn(job_id, self.resume())
+        self.assertEqual(self.status(job_id), ('queued', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Listing ETags change with every kind of row the listings embed."""
+from datetime import date
+import unittest
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, Department, Employee, JobClass, Metric, User
+
+LISTINGS = ('/labinv/api/employees', '/labinv/api/job_classes?fields=id,name,metrics,department')
+
+
+class ListingETagTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        cls.user_id = create_user('etag_user')
+        with app.app_context():
+            metric = Metric(name='etag metric', unit='units')
+            job_class = JobClass(name='ETag class', base_pay_rate=20, metrics=[metric],
+                                 department=Department(name='ETags', user_id=cls.user_id))
+            employee = Employee(first_name='E', last_name='Tag', email='etag@example.com',
+                                hire_date=date(2024, 1, 1), job_class=job_class)
+            db.session.add_all([metric, employee])
+            db.session.commit()
+            cls.metric_id = metric.id
+            cls.job_class_id = job_class.id
+            cls.department_id = job_class.department_id
+            cls.employee_id = employee.id
+        cls.client = logged_in_client('etag_user')
+
+    def etags(self):
+        return {url: self.client.get(url).headers['ETag'] for url in LISTINGS}
+
+    def statuses(self, etags):
+        return {url: self.client.get(url, headers={'If-None-Match': etag}).status_code
+                for url, etag in etags.items()}
+
+    def assert_write_changes_etags(self, write):
+        before = self.etags()
+        self.assertEqual(self.statuses(before), {url: 304 for url in LISTINGS})
+        write()
+        self.assertEqual(self.statuses(before), {url: 200 for url in LISTINGS})
+        self.assertEqual(self.statuses(self.etags()), {url: 304 for url in LISTINGS})
+
+    def update(self, model, row_id, **values):
+        with app.app_context():
+            row = db.session.get(model, row_id)
+            for name, value in values.items():
+                setattr(row, name, value)
+            db.session.commit()
+
+    def test_subscription_change(self):
+        def write():
+            response = self.client.post('/labinv/api/update-subscription', json={'hasSubscription': False})
+            self.assertEqual(response.status_code, 200)
+            self.update(User, self.user_id, has_subscription=True)
+        self.assert_write_changes_etags(write)
+
+    def test_profile_change(self):
+        self.assert_write_changes_etags(lambda: self.update(User, self.user_id, email='etag.user@example.com'))
+
+    def test_department_change(self):
+        self.assert_write_changes_etags(lambda: self.update(Department, self.department_id, description='Edited'))
+
+    def test_job_class_change(self):
+        self.assert_write_changes_etags(lambda: self.update(JobClass, self.job_class_id, base_pay_rate=25))
+
+    def test_metric_change(self):
+        self.assert_write_changes_etags(lambda: self.update(Metric, self.metric_id, unit='cases'))
+
+    def test_metric_linked_to_job_class(self):
+        def write():
+            with app.app_context():
+                job_class = db.session.get(JobClass, self.job_class_id)
+                job_class.metrics.append(Metric(name='etag metric 2'))
+                db.session.commit()
+        self.assert_write_changes_etags(write)
+
+    def test_employee_change(self):
+        def write():
+            response = self.client.patch(f"/labinv/api/update_employee/{self.employee_id}", json={'last_name': 'Tagged'})
+            self.assertEqual(response.status_code, 200)
+        self.assert_write_changes_etags(write)
+
+    def test_other_users_changes_keep_etags(self):
+        other_id = create_user('etag_other')
+        self.assertEqual(self.statuses(self.etags()), {url: 304 for url in LISTINGS})
+        before = self.etags()
+        self.update(User, other_id, email='etag.other@example.com')
+        self.assertEqual(self.statuses(before), {url: 304 for url in LISTINGS})
+
+
+if __name__ == '__main__':
+    unittest.main()
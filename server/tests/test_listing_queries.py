@@ -0,0 +1,71 @@
+"""Employee and job class listings run a fixed number of queries however many rows they return."""
+from datetime import date
+import unittest
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, Department, Employee, EmployeeMetric, JobClass, Metric, Schedule
+
+N = 20
+LISTINGS = (
+    '/labinv/api/employees',
+    '/labinv/api/employees?limit=1000',
+    '/labinv/api/employees?fields=id,job_class,schedule',
+    '/labinv/api/job_classes',
+    '/labinv/api/job_classes?fields=id,employees',
+)
+
+
+class ListingQueryCountTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        user_id = create_user('listing_user')
+        with app.app_context():
+            metrics = [Metric(name=f"listing metric {i}", unit='units') for i in range(2)]
+            department = Department(name='Listing', user_id=user_id)
+            for i in range(2):
+                job_class = JobClass(name=f"Listing class {i}", base_pay_rate=20, department=department, metrics=metrics)
+                db.session.add(job_class)
+            db.session.commit()
+            cls.job_class_ids = [job_class.id for job_class in department.job_classes]
+            cls.metric_ids = [metric.id for metric in metrics]
+        cls.added = 0
+        cls.client = logged_in_client('listing_user')
+
+    @classmethod
+    def add_employees(cls, count):
+        with app.app_context():
+            for i in range(cls.added, cls.added + count):
+                employee = Employee(
+                    first_name=f"First{i}", last_name=f"Last{i}", email=f"listing{i}@example.com",
+                    hire_date=date(2024, 1, 1), hourly_rate=20, job_class_id=cls.job_class_ids[i % 2],
+                    schedule=Schedule(monday=True, tuesday=True, wednesday=True, thursday=True),
+                    metric_values=[EmployeeMetric(metric_id=metric_id, date=date(2024, 1, 2), value=i)
+                                   for metric_id in cls.metric_ids]
+                )
+                db.session.add(employee)
+            db.session.commit()
+        cls.added += count
+
+    def query_counts(self):
+        counts = {}
+        for url in LISTINGS:
+            # The first request warms the reference cache; count the second
+            self.client.get(url)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[url] = int(response.headers['X-DB-Query-Count'])
+        return counts
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_employees(N)
+        small = self.query_counts()
+        self.add_employees(9 * N)
+        large = self.query_counts()
+
+        self.assertEqual(len(self.client.get('/labinv/api/employees').get_json()), 10 * N)
+        self.assertEqual(small, large)
+
+
+if __name__ == '__main__':
+    unittest.main()
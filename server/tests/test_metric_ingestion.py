@@ -0,0 +1,101 @@
+"""Batch ingestion of employee metric readings."""
+from datetime import date
+import json
+import unittest
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, Department, Employee, EmployeeMetric, JobClass, Metric
+
+INGEST = '/labinv/api/employee_metrics/ingest'
+
+
+class MetricIngestionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        user_id = create_user('ingest_user')
+        with app.app_context():
+            metric = Metric(name='ingest metric', unit='cases')
+            job_class = JobClass(name='Ingest class', department=Department(name='Ingest', user_id=user_id))
+            employees = [
+                Employee(first_name='In', last_name=str(i), email=f"ingest{i}@example.com",
+                         hire_date=date(2024, 1, 1), job_class=job_class)
+                for i in range(3)
+            ]
+            db.session.add_all([metric, *employees])
+            db.session.commit()
+            cls.metric_id = metric.id
+            cls.employee_ids = [employee.id for employee in employees]
+        cls.client = logged_in_client('ingest_user')
+
+    def setUp(self):
+        self.batch_size = app.config['INGEST_BATCH_SIZE']
+        with app.app_context():
+            EmployeeMetric.query.filter(EmployeeMetric.employee_id.in_(self.employee_ids)).delete()
+            db.session.commit()
+
+    def tearDown(self):
+        app.config['INGEST_BATCH_SIZE'] = self.batch_size
+
+    def ndjson(self, days, value=1.0):
+        return ''.join(
+            json.dumps({'employee_id': employee_id, 'metric_id': self.metric_id,
+                        'date': f"2024-03-{day:02d}", 'value': value}) + '\n'
+            for day in days for employee_id in self.employee_ids
+        ).encode()
+
+    def readings(self):
+        with app.app_context():
+            return dict(db.session.query(EmployeeMetric.date, db.func.sum(EmployeeMetric.value))
+                        .filter(EmployeeMetric.employee_id.in_(self.employee_ids))
+                        .group_by(EmployeeMetric.date).all())
+
+    def ingest(self, body, content_type='application/x-ndjson'):
+        return self.client.post(INGEST, data=body, content_type=content_type)
+
+    def test_resent_batch_overwrites_readings(self):
+        first = self.ingest(self.ndjson(range(1, 11), value=1.0))
+        again = self.ingest(self.ndjson(range(1, 11), value=2.0))
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((first.get_json()['written'], again.get_json()['written']), (30, 30))
+        self.assertEqual(self.readings(), {date(2024, 3, day): 6.0 for day in range(1, 11)})
+
+    def test_csv_by_email_and_metric_name(self):
+        body = 'Email,Metric,Date,Value\n' + ''.join(
+            f"ingest{i}@example.com,ingest metric,2024-03-01,{i}\n" for i in range(3)
+        ) + 'nobody@example.com,ingest metric,2024-03-01,1\n'
+        report = self.ingest(body.encode(), 'text/csv').get_json()
+        self.assertEqual((report['rows'], report['written'], report['failed']), (4, 3, 1))
+        self.assertEqual(report['errors'], [{'line': 5, 'error': 'employee not found in your departments'}])
+
+    def test_bad_utf8_reports_committed_batches_and_offset(self):
+        app.config['INGEST_BATCH_SIZE'] = 4
+        good = self.ndjson(range(1, 6))
+        bad = b'{"employee_id": 1, "note": "\xff"}\n'
+        response = self.ingest(good + bad + self.ndjson(range(6, 8)))
+
+        self.assertEqual(response.status_code, 400)
+        report = response.get_json()
+        self.assertEqual(report['offset'], len(good) + bad.index(b'\xff'))
+        # Every line before the bad one is written, nothing after it
+        self.assertEqual((report['rows'], report['written'], report['failed']), (15, 15, 0))
+        self.assertEqual(sorted(self.readings()), [date(2024, 3, day) for day in range(1, 6)])
+
+    def test_malformed_csv_is_a_bad_request_with_counts(self):
+        app.config['INGEST_BATCH_SIZE'] = 2
+        body = 'employee_id,metric_id,date,value\n' + ''.join(
+            f"{self.employee_ids[0]},{self.metric_id},2024-03-{day:02d},1\n" for day in range(1, 4)
+        ) + 'x' * 200000 + '\n'
+        response = self.ingest(body.encode(), 'text/csv')
+
+        self.assertEqual(response.status_code, 400)
+        report = response.get_json()
+        self.assertIn('line 5', report['error'])
+        self.assertEqual((report['rows'], report['written']), (3, 3))
+
+    def test_unsupported_content_type(self):
+        self.assertEqual(self.ingest(b'x', 'text/plain').status_code, 415)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Access to the Prometheus scrape endpoint."""
+import unittest
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+
+METRICS = '/labinv/api/metrics'
+
+
+class MetricsTokenTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        create_user('metrics_user')
+        create_user('metrics_admin', is_admin=True)
+
+    def setUp(self):
+        token = app.config['METRICS_TOKEN']
+        self.addCleanup(app.config.__setitem__, 'METRICS_TOKEN', token)
+
+    def scrape(self, authorization=None):
+        headers = {} if authorization is None else {'Authorization': authorization}
+        return app.test_client().get(METRICS, headers=headers).status_code
+
+    def test_bearer_token(self):
+        app.config['METRICS_TOKEN'] = 'scrape-secret'
+        self.assertEqual(self.scrape('Bearer scrape-secret'), 200)
+        for authorization in ('Bearer wrong', 'scrape-secret', 'Basic scrape-secret', None):
+            with self.subTest(authorization=authorization):
+                self.assertEqual(self.scrape(authorization), 401)
+
+    def test_admin_session_without_token(self):
+        app.config['METRICS_TOKEN'] = ''
+        self.assertEqual(self.scrape(), 403)
+        self.assertEqual(logged_in_client('metrics_user').get(METRICS).status_code, 403)
+        self.assertEqual(logged_in_client('metrics_admin').get(METRICS).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""The pattern catalog must give the solver the same columns as the original generator."""
+from collections import Counter
+from itertools import combinations, permutations
+import unittest
+
+import numpy as np
+import pulp
+
+from routes.employee_allocation import (
+    DEFAULT_WEIGHTS, build_cbc_model, has_two_consecutive_rest_days, pattern_incidence, pattern_masks
+)
+
+
+def original_patterns(required_heads, schedule_type):
+    """The combinations/permutations/rotation generator the catalog replaced, without its logging."""
+    work_days = [i for i, req in enumerate(required_heads) if req > 0]
+    zero_days = [i for i, req in enumerate(required_heads) if req == 0]
+
+    comb_patterns = [
+        tuple(p) for p in combinations(work_days, schedule_type)
+        if has_two_consecutive_rest_days([d for d in range(7) if d not in p], 7)
+    ]
+    perm_patterns = set()
+    for p in permutations(work_days, schedule_type):
+        p = tuple(sorted(p))
+        if has_two_consecutive_rest_days([d for d in range(7) if d not in p], 7):
+            perm_patterns.add(p)
+    patterns = list(set(comb_patterns) | perm_patterns)
+
+    original = patterns.copy()
+    for _ in range(6):
+        for p in (tuple((day + 1) % 7 for day in p) for p in original):
+            if any(d in zero_days for d in p):
+                continue
+            if p not in patterns and has_two_consecutive_rest_days([d for d in range(7) if d not in p], 7):
+                patterns.append(p)
+
+    for p in [(0, 2, 3, 4, 6), (1, 3, 4, 5, 6)]:
+        if p not in patterns and has_two_consecutive_rest_days([d for d in range(7) if d not in p], 7):
+            patterns.append(p)
+    return patterns
+
+
+def incidence_for(patterns):
+    incidence = np.zeros((len(patterns), 7), dtype=np.int8)
+    for row, pattern in enumerate(patterns):
+        incidence[row, list(pattern)] = 1
+    return incidence
+
+
+def cbc_objective(incidence, required_heads, schedule_type):
+    model, _ = build_cbc_model(incidence, required_heads, schedule_type, DEFAULT_WEIGHTS)
+    model.solve(pulp.PULP_CBC_CMD(msg=False))
+    assert pulp.LpStatus[model.status] == 'Optimal', pulp.LpStatus[model.status]
+    return pulp.value(model.objective)
+
+
+def column_counts(patterns):
+    return Counter(frozenset(pattern) for pattern in patterns)
+
+
+class PatternCatalogParityTest(unittest.TestCase):
+    def test_same_columns_for_every_zero_day_mask(self):
+        for zero_mask in range(1 << 7):
+            heads = [0 if zero_mask >> d & 1 else 5 for d in range(7)]
+            for schedule_type in (4, 5):
+                with self.subTest(zero_mask=zero_mask, schedule_type=schedule_type):
+                    catalog = [[d for d in range(7) if mask >> d & 1] for mask in pattern_masks(heads, schedule_type)]
+                    self.assertEqual(column_counts(catalog), column_counts(original_patterns(heads, schedule_type)))
+
+    def test_same_objective_as_original_generator(self):
+        rng = np.random.default_rng(7)
+        cases = [[31, 25, 14, 7, 32, 2, 25], [40, 11, 1, 35, 36, 33, 37]]
+        cases += [[int(h) for h in rng.integers(1, 41, size=7)] for _ in range(20)]
+        cases += [[0 if d in (0, 6) else int(h) for d, h in enumerate(rng.integers(1, 41, size=7))] for _ in range(5)]
+        for heads in cases:
+            for schedule_type in (4, 5):
+                with self.subTest(required_heads=heads, schedule_type=schedule_type):
+                    expected = cbc_objective(incidence_for(original_patterns(heads, schedule_type)), heads, schedule_type)
+                    actual = cbc_objective(pattern_incidence(pattern_masks(heads, schedule_type)), heads, schedule_type)
+                    self.assertAlmostEqual(actual, expected, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
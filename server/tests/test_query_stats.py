@@ -0,0 +1,62 @@
+"""The X-DB-* headers that report each request's SQL statements."""
+import unittest
+
+from sqlalchemy import event
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db
+
+HEADERS = ('X-DB-Query-Count', 'X-DB-Time-Ms', 'X-DB-Repeated-Statements')
+
+
+class QueryStatsHeaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        create_user('stats_user')
+        cls.client = logged_in_client('stats_user')
+
+    def setUp(self):
+        threshold = app.config['SQL_REPEAT_THRESHOLD']
+        self.addCleanup(app.config.__setitem__, 'SQL_REPEAT_THRESHOLD', threshold)
+
+    def get_counting(self, url):
+        """GET url and return the response with the statements the engine really ran."""
+        executed = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'after_cursor_execute', count)
+        try:
+            response = self.client.get(url)
+            response.get_data()
+        finally:
+            event.remove(engine, 'after_cursor_execute', count)
+        return response, executed
+
+    def test_headers_count_the_request_statements(self):
+        self.client.get('/labinv/api/employees')
+        response, executed = self.get_counting('/labinv/api/employees')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(int(response.headers['X-DB-Query-Count']), len(executed))
+        self.assertGreaterEqual(float(response.headers['X-DB-Time-Ms']), 0)
+        self.assertEqual(response.headers['X-DB-Repeated-Statements'], '0')
+
+    def test_repeated_statements_past_threshold(self):
+        app.config['SQL_REPEAT_THRESHOLD'] = 1
+        response, executed = self.get_counting('/labinv/api/employees')
+        self.assertEqual(int(response.headers['X-DB-Repeated-Statements']), len(set(executed)))
+
+    def test_streamed_responses_have_no_headers(self):
+        response, executed = self.get_counting('/labinv/api/export/employees?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(executed)
+        for header in HEADERS:
+            self.assertNotIn(header, response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""The reference cache on its Redis backend, and what invalidates it."""
+import json
+import unittest
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, Department, JobClass, Metric, User
+from reference_cache import (MISSING, METRICS_KEY, RedisBackend, department_ids_key, job_class_info, job_class_key,
+                             metric_definitions, reference_cache, user_department_ids, user_key)
+
+PREFIX = 'test:'
+
+
+class FakeRedis:
+    """The get/set/delete subset of redis.Redis, with expiry on a settable clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.data = {}
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append(('get', key))
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and self.now >= expires:
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.calls.append(('set', key))
+        self.data[key] = (value.encode(), None if ex is None else self.now + ex)
+        return True
+
+    def delete(self, *keys):
+        self.calls.append(('delete',) + keys)
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def __contains__(self, key):
+        return self.get(PREFIX + key) is not None
+
+
+class RedisBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeRedis()
+        self.backend = RedisBackend(self.client, PREFIX)
+
+    def test_values_round_trip_as_json_under_the_prefix(self):
+        value = {'id': 1, 'name': 'Cases', 'ids': [1, 2]}
+        self.backend.set('job_class:1', value, ttl=30)
+        self.assertEqual(json.loads(self.client.data['test:job_class:1'][0]), value)
+        self.assertEqual(self.backend.get('job_class:1'), value)
+        self.assertIs(self.backend.get('job_class:2'), MISSING)
+
+    def test_cached_none_is_not_a_miss(self):
+        self.backend.set('user:9', None, ttl=30)
+        self.assertIsNone(self.backend.get('user:9'))
+
+    def test_entries_expire_after_ttl(self):
+        self.backend.set('a', 1, ttl=30)
+        self.backend.set('b', 2, ttl=60)
+        self.client.now = 30
+        self.assertIs(self.backend.get('a'), MISSING)
+        self.assertEqual(self.backend.get('b'), 2)
+
+    def test_delete(self):
+        self.backend.set('a', 1, ttl=30)
+        self.backend.set('b', 2, ttl=30)
+        self.backend.delete('a', 'b', 'c')
+        self.assertEqual(self.client.data, {})
+        self.client.calls.clear()
+        self.backend.delete()
+        self.assertEqual(self.client.calls, [])
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError('redis is down')
+
+    set = delete = get
+
+
+class RedisReferenceCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        cls.user_id = create_user('refcache_user')
+        cls.other_id = create_user('refcache_other')
+        with app.app_context():
+            metric = Metric(name='refcache metric', unit='units')
+            job_class = JobClass(name='Refcache class', metrics=[metric],
+                                 department=Department(name='Refcache', user_id=cls.user_id))
+            db.session.add(job_class)
+            db.session.commit()
+            cls.job_class_id = job_class.id
+            cls.department_id = job_class.department_id
+            cls.metric_id = metric.id
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        backend = reference_cache.backend
+        reference_cache.backend = RedisBackend(self.redis, PREFIX)
+        self.addCleanup(setattr, reference_cache, 'backend', backend)
+
+    def update(self, model, row_id, **values):
+        with app.app_context():
+            row = db.session.get(model, row_id)
+            for name, value in values.items():
+                setattr(row, name, value)
+            db.session.commit()
+
+    def warm(self, lookup, *args):
+        with app.app_context():
+            value = lookup(*args)
+        self.redis.calls.clear()
+        return value
+
+    def test_hits_are_served_from_redis(self):
+        first = self.warm(user_department_ids, self.user_id)
+        with app.app_context():
+            self.assertEqual(user_department_ids(self.user_id), first)
+        self.assertEqual(self.redis.calls, [('get', f"{PREFIX}{department_ids_key(self.user_id)}")])
+
+    def test_backend_errors_fall_through_to_the_database(self):
+        reference_cache.backend = RedisBackend(BrokenRedis(), PREFIX)
+        with app.app_context():
+            self.assertEqual(user_department_ids(self.user_id), [self.department_id])
+
+    def test_new_department_drops_owner_department_ids(self):
+        self.warm(user_department_ids, self.user_id)
+        with app.app_context():
+            department = Department(name='Refcache new', user_id=self.user_id)
+            db.session.add(department)
+            db.session.commit()
+            self.addCleanup(self.delete_department, department.id)
+        self.assertNotIn(department_ids_key(self.user_id), self.redis)
+        with app.app_context():
+            self.assertEqual(len(user_department_ids(self.user_id)), 2)
+
+    def delete_department(self, department_id):
+        with app.app_context():
+            db.session.delete(db.session.get(Department, department_id))
+            db.session.commit()
+
+    def test_moved_department_drops_both_owners_department_ids(self):
+        self.warm(user_department_ids, self.user_id)
+        self.warm(user_department_ids, self.other_id)
+        self.update(Department, self.department_id, user_id=self.other_id)
+        self.addCleanup(self.update, Department, self.department_id, user_id=self.user_id)
+        self.assertNotIn(department_ids_key(self.user_id), self.redis)
+        self.assertNotIn(department_ids_key(self.other_id), self.redis)
+
+    def test_user_update_drops_cached_user(self):
+        client = logged_in_client('refcache_user')
+        client.get('/labinv/api/check_session')
+        self.assertIn(user_key(self.user_id), self.redis)
+        self.update(User, self.user_id, email='refcache.user@example.com')
+        self.assertNotIn(user_key(self.user_id), self.redis)
+        session = client.get('/labinv/api/check_session').get_json()
+        self.assertEqual(session['user']['email'], 'refcache.user@example.com')
+
+    def test_logout_drops_cached_user(self):
+        client = logged_in_client('refcache_user')
+        client.get('/labinv/api/check_session')
+        self.assertIn(user_key(self.user_id), self.redis)
+        self.assertEqual(client.post('/labinv/api/logout').status_code, 200)
+        self.assertNotIn(user_key(self.user_id), self.redis)
+
+    def test_job_class_and_metric_updates(self):
+        self.warm(job_class_info, self.job_class_id)
+        self.warm(metric_definitions)
+        self.update(JobClass, self.job_class_id, base_pay_rate=31)
+        self.update(Metric, self.metric_id, unit='cases')
+        self.assertNotIn(job_class_key(self.job_class_id), self.redis)
+        self.assertNotIn(METRICS_KEY, self.redis)
+        with app.app_context():
+            self.assertEqual(job_class_info(self.job_class_id)['base_pay_rate'], 31)
+            self.assertIn({'id': self.metric_id, 'name': 'refcache metric', 'description': None, 'unit': 'cases'},
+                          metric_definitions())
+
+
+if __name__ == '__main__':
+    unittest.main()
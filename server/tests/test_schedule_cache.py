@@ -0,0 +1,120 @@
+"""The LRU/TTL cache and the schedule result cache built on it."""
+import unittest
+from unittest import mock
+
+from tests.support import create_user, logged_in_client, migrate_database
+from cache import TTLCache
+from routes import employee_allocation
+from routes.employee_allocation import cached_solve_schedule, schedule_cache
+
+HEADS = [3, 10, 12, 8, 9, 11, 4]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_hit_and_miss_are_counted(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2, ttl=30)
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertEqual((self.cache.get('a'), self.cache.get('b'), self.cache.get('c')), (1, None, 3))
+
+    def test_invalidate_one_key_or_all(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.invalidate('a')
+        self.assertEqual(len(self.cache), 1)
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+
+class CachedSolveScheduleTest(unittest.TestCase):
+    def setUp(self):
+        schedule_cache.invalidate()
+        patcher = mock.patch.object(employee_allocation, 'solve_schedule', wraps=employee_allocation.solve_schedule)
+        self.solve = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = cached_solve_schedule(HEADS, 4, backend='highs')
+        second = cached_solve_schedule(list(HEADS), '4', backend='highs')
+        self.assertEqual(self.solve.call_count, 1)
+        self.assertEqual(first, second)
+
+        # Callers get copies; changing one must not change the cached entry
+        second['schedule'].clear()
+        self.assertEqual(cached_solve_schedule(HEADS, 4, backend='highs'), first)
+
+    def test_key_separates_backend_and_parameters(self):
+        cached_solve_schedule(HEADS, 4, backend='highs')
+        cached_solve_schedule(HEADS, 5, backend='highs')
+        cached_solve_schedule(HEADS, 4, weights={'over': 1}, backend='highs')
+        cached_solve_schedule(HEADS, 4, backend='cbc')
+        cached_solve_schedule([4] + HEADS[1:], 4, backend='highs')
+        self.assertEqual(self.solve.call_count, 5)
+        # Spelling out the default weights is the same request
+        cached_solve_schedule(HEADS, 4, weights={'over': 10, 'under': 5}, backend='highs')
+        self.assertEqual(self.solve.call_count, 5)
+
+    def test_timed_out_results_are_not_cached(self):
+        timed_out = {'schedule': {}, 'solver_status': 'timed_out', 'objective': 1.0}
+        with mock.patch.object(employee_allocation, 'solve_schedule', return_value=timed_out) as solve:
+            cached_solve_schedule(HEADS, 4, backend='highs')
+            cached_solve_schedule(HEADS, 4, backend='highs')
+        self.assertEqual(solve.call_count, 2)
+        self.assertEqual(len(schedule_cache), 0)
+
+
+class ScheduleCacheRoutesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        create_user('cache_user')
+        create_user('cache_admin', is_admin=True)
+
+    def setUp(self):
+        schedule_cache.invalidate()
+
+    def test_stats(self):
+        cached_solve_schedule(HEADS, 4, backend='highs')
+        cached_solve_schedule(HEADS, 4, backend='highs')
+        stats = logged_in_client('cache_user').get('/labinv/api/schedule/cache').get_json()
+        self.assertEqual(stats['size'], 1)
+        self.assertGreaterEqual(stats['hits'], 1)
+
+    def test_only_admins_clear(self):
+        cached_solve_schedule(HEADS, 4, backend='highs')
+        self.assertEqual(logged_in_client('cache_user').delete('/labinv/api/schedule/cache').status_code, 403)
+        self.assertEqual(len(schedule_cache), 1)
+        self.assertEqual(logged_in_client('cache_admin').delete('/labinv/api/schedule/cache').status_code, 200)
+        self.assertEqual(len(schedule_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Schedule.days_mask filters: correct for every mask and served by ix_schedules_days_mask."""
+from datetime import date
+import unittest
+
+from sqlalchemy import select
+
+from tests.support import app, create_user, logged_in_client, migrate_database, query_plan, searches_index
+from models import db, Department, Employee, JobClass, Schedule, SCHEDULE_DAYS, SCHEDULE_MASKS
+
+
+class ScheduleMaskTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        user_id = create_user('mask_user')
+        with app.app_context():
+            job_class = JobClass(name='Mask class', department=Department(name='Masks', user_id=user_id))
+            # One employee per possible week, so every mask is present exactly once
+            for mask in SCHEDULE_MASKS:
+                schedule = Schedule()
+                schedule.set_days_mask(mask)
+                db.session.add(Employee(
+                    first_name='Mask', last_name=str(mask), email=f"mask{mask}@example.com",
+                    hire_date=date(2024, 1, 1), job_class=job_class, schedule=schedule
+                ))
+            db.session.commit()
+            cls.department_id = job_class.department_id
+        cls.client = logged_in_client('mask_user')
+
+    def matching_masks(self, condition):
+        with app.app_context():
+            return set(db.session.scalars(
+                select(Schedule.days_mask).join(Employee).join(JobClass)
+                .where(JobClass.department_id == self.department_id, condition)
+            ))
+
+    def test_filters_match_bitwise_semantics(self):
+        for mask in (0, 0b0000010, 0b1000001, 0b0111110, 0b1111111):
+            with self.subTest(mask=mask):
+                self.assertEqual(self.matching_masks(Schedule.works_all(mask)),
+                                 {m for m in SCHEDULE_MASKS if m & mask == mask})
+                self.assertEqual(self.matching_masks(Schedule.works_any(mask)),
+                                 {m for m in SCHEDULE_MASKS if m & mask})
+
+    def test_filters_search_the_days_mask_index(self):
+        for condition in (Schedule.works_all(0b0000110), Schedule.works_any(0b1000001)):
+            plan = query_plan(select(Schedule).where(condition))
+            self.assertTrue(searches_index(plan, 'schedules', 'ix_schedules_days_mask'), plan)
+
+    def test_coverage_headcounts(self):
+        response = self.client.get(f"/labinv/api/schedules/coverage?department_id={self.department_id}")
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        # Each day is worked in half of the 128 possible weeks
+        self.assertEqual(body['headcount'], dict.fromkeys(SCHEDULE_DAYS, 64))
+        self.assertEqual(len(body['patterns']), 128)
+
+    def test_works_on_listing(self):
+        response = self.client.get(f"/labinv/api/employees?works_on=sunday,saturday&department_id={self.department_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Flask-Login's user_loader reads the logged-in user from the reference cache."""
+import unittest
+
+from sqlalchemy import event
+
+from tests.support import app, create_user, logged_in_client, migrate_database
+from models import db, User
+from reference_cache import reference_cache, user_key
+
+# Needs a login but reads nothing else from the users table
+CACHE_STATS = '/labinv/api/schedule/cache'
+CHECK_SESSION = '/labinv/api/check_session'
+
+
+class UserLoaderQueryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        migrate_database()
+        cls.user_id = create_user('loader_user')
+        cls.client = logged_in_client('loader_user')
+
+    def users_queries(self, url):
+        """Statements that read the users table while serving url."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if 'FROM users' in statement:
+                statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'after_cursor_execute', record)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(engine, 'after_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        return statements
+
+    def test_warm_cache_loads_user_without_queries(self):
+        self.client.get(CACHE_STATS)
+        self.assertEqual(self.users_queries(CACHE_STATS), [])
+
+    def test_invalidated_user_is_loaded_once(self):
+        self.client.get(CACHE_STATS)
+        reference_cache.invalidate(user_key(self.user_id))
+        self.assertEqual(len(self.users_queries(CACHE_STATS)), 1)
+        self.assertEqual(self.users_queries(CACHE_STATS), [])
+
+    def test_update_reloads_user(self):
+        self.client.get(CACHE_STATS)
+        with app.app_context():
+            db.session.get(User, self.user_id).email = 'loader.user@example.com'
+            db.session.commit()
+        self.assertEqual(len(self.users_queries(CACHE_STATS)), 1)
+        self.assertEqual(self.client.get(CHECK_SESSION).get_json()['user']['email'], 'loader.user@example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()